@@ -0,0 +1,178 @@
+"""
+Deduplicação e limitação de taxa dos alertas publicados (RabbitMQ/Discord)
+
+Cada alerta tem uma impressão digital (nó, tipo, severidade) com seu próprio
+token bucket: um alerta de um tipo não silencia os outros tipos do mesmo nó,
+e um tipo que dispara em rajada é limitado sem perder a contagem.
+
+- os buckets ficam em um LRU limitado (MAX_FINGERPRINTS); ao descartar uma
+  impressão digital, as supressões pendentes dela são preservadas
+- a cada summary_interval, as supressões acumuladas viram um único resumo
+  (on_summary), em vez de uma mensagem por alerta descartado
+"""
+import threading
+import time
+from collections import OrderedDict
+
+# severidade -> (rajada, segundos para repor 1 token)
+SEVERITY_LIMITS = {
+    'critical': (3, 300.0),
+    'warning': (2, 300.0),
+    'info': (10, 60.0),
+}
+DEFAULT_LIMIT = (1, 300.0)
+
+MAX_FINGERPRINTS = 1024
+SUMMARY_INTERVAL = 300.0
+
+
+class TokenBucket:
+    """Token bucket simples (capacidade `burst`, 1 token a cada `period` segundos)"""
+
+    __slots__ = ('burst', 'period', 'tokens', 'updated', 'suppressed')
+
+    def __init__(self, burst, period, now):
+        self.burst = burst
+        self.period = period
+        self.tokens = float(burst)
+        self.updated = now
+        self.suppressed = 0
+
+    def take(self, now):
+        if self.period > 0:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) / self.period)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+class AlertDeduplicator:
+    """
+    Decide se um alerta deve ser publicado e acumula os suprimidos
+
+    Args:
+        limits: Dict severidade -> (rajada, período de reposição em s)
+        max_fingerprints: Tamanho máximo do LRU de impressões digitais
+        summary_interval: Intervalo (s) entre resumos de alertas suprimidos
+        on_summary: Chamado com a lista [(nó, tipo, severidade, suprimidos)]
+    """
+
+    def __init__(self, limits=None, max_fingerprints=MAX_FINGERPRINTS,
+                 summary_interval=SUMMARY_INTERVAL, on_summary=None):
+        self.limits = dict(SEVERITY_LIMITS if limits is None else limits)
+        self.max_fingerprints = max_fingerprints
+        self.summary_interval = summary_interval
+        self.on_summary = on_summary
+
+        self._buckets = OrderedDict()
+        self._evicted = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+        self.stats = {
+            'allowed': 0,
+            'suppressed': 0,
+            'evicted': 0,
+            'summaries': 0
+        }
+
+    def allow(self, node_id, alert_type, severity, now=None):
+        """True se o alerta deve ser publicado; senão conta como suprimido"""
+        now = time.monotonic() if now is None else now
+        key = (node_id, alert_type, severity)
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(*self.limits.get(severity, DEFAULT_LIMIT), now)
+                self._evict()
+            else:
+                self._buckets.move_to_end(key)
+
+            if bucket.take(now):
+                self.stats['allowed'] += 1
+                return True
+            bucket.suppressed += 1
+            self.stats['suppressed'] += 1
+            return False
+
+    def _evict(self):
+        while len(self._buckets) > self.max_fingerprints:
+            key, bucket = self._buckets.popitem(last=False)
+            self.stats['evicted'] += 1
+            if bucket.suppressed:
+                self._evicted[key] = self._evicted.get(key, 0) + bucket.suppressed
+
+    def take_summary(self):
+        """Retorna e zera as supressões acumuladas: [(nó, tipo, severidade, quantidade)]"""
+        with self._lock:
+            counts = self._evicted
+            self._evicted = {}
+            for key, bucket in self._buckets.items():
+                if bucket.suppressed:
+                    counts[key] = counts.get(key, 0) + bucket.suppressed
+                    bucket.suppressed = 0
+        return sorted((*key, count) for key, count in counts.items())
+
+    def emit_summary(self):
+        summary = self.take_summary()
+        if summary and self.on_summary:
+            try:
+                self.on_summary(summary)
+                with self._lock:
+                    self.stats['summaries'] += 1
+            except Exception as e:
+                print(f"[ALERTS ERROR] Falha ao enviar resumo de alertas suprimidos: {e}")
+        return summary
+
+    # ==================== AGENDADOR ====================
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout)
+        self._thread = None
+        self.emit_summary()
+
+    def _run(self):
+        while not self._stop_event.wait(self.summary_interval):
+            self.emit_summary()
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats['fingerprints'] = len(self._buckets)
+            stats['pending'] = sum(bucket.suppressed for bucket in self._buckets.values()) + sum(self._evicted.values())
+        return stats
+
+
+def format_summary(summary):
+    """Texto do resumo publicado como alerta 'alerts_suppressed'"""
+    lines = [f"{node_id} {alert_type} ({severity}): {count}x" for node_id, alert_type, severity, count in summary]
+    total = sum(item[3] for item in summary)
+    return f"🔕 {total} alerta(s) suprimido(s) pelo limite de taxa:\n" + "\n".join(lines)
+
+
+if __name__ == '__main__':
+    import random
+
+    random.seed(1)
+    dedup = AlertDeduplicator()
+    types = [('arduino1', 'arduino1_timeout', 'critical'), ('arduino1', 'pump_activated', 'info'),
+             ('arduino1', 'cooler_activated', 'info'), ('zona2', 'arduino1_timeout', 'critical')]
+
+    # 1 hora de alertas em rajada (um a cada 2 s, tipo aleatório)
+    sent = 0
+    for i in range(1800):
+        sent += dedup.allow(*random.choice(types), now=i * 2.0)
+    print(f"1800 alertas em 1h -> {sent} publicados, {dedup.stats['suppressed']} suprimidos")
+    print(format_summary(dedup.take_summary()))
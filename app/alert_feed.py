@@ -0,0 +1,164 @@
+"""
+Feed de alertas em tempo real para o dashboard (evento Socket.IO 'alert')
+
+Alertas (regras de limite) e ações dos atuadores são gravados pela
+IngestionQueue; a cada flush, notify() marca as tabelas alteradas (sem I/O,
+pode ser chamado de qualquer thread). Uma tarefa do loop do Socket.IO busca
+as linhas novas por id e as emite a todos os clientes.
+
+Retomada: ao (re)conectar, o cliente envia 'alerts_resume' com o último id
+que viu de cada tabela ({'alerts': id, 'actions': id}; null = nunca viu) e
+recebe, em ordem, o que perdeu (no máximo RESUME_LIMIT por tabela). O
+cliente guarda os ids já vistos, então uma linha que chegue pela retomada e
+pelo broadcast (em qualquer ordem) aparece uma vez só.
+"""
+import threading
+
+from database import get_rows_since, get_last_id
+from server_mode import run_blocking
+
+ALERT_EVENT = 'alert'
+TABLES = ('alerts', 'actions')
+FEED_INTERVAL = 0.25
+FEED_LIMIT = 500
+RESUME_LIMIT = 20
+# Espera máxima (s) entre tentativas de ler o cursor inicial
+CURSOR_RETRY_MAX = 30.0
+
+
+def to_event(table, row):
+    """Linha de alerts/actions no formato do evento 'alert' (mesmos campos de /api/alerts/latest)"""
+    if table == 'actions':
+        return {
+            'id': row['id'],
+            'source': 'actions',
+            'timestamp': row['timestamp'],
+            'ts': row['ts'],
+            'alert_type': row['action_type'],
+            'message': row['details'] or row['status'],
+            'severity': 'info',
+            'status': row['status']
+        }
+    return dict(row, source='alerts')
+
+
+class AlertFeed:
+    """
+    Args:
+        socketio: Instância flask_socketio.SocketIO
+        interval: Intervalo (s) entre verificações de tabelas alteradas
+        namespace: Namespace Socket.IO
+    """
+
+    def __init__(self, socketio, interval=FEED_INTERVAL, namespace='/'):
+        self.socketio = socketio
+        self.interval = interval
+        self.namespace = namespace
+
+        self._cursors = {}
+        self._dirty = set()
+        self._lock = threading.Lock()
+        self._running = False
+
+        self.stats = {
+            'pushed': 0,
+            'resumes': 0,
+            'resumed': 0
+        }
+
+    def notify(self, *tables):
+        """Tabelas gravadas (chamado pela IngestionQueue/rotas; não bloqueia)"""
+        with self._lock:
+            self._dirty.update(table for table in tables if table in TABLES)
+
+    # ==================== CLIENTES ====================
+
+    def resume(self, sid, cursors):
+        """Envia ao cliente as linhas posteriores aos seus cursores, em ordem de tempo"""
+        cursors = cursors if isinstance(cursors, dict) else {}
+        events = []
+        for table in TABLES:
+            last_id = cursors.get(table)
+            last_id = int(last_id) if isinstance(last_id, (int, float)) else None
+            rows = run_blocking(get_rows_since, table, last_id, RESUME_LIMIT, newest=True)
+            events += [to_event(table, row) for row in rows]
+        events.sort(key=lambda event: (event['ts'], event['id']))
+        for event in events:
+            self.socketio.emit(ALERT_EVENT, event, to=sid, namespace=self.namespace)
+        with self._lock:
+            self.stats['resumes'] += 1
+            self.stats['resumed'] += len(events)
+        return len(events)
+
+    # ==================== BROADCAST ====================
+
+    def poll(self):
+        """Emite a todos as linhas novas das tabelas marcadas (em lotes de FEED_LIMIT); retorna quantas"""
+        if any(table not in self._cursors for table in TABLES):
+            # Sem cursor inicial, "novo" seria a tabela inteira
+            return 0
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+        pushed = 0
+        while dirty:
+            events = []
+            for table in TABLES:
+                if table not in dirty:
+                    continue
+                rows = run_blocking(get_rows_since, table, self._cursors[table], FEED_LIMIT)
+                if rows:
+                    self._cursors[table] = rows[-1]['id']
+                    events += [to_event(table, row) for row in rows]
+                if len(rows) < FEED_LIMIT:
+                    # Alcançou o fim da tabela
+                    dirty.discard(table)
+            events.sort(key=lambda event: (event['ts'], event['id']))
+            for event in events:
+                self.socketio.emit(ALERT_EVENT, event, namespace=self.namespace)
+            pushed += len(events)
+        if pushed:
+            with self._lock:
+                self.stats['pushed'] += pushed
+        return pushed
+
+    # ==================== CICLO DE VIDA ====================
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self.socketio.start_background_task(self._run)
+
+    def stop(self):
+        self._running = False
+
+    def _init_cursors(self):
+        """Lê o último id de cada tabela ainda sem cursor; retorna True quando todas têm"""
+        try:
+            for table in TABLES:
+                if table not in self._cursors:
+                    self._cursors[table] = run_blocking(get_last_id, table)
+            return True
+        except Exception as e:
+            print(f"[WS ERROR] Feed de alertas sem cursor inicial: {e}")
+            return False
+
+    def _run(self):
+        # Só o que for gravado a partir de agora é "novo"; o passado vem pela retomada.
+        # Sem o cursor o feed não emite nada: tenta de novo com espera crescente
+        delay = self.interval
+        while self._running and not self._init_cursors():
+            self.socketio.sleep(delay)
+            delay = min(delay * 2, CURSOR_RETRY_MAX)
+        while self._running:
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"[WS ERROR] Falha no feed de alertas: {e}")
+            self.socketio.sleep(self.interval)
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+        stats['cursors'] = dict(self._cursors)
+        return stats
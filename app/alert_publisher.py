@@ -0,0 +1,364 @@
+"""
+Publicador de alertas em background (RabbitMQ) com confirmação e spool em disco
+
+As threads seriais só enfileiram o alerta (fila limitada em memória); uma
+thread dedicada é a única dona da conexão pika e:
+
+- publica em lotes (tudo o que estiver na fila, até BATCH_SIZE por vez) e
+  espera os publisher confirms do lote uma única vez (ConfirmPublisher):
+  um alerta só sai da fila/spool após o ack do broker
+- reconecta sozinha com backoff exponencial (RECONNECT_MIN..RECONNECT_MAX)
+- grava no spool (JSON lines em disco) o que não pôde ser publicado, seja
+  por queda do broker ou fila cheia, e reenvia o spool ao reconectar;
+  o spool também sobrevive a um reinício do processo
+- um alerta recusado pelo broker (nack/unroutable) não trava os demais: fica
+  no spool e é tentado de novo até MAX_REFUSALS vezes, depois vai para o
+  arquivo de rejeitados (<spool>.rejected); só a queda da conexão segura a fila
+
+A conexão é criada por connection_factory (padrão: ConfirmPublisher);
+broker_harness.py fornece um broker substituto em memória.
+"""
+import json
+import os
+import queue
+import threading
+import time
+
+from pika.exceptions import NackError, UnroutableError
+
+from rabbitmq_config import ConfirmPublisher, build_message
+
+QUEUE_SIZE = 1000
+BATCH_SIZE = 50
+RECONNECT_MIN = 1.0
+RECONNECT_MAX = 60.0
+MAX_REFUSALS = 3
+
+SPOOL_PATH = os.environ.get('GREENHOUSE_ALERT_SPOOL', 'alert_spool.jsonl')
+
+
+class AlertSpool:
+    """Arquivo JSON lines com os alertas ainda não confirmados pelo broker"""
+
+    def __init__(self, path=SPOOL_PATH):
+        self.path = path
+        self.rejected_path = path + '.rejected'
+        self._lock = threading.Lock()
+
+    def append(self, messages):
+        if not messages:
+            return
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                for message in messages:
+                    f.write(json.dumps(message) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+
+    def reject(self, message):
+        """Guarda um alerta que o broker recusou repetidamente (fora do spool)"""
+        with self._lock:
+            with open(self.rejected_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(message) + '\n')
+
+    def load(self):
+        with self._lock:
+            try:
+                with open(self.path, encoding='utf-8') as f:
+                    lines = f.readlines()
+            except FileNotFoundError:
+                return []
+        messages = []
+        for line in lines:
+            try:
+                messages.append(json.loads(line))
+            except ValueError:
+                # Última linha truncada (queda de energia durante a escrita)
+                pass
+        return messages
+
+    def discard(self, count, keep=()):
+        """
+        Remove os `count` alertas mais antigos (mantém o que foi anexado nesse meio tempo)
+
+        `keep` são alertas desse trecho que continuam pendentes: voltam ao
+        início do spool, na mesma ordem.
+        """
+        if count <= 0:
+            return
+        with self._lock:
+            try:
+                with open(self.path, encoding='utf-8') as f:
+                    lines = f.readlines()
+            except FileNotFoundError:
+                return
+            keep = [json.dumps(message) + '\n' for message in keep]
+            for line in lines:
+                if count > 0:
+                    try:
+                        json.loads(line)
+                        count -= 1
+                    except ValueError:
+                        pass
+                    continue
+                keep.append(line)
+            if not keep:
+                os.remove(self.path)
+                return
+            # Substitui atomicamente, via arquivo temporário
+            tmp = self.path + '.tmp'
+            with open(tmp, 'w', encoding='utf-8') as f:
+                f.writelines(keep)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+
+    def size(self):
+        with self._lock:
+            try:
+                with open(self.path, 'rb') as f:
+                    return sum(1 for _ in f)
+            except FileNotFoundError:
+                return 0
+
+
+class AlertPublisher:
+    """
+    Fila limitada + thread publicadora (mesma interface publish_alert do RabbitMQManager)
+
+    Args:
+        connection_factory: Função sem argumentos que retorna um objeto com
+            connect() -> bool, publish_batch(msgs) (ver ConfirmPublisher) e disconnect()
+        spool: AlertSpool (padrão: GREENHOUSE_ALERT_SPOOL ou alert_spool.jsonl)
+        queue_size: Tamanho máximo da fila em memória
+        batch_size: Máximo de alertas publicados por lote
+    """
+
+    def __init__(self, connection_factory=None, spool=None, queue_size=QUEUE_SIZE, batch_size=BATCH_SIZE,
+                 reconnect_min=RECONNECT_MIN, reconnect_max=RECONNECT_MAX):
+        self.connection_factory = connection_factory or ConfirmPublisher
+        self.spool = spool or AlertSpool()
+        self.batch_size = batch_size
+        self.reconnect_min = reconnect_min
+        self.reconnect_max = reconnect_max
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._conn = None
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._backoff = reconnect_min
+        self._next_attempt = 0.0
+        self._next_replay = 0.0
+        # Alerta recusado pelo broker (JSON) -> quantas vezes
+        self._refusals = {}
+
+        self.stats = {
+            'enqueued': 0,
+            'published': 0,
+            'batches': 0,
+            'spooled': 0,
+            'replayed': 0,
+            'failures': 0,
+            'rejected': 0,
+            'reconnects': 0,
+            'connected': False
+        }
+
+    # ==================== PRODUTORES ====================
+
+    def publish_alert(self, alert_data):
+        """Enfileira um alerta {type, message, severity} (não bloqueia)"""
+        message = build_message(alert_data)
+        try:
+            self._queue.put_nowait(message)
+            self._count('enqueued')
+        except queue.Full:
+            # Não bloqueia a thread serial nem perde o alerta
+            self.spool.append([message])
+            self._count('spooled')
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self.stats[key] += amount
+
+    # ==================== CICLO DE VIDA ====================
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True, name='alert-publisher')
+        self._thread.start()
+        print(f"[PUBLISHER] Publicador de alertas iniciado (spool: {self.spool.path}, pendentes: {self.spool.size()})")
+
+    def stop(self, timeout=10):
+        """Encerra a thread; o que não for publicado até lá fica no spool"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout)
+        self._thread = None
+        self.spool.append(self._drain(None))
+        self._disconnect()
+
+    def disconnect(self):
+        self.stop()
+
+    # ==================== THREAD PUBLICADORA ====================
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            if self._conn is None:
+                self._connect()
+            if self._conn is not None and not self._replay_spool():
+                self._stop_event.wait(self.reconnect_min)
+                continue
+
+            try:
+                first = self._queue.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            batch = [first] + self._drain(self.batch_size - 1)
+
+            if self._conn is not None:
+                batch = self._publish(batch)
+            self.spool.append(batch)
+            self._count('spooled', len(batch))
+        self._publish_remaining()
+
+    def _publish_remaining(self):
+        """Ao parar: tenta publicar o que resta na fila antes de ir para o spool"""
+        batch = self._drain(None)
+        if self._conn is not None and batch:
+            batch = self._publish(batch)
+        self.spool.append(batch)
+
+    def _drain(self, limit):
+        items = []
+        while limit is None or len(items) < limit:
+            try:
+                items.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return items
+
+    def _connect(self):
+        now = time.monotonic()
+        if now < self._next_attempt:
+            # Espera o backoff sem deixar de acordar com stop()
+            self._stop_event.wait(min(self._next_attempt - now, 1.0))
+            return
+        try:
+            conn = self.connection_factory()
+            connected = conn.connect()
+        except Exception as e:
+            print(f"[PUBLISHER] Falha ao conectar: {e}")
+            connected = False
+        if not connected:
+            self._next_attempt = time.monotonic() + self._backoff
+            print(f"[PUBLISHER] Broker indisponível; nova tentativa em {self._backoff:.0f}s")
+            self._backoff = min(self._backoff * 2, self.reconnect_max)
+            return
+        self._conn = conn
+        self._backoff = self.reconnect_min
+        with self._lock:
+            self.stats['reconnects'] += 1
+            self.stats['connected'] = True
+
+    def _disconnect(self):
+        conn, self._conn = self._conn, None
+        with self._lock:
+            self.stats['connected'] = False
+        if conn is not None:
+            try:
+                conn.disconnect()
+            except Exception:
+                pass
+
+    def _publish(self, batch):
+        """
+        Publica o lote e espera os confirms uma única vez
+
+        Returns:
+            Alertas do lote que continuam pendentes, na ordem: os sem
+            confirmação (conexão caiu) e os recusados ainda abaixo de MAX_REFUSALS
+        """
+        try:
+            results = self._conn.publish_batch(batch)
+        except Exception as e:
+            results = [e] * len(batch)
+
+        pending = []
+        lost = None
+        confirmed = 0
+        for message, result in zip(batch, results):
+            if result is None:
+                confirmed += 1
+                if self._refusals:
+                    self._refusals.pop(json.dumps(message, sort_keys=True), None)
+            elif isinstance(result, (NackError, UnroutableError)):
+                # Recusado pelo broker, mas a conexão continua utilizável
+                print(f"[PUBLISHER] Alerta recusado pelo broker ({message.get('type')}): {result}")
+                self._count('failures')
+                if not self._refused(message):
+                    pending.append(message)
+                self._next_replay = time.monotonic() + self.reconnect_min
+            else:
+                lost = result
+                pending.append(message)
+
+        if confirmed:
+            with self._lock:
+                self.stats['published'] += confirmed
+                self.stats['batches'] += 1
+        if lost is not None:
+            print(f"[PUBLISHER] Falha ao publicar: {lost}")
+            self._count('failures')
+            self._disconnect()
+            self._next_attempt = time.monotonic() + self._backoff
+        return pending
+
+    def _refused(self, message):
+        """Conta uma recusa do alerta; True se ele passou de MAX_REFUSALS e foi para os rejeitados"""
+        key = json.dumps(message, sort_keys=True)
+        refusals = self._refusals.get(key, 0) + 1
+        if refusals < MAX_REFUSALS:
+            self._refusals[key] = refusals
+            return False
+        self._refusals.pop(key, None)
+        print(f"[PUBLISHER] Alerta recusado {refusals}x, movido para {self.spool.rejected_path}")
+        self.spool.reject(message)
+        self._count('rejected')
+        return True
+
+    def _replay_spool(self):
+        """
+        Reenvia o spool (mais antigos primeiro); False só se a conexão caiu no meio
+
+        Alertas recusados pelo broker não seguram os seguintes: continuam no
+        spool, na mesma posição, e voltam a ser tentados após reconnect_min.
+        """
+        if time.monotonic() < self._next_replay:
+            return True
+        pending = self.spool.load()
+        if not pending:
+            return True
+        print(f"[PUBLISHER] Reenviando {len(pending)} alerta(s) do spool")
+        processed = 0
+        keep = []
+        for start in range(0, len(pending), self.batch_size):
+            batch = pending[start:start + self.batch_size]
+            keep += self._publish(batch)
+            processed += len(batch)
+            if self._conn is None or self._stop_event.is_set():
+                break
+        self.spool.discard(processed, keep)
+        self._count('replayed', processed - len(keep))
+        return self._conn is not None
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+        stats['queue_depth'] = self._queue.qsize()
+        stats['spool_depth'] = self.spool.size()
+        return stats
@@ -0,0 +1,254 @@
+"""
+Motor de regras de alerta (limites) vetorizado com NumPy
+
+As regras são declarativas (DEFAULT_RULES) e comparam uma métrica com um
+limite de DualArduinoManager.thresholds. Um lote de leituras (de um ou mais
+nós) é avaliado para todas as regras de uma vez, e só as TRANSIÇÕES de estado
+viram alertas:
+
+- histerese: o alerta só é resolvido quando o valor volta além do limite
+  com uma folga (evita alternar quando o valor oscila sobre o limite)
+- debounce: são necessárias N amostras seguidas para mudar de estado
+- cooldown: uma regra não notifica de novo no mesmo nó antes de N segundos
+
+Uma temperatura presa acima do limite gera um único alerta (e um único
+"normalizado" quando volta), em vez de uma linha por amostra.
+"""
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+
+METRICS = ('temperature', 'humidity', 'soil_moisture', 'light_level')
+
+DEFAULT_DEBOUNCE = 3
+DEFAULT_COOLDOWN = 300
+
+AlertRule = namedtuple('AlertRule', (
+    'alert_type', 'metric', 'op', 'threshold', 'severity', 'message',
+    'hysteresis', 'debounce', 'cooldown'
+), defaults=(0.0, DEFAULT_DEBOUNCE, DEFAULT_COOLDOWN))
+
+AlertEvent = namedtuple('AlertEvent', ('node_id', 'rule', 'resolved', 'value', 'ts'))
+
+DEFAULT_RULES = (
+    AlertRule('high_temperature', 'temperature', '>', 'temp_max', 'warning', 'Temp alta: {value}°C', hysteresis=1.0),
+    AlertRule('low_temperature', 'temperature', '<', 'temp_min', 'warning', 'Temp baixa: {value}°C', hysteresis=1.0),
+    AlertRule('low_soil_moisture', 'soil_moisture', '<', 'soil_min', 'critical', 'Solo seco: {value}%', hysteresis=3.0),
+    AlertRule('low_humidity', 'humidity', '<', 'humid_min', 'warning', 'Umidade baixa: {value}%', hysteresis=3.0),
+)
+
+
+class AlertEngine:
+    """
+    Avalia as regras sobre lotes de leituras mantendo o estado por (nó, regra)
+
+    Args:
+        thresholds: Dict de limites (o mesmo objeto do gerenciador, então
+            alterações feitas pelo teclado/website valem no lote seguinte)
+        rules: Sequência de AlertRule
+    """
+
+    def __init__(self, thresholds, rules=DEFAULT_RULES):
+        self.thresholds = thresholds
+        self.rules = tuple(rules)
+        for rule in self.rules:
+            if rule.metric not in METRICS or rule.op not in ('>', '<'):
+                raise ValueError(f"Regra inválida: {rule}")
+
+        self._columns = np.array([METRICS.index(rule.metric) for rule in self.rules])
+        self._above = np.array([rule.op == '>' for rule in self.rules])
+        self._hysteresis = np.array([rule.hysteresis for rule in self.rules], dtype=float)
+        self._debounce = np.array([max(1, rule.debounce) for rule in self.rules])
+
+        # Estado por nó (linhas) e regra (colunas)
+        self._nodes = {}
+        self._node_ids = []
+        size = (0, len(self.rules))
+        self._active = np.zeros(size, dtype=bool)
+        self._notified = np.zeros(size, dtype=bool)
+        self._sign = np.zeros(size, dtype=np.int8)
+        self._count = np.zeros(size, dtype=np.int64)
+        self._last_fired = np.full(size, -np.inf)
+        self._lock = threading.Lock()
+
+        self.stats = {
+            'evaluated': 0,
+            'batches': 0,
+            'raised': 0,
+            'resolved': 0,
+            'suppressed': 0,
+            'last_eval_ms': 0.0
+        }
+
+    def _node_index(self, node_id):
+        index = self._nodes.get(node_id)
+        if index is None:
+            index = self._nodes[node_id] = len(self._node_ids)
+            self._node_ids.append(node_id)
+            grow = lambda array, value: np.vstack([array, np.full((1, len(self.rules)), value, dtype=array.dtype)])
+            self._active = grow(self._active, False)
+            self._notified = grow(self._notified, False)
+            self._sign = grow(self._sign, 0)
+            self._count = grow(self._count, 0)
+            self._last_fired = grow(self._last_fired, -np.inf)
+        return index
+
+    def _limits(self):
+        return np.array([float(self.thresholds[rule.threshold]) for rule in self.rules])
+
+    def evaluate(self, node_ids, values, ts):
+        """
+        Avalia um lote de leituras
+
+        Args:
+            node_ids: Sequência com o nó de cada leitura
+            values: Array (n, 4) na ordem de METRICS
+            ts: Epoch de cada leitura
+
+        Returns:
+            Lista de AlertEvent (transições notificáveis), em ordem de tempo por nó
+        """
+        start = time.perf_counter()
+        values = np.asarray(values, dtype=float).reshape(-1, len(METRICS))
+        ts = np.asarray(ts, dtype=float)
+        n = len(values)
+        if not n:
+            return []
+
+        with self._lock:
+            events = self._evaluate(node_ids, values, ts, n)
+            self.stats['evaluated'] += n
+            self.stats['batches'] += 1
+            self.stats['last_eval_ms'] = (time.perf_counter() - start) * 1000
+        return events
+
+    def _evaluate(self, node_ids, values, ts, n):
+        nodes = np.fromiter((self._node_index(node_id) for node_id in node_ids), dtype=np.int64, count=n)
+        order = np.argsort(nodes, kind='stable')
+        nodes, values, ts = nodes[order], values[order], ts[order]
+
+        # +1: acima do limite (quer ativar) / -1: além da histerese (quer resolver) / 0: faixa morta
+        x = values[:, self._columns]
+        limits = self._limits()
+        breach = np.where(self._above, x > limits, x < limits)
+        clear = np.where(self._above, x <= limits - self._hysteresis, x >= limits + self._hysteresis)
+        signal = breach.astype(np.int8) - clear.astype(np.int8)
+
+        # Segmentos contíguos por nó (o lote foi ordenado por nó, estável no tempo)
+        idx = np.arange(n)
+        node_start = np.ones(n, dtype=bool)
+        node_start[1:] = nodes[1:] != nodes[:-1]
+        seg_start = np.maximum.accumulate(np.where(node_start, idx, 0))
+
+        # Posição de cada amostra dentro da sequência de sinais iguais
+        new_run = node_start[:, None] | np.vstack([np.ones((1, len(self.rules)), dtype=bool), signal[1:] != signal[:-1]])
+        run_start = np.maximum.accumulate(np.where(new_run, idx[:, None], 0), axis=0)
+        pos = idx[:, None] - run_start
+        # A primeira sequência de cada nó continua a contagem do lote anterior
+        carry = (run_start == seg_start[:, None]) & (signal == self._sign[nodes])
+        pos = pos + np.where(carry, self._count[nodes], 0)
+
+        # Debounce: um evento quando a sequência atinge exatamente N amostras
+        event = (signal != 0) & (pos + 1 == self._debounce)
+
+        # Estado antes de cada evento: último evento anterior no mesmo nó, ou o estado salvo
+        initial = np.where(self._active[nodes], 1, -1).astype(np.int8)
+        last_event = np.maximum.accumulate(np.where(event, idx[:, None], -1), axis=0)
+        has_event = last_event >= seg_start[:, None]
+        state_after = np.where(has_event, np.take_along_axis(signal, np.maximum(last_event, 0), axis=0), initial)
+        state_before = np.vstack([initial[:1], state_after[:-1]])
+        state_before = np.where(node_start[:, None], initial, state_before)
+        transition = event & (signal != state_before)
+
+        # Estado persistente ao fim do lote (última amostra de cada nó)
+        node_end = np.ones(n, dtype=bool)
+        node_end[:-1] = nodes[1:] != nodes[:-1]
+        last_rows = idx[node_end]
+        last_nodes = nodes[last_rows]
+        self._active[last_nodes] = state_after[last_rows] == 1
+        self._sign[last_nodes] = signal[last_rows]
+        self._count[last_nodes] = np.where(signal[last_rows] != 0, np.minimum(pos[last_rows] + 1, self._debounce), 0)
+
+        # Transições são raras: cooldown e notificação em Python
+        events = []
+        for row, col in zip(*np.nonzero(transition)):
+            node = nodes[row]
+            rule = self.rules[col]
+            value = x[row, col]
+            if signal[row, col] == 1:
+                if ts[row] - self._last_fired[node, col] < rule.cooldown:
+                    self._notified[node, col] = False
+                    self.stats['suppressed'] += 1
+                    continue
+                self._last_fired[node, col] = ts[row]
+                self._notified[node, col] = True
+                self.stats['raised'] += 1
+                events.append(AlertEvent(self._node_ids[node], rule, False, value, ts[row]))
+            elif self._notified[node, col]:
+                # Só resolve o que foi notificado
+                self._notified[node, col] = False
+                self.stats['resolved'] += 1
+                events.append(AlertEvent(self._node_ids[node], rule, True, value, ts[row]))
+        return events
+
+    def active_alerts(self):
+        """Lista (node_id, alert_type) das regras atualmente em alerta"""
+        with self._lock:
+            return [(self._node_ids[node], self.rules[col].alert_type) for node, col in zip(*np.nonzero(self._active))]
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats['active'] = int(self._active.sum())
+        stats['last_eval_ms'] = round(stats['last_eval_ms'], 3)
+        return stats
+
+
+def format_event(event, default_node=None):
+    """(alert_type, message, severity) de um AlertEvent, no formato da tabela alerts"""
+    rule = event.rule
+    value = round(float(event.value), 1)
+    message = rule.message.format(value=value)
+    if event.node_id != default_node:
+        message = f"[{event.node_id}] {message}"
+    if event.resolved:
+        return f"{rule.alert_type}_resolved", f"Normalizado - {message}", 'info'
+    return rule.alert_type, message, rule.severity
+
+
+if __name__ == '__main__':
+    import sys
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    thresholds = {'temp_max': 35.0, 'temp_min': 15.0, 'humid_min': 40.0, 'soil_min': 30.0}
+
+    rng = np.random.default_rng(1)
+    values = np.column_stack([
+        25 + 12 * np.sin(np.arange(count) / 500) + rng.normal(0, 0.5, count),
+        rng.uniform(35, 80, count),
+        rng.uniform(25, 90, count),
+        rng.uniform(0, 100, count),
+    ])
+    ts = time.time() + np.arange(count) * 5.0
+    nodes = ['arduino1'] * count
+
+    # Regra antiga: um alerta por amostra fora do limite
+    start = time.perf_counter()
+    naive = 0
+    for temp, humid, soil, _ in values.tolist():
+        naive += (temp > thresholds['temp_max']) + (temp < thresholds['temp_min']) + \
+                 (soil < thresholds['soil_min']) + (humid < thresholds['humid_min'])
+    naive_ms = (time.perf_counter() - start) * 1000
+
+    engine = AlertEngine(thresholds)
+    start = time.perf_counter()
+    events = []
+    for i in range(0, count, 200):
+        events += engine.evaluate(nodes[i:i + 200], values[i:i + 200], ts[i:i + 200])
+    engine_ms = (time.perf_counter() - start) * 1000
+
+    print(f"{count:,} leituras:")
+    print(f"  if-statements por leitura: {naive:>8,} alertas  {naive_ms:8.1f} ms")
+    print(f"  AlertEngine (lotes de 200): {len(events):>7,} alertas  {engine_ms:8.1f} ms  {engine.get_stats()}")
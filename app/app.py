@@ -1,8 +1,12 @@
-from flask import Flask, render_template, jsonify, request
+from flask import Flask, render_template, jsonify, request, Response, stream_with_context
 from flask_socketio import SocketIO, emit
 from flask_cors import CORS
 import json
-from datetime import datetime
+import csv
+import io
+import zlib
+import os
+from datetime import datetime, timezone
 import threading
 import time
 import traceback
@@ -13,12 +17,26 @@ from database import (
     insert_action,
     get_latest_readings, 
     get_readings_by_timerange,
+    iter_history_rows,
+    history_step,
+    iter_table_rows,
+    history_uses_raw,
     get_latest_alerts,
-    get_statistics
+    get_statistics,
+    close_database,
+    EXPORT_COLUMNS
 )
+from downsampling import reduce_history, bucket_average, METRICS, MODES
+from retention import PurgeService
+from message_parser import VERBOSE as SERIAL_VERBOSE
+from broadcast_hub import BroadcastHub
+from server_mode import SERVER_MODE, run_blocking, iter_blocking, run_server
+from response_cache import ResponseCache
+from alert_feed import AlertFeed
 
 try:
     from dual_arduino_manager import DualArduinoManager
+    from fleet_manager import FleetManager
     ARDUINO_AVAILABLE = True
 except ImportError:
     print("⚠️  dual_arduino_manager não encontrado - modo sem hardware")
@@ -31,19 +49,37 @@ except ImportError:
     print("⚠️  RabbitMQ não disponível")
     RABBITMQ_AVAILABLE = False
 
+# GREENHOUSE_FLEET=1: N nós sensores/teclado (fleet_manager.py) em vez de exatamente 2 Arduinos
+FLEET_MODE = os.environ.get('GREENHOUSE_FLEET', '') not in ('', '0')
+PORT = int(os.environ.get('GREENHOUSE_PORT', '5000'))
+
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'greenhouse_secret_2025'
 CORS(app)
 
-socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading')
+# GREENHOUSE_SERVER=eventlet|gevent: servidor cooperativo (server_mode.py)
+socketio = SocketIO(app, cors_allowed_origins="*", async_mode=SERVER_MODE)
 
 arduino_manager = None
 arduino_connected = False
+purge_service = PurgeService()
+# Envio para os dashboards desacoplado da leitura serial (deltas a GREENHOUSE_WS_HZ)
+broadcast_hub = BroadcastHub(socketio)
+# Respostas das rotas de leitura (invalidadas a cada flush da ingestão)
+api_cache = ResponseCache()
+# Alertas e ações dos atuadores enviados aos dashboards (evento 'alert')
+alert_feed = AlertFeed(socketio)
+
+def on_ingestion_flush(*tables):
+    """Chamado pela IngestionQueue após gravar um lote"""
+    api_cache.invalidate(*tables)
+    alert_feed.notify(*tables)
 
 def on_arduino_data(data):
     """Callback quando dados chegam do Arduino 1"""
-    socketio.emit('sensor_data', data, namespace='/')
-    print(f"[WS] Dados emitidos: T:{data.get('temp')}°C H:{data.get('humid')}% S:{data.get('soil')}%")
+    broadcast_hub.publish(data)
+    if SERIAL_VERBOSE:
+        print(f"[WS] Dados recebidos: T:{data.get('temp')}°C H:{data.get('humid')}% S:{data.get('soil')}%")
 
 def init_arduinos():
     """Inicializa conexão com os 2 Arduinos"""
@@ -54,15 +90,17 @@ def init_arduinos():
         return False
     
     try:
-        arduino_manager = DualArduinoManager(
+        manager_class = FleetManager if FLEET_MODE else DualArduinoManager
+        arduino_manager = manager_class(
             callback=on_arduino_data,
             use_rabbitmq=RABBITMQ_AVAILABLE
         )
+        arduino_manager.ingestion.on_flush = on_ingestion_flush
         
         if arduino_manager.connect():
             arduino_manager.start()
             arduino_connected = True
-            print("[APP] ✓ 2 Arduinos conectados!")
+            print("[APP] ✓ Frota de nós iniciada!" if FLEET_MODE else "[APP] ✓ 2 Arduinos conectados!")
             return True
         else:
             print("[APP] ✗ Falha ao conectar Arduinos")
@@ -74,6 +112,10 @@ def init_arduinos():
         arduino_connected = False
         return False
 
+def recent_cache():
+    """Cache em memória das leituras recentes (None sem hardware)"""
+    return arduino_manager.recent if arduino_manager else None
+
 # ==================== ROTAS HTTP ====================
 
 @app.route('/')
@@ -86,18 +128,33 @@ def api_status():
     """Status do sistema"""
     return jsonify({
         'status': 'online',
+        'server_mode': SERVER_MODE,
         'arduino_connected': arduino_connected,
         'arduino1': 'connected' if arduino_manager and hasattr(arduino_manager, 'ser1') and arduino_manager.ser1 else 'disconnected',
         'arduino2': 'connected' if arduino_manager and hasattr(arduino_manager, 'ser2') and arduino_manager.ser2 else 'disconnected',
+        'ingestion': arduino_manager.ingestion.get_stats() if arduino_manager else None,
+        'alert_rules': arduino_manager.alert_engine.get_stats() if arduino_manager else None,
+        'alert_dedup': arduino_manager.alert_dedup.get_stats() if arduino_manager else None,
+        'alert_publisher': arduino_manager.rabbitmq.get_stats() if arduino_manager and arduino_manager.rabbitmq else None,
+        'nodes': arduino_manager.get_nodes() if arduino_manager and hasattr(arduino_manager, 'get_nodes') else None,
+        'binary_protocol': arduino_manager.get_protocol_stats() if arduino_manager else None,
+        'retention': purge_service.get_stats(),
+        'websocket': broadcast_hub.get_stats(),
+        'api_cache': api_cache.get_stats(),
+        'alert_feed': alert_feed.get_stats(),
         'timestamp': datetime.now().isoformat()
     })
 
 @app.route('/api/readings/latest')
+@api_cache.cached(ttl=5, depends=('readings',))
 def api_latest_readings():
     """Últimas leituras do banco"""
     try:
         limit = request.args.get('limit', 10, type=int)
-        readings = get_latest_readings(limit)
+        cache = recent_cache()
+        readings = cache.latest(limit) if cache else None
+        if readings is None:
+            readings = run_blocking(get_latest_readings, limit)
         return jsonify(readings)
     except Exception as e:
         print(f"[API ERROR] /api/readings/latest: {e}")
@@ -108,67 +165,202 @@ def api_readings_history():
     """Histórico de leituras"""
     try:
         hours = request.args.get('hours', 24, type=int)
-        readings = get_readings_by_timerange(hours)
+        cache = recent_cache()
+        readings = cache.since_dicts(time.time() - hours * 3600) if cache else None
+        if readings is None:
+            readings = run_blocking(get_readings_by_timerange, hours)
         return jsonify(readings)
     except Exception as e:
         print(f"[API ERROR] /api/readings/history: {e}")
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/history', methods=['GET'])
+@api_cache.cached(ttl=30, depends=('readings',))
 def get_history_data():
-    """Endpoint para alimentar o gráfico com dados históricos"""
+    """
+    Endpoint para alimentar o gráfico com dados históricos
+
+    Query params:
+        hours: Janela em horas (padrão 24)
+        points: Número máximo de pontos (padrão 200)
+        metric: Série que guia a redução (padrão temperature)
+        mode: lttb (padrão), minmax ou avg
+        since: Cursor (epoch ou ISO) devolvido por uma resposta anterior; só
+               vêm os intervalos a partir dele (implica mode=avg)
+        node: node_id de uma zona (padrão: todos os nós juntos)
+
+    No modo avg cada ponto é a média de um intervalo fixo de `step` segundos,
+    alinhado no tempo: o primeiro ponto de uma resposta com since substitui o
+    último que o cliente já tem (intervalo ainda aberto) e os demais são novos.
+    """
     try:
-        history = get_readings_by_timerange(hours=24)
-
-        labels = []
-        temps = []
-        humids = []
-        soils = []
-        lights = []
-
-        sample_rate = 1
-        if len(history) > 200:
-            sample_rate = len(history) // 200
-
-        for i, reading in enumerate(history):
-            if i % sample_rate == 0:
-                labels.append(reading['timestamp'])
-                temps.append(reading['temperature'])
-                humids.append(reading['humidity'])
-                soils.append(reading['soil_moisture'])
-                lights.append(reading['light_level'])
+        hours = request.args.get('hours', 24, type=float)
+        points = request.args.get('points', 200, type=int)
+        metric = request.args.get('metric', 'temperature')
+        mode = request.args.get('mode', 'lttb')
+        node = request.args.get('node') or None
+        try:
+            since = _parse_time(request.args.get('since'))
+        except ValueError:
+            return jsonify({"success": False, "message": "since inválido (use o cursor da resposta anterior)"}), 400
+        if since is not None:
+            mode = 'avg'
+
+        if metric not in METRICS or mode not in MODES or hours <= 0 or points < 3:
+            return jsonify({
+                "success": False,
+                "message": f"Parâmetros inválidos (metric: {', '.join(METRICS)}; mode: {', '.join(MODES)}; hours > 0; points >= 3)"
+            }), 400
+
+        step = history_step(hours, points) if mode == 'avg' else None
+        start = time.time() - hours * 3600
+        if step:
+            start = max(start, since or 0) // step * step
+
+        rows = None
+        cache = recent_cache()
+        if cache and history_uses_raw(hours, points):
+            rows = cache.since(start, node)
+        if rows is None:
+            rows = iter_history_rows(hours, points, since=start if step else None, node_id=node)
+
+        if step:
+            ts, series = run_blocking(bucket_average, rows, step)
+        else:
+            ts, series = run_blocking(reduce_history, rows, metric, points, mode)
+
+        ts = ts.tolist()
+        labels = [time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(t)) for t in ts]
+        extra = {"ts": ts, "step": step, "cursor": ts[-1] if ts else start} if step else {}
 
         return jsonify({
             "success": True,
             "labels": labels,
             "datasets": [
-                {"label": "Temperatura", "data": temps},
-                {"label": "Umidade Ar", "data": humids},
-                {"label": "Umidade Solo", "data": soils},
-                {"label": "Luz", "data": lights}
-            ]
+                {"label": "Temperatura", "data": series['temperature'].tolist()},
+                {"label": "Umidade Ar", "data": series['humidity'].tolist()},
+                {"label": "Umidade Solo", "data": series['soil_moisture'].tolist()},
+                {"label": "Luz", "data": series['light_level'].tolist()}
+            ],
+            "hours": hours,
+            "points": len(labels),
+            "metric": metric,
+            "mode": mode,
+            "node": node,
+            **extra
         })
     except Exception as e:
         print(f"[API ERROR] /api/history: {e}")
         traceback.print_exc()
         return jsonify({"success": False, "message": str(e)}), 500
 
+def _parse_time(value):
+    """Aceita epoch (segundos) ou data ISO em UTC ('2025-11-18' / '2025-11-18T10:30:00')"""
+    if value is None or value == '':
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        parsed = datetime.fromisoformat(value)
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return parsed.timestamp()
+
+def _export_ndjson(columns, batches):
+    for batch in batches:
+        yield ''.join(json.dumps(dict(zip(columns, row)), ensure_ascii=False) + '\n' for row in batch)
+
+def _export_csv(columns, batches):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for batch in batches:
+        writer.writerows(batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def _gzip_stream(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+@app.route('/api/export')
+def api_export():
+    """
+    Exportação em streaming (memória constante)
+
+    Query params:
+        table: readings (padrão), alerts ou actions
+        format: ndjson (padrão) ou csv
+        start / end: epoch ou data ISO (UTC); alternativa: hours=N
+        columns: Lista separada por vírgulas (padrão: todas)
+        gzip: 1 para comprimir durante o envio
+    """
+    try:
+        table = request.args.get('table', 'readings')
+        fmt = request.args.get('format', 'ndjson')
+        columns = [c.strip() for c in request.args.get('columns', '').split(',') if c.strip()]
+        compress = request.args.get('gzip', '0') in ('1', 'true', 'yes')
+
+        start = _parse_time(request.args.get('start'))
+        end = _parse_time(request.args.get('end'))
+        hours = request.args.get('hours', type=float)
+        if hours and start is None:
+            start = time.time() - hours * 3600
+
+        if fmt not in ('ndjson', 'csv'):
+            return jsonify({'error': 'format deve ser ndjson ou csv'}), 400
+
+        batches = iter_blocking(iter_table_rows(table, columns or None, start, end))
+        # Valida tabela/colunas antes de começar a resposta
+        first = next(batches, None)
+        columns = columns or list(EXPORT_COLUMNS[table])
+
+        def all_batches():
+            if first is not None:
+                yield first
+                yield from batches
+
+        body = _export_csv(columns, all_batches()) if fmt == 'csv' else _export_ndjson(columns, all_batches())
+        mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+        headers = {'Content-Disposition': f'attachment; filename={table}.{fmt}'}
+
+        if compress:
+            body = _gzip_stream(body)
+            headers['Content-Encoding'] = 'gzip'
+
+        return Response(stream_with_context(body), mimetype=mimetype, headers=headers)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        print(f"[API ERROR] /api/export: {e}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/alerts/latest')
+@api_cache.cached(ttl=60, depends=('alerts',))
 def api_latest_alerts():
     """Últimos alertas"""
     try:
         limit = request.args.get('limit', 10, type=int)
-        alerts = get_latest_alerts(limit)
+        alerts = run_blocking(get_latest_alerts, limit)
         return jsonify(alerts)
     except Exception as e:
         print(f"[API ERROR] /api/alerts/latest: {e}")
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/statistics')
+@api_cache.cached(ttl=60, depends=('readings', 'alerts'))
 def api_statistics():
-    """Estatísticas gerais"""
+    """Estatísticas gerais (?node=<node_id> para uma zona)"""
     try:
-        stats = get_statistics()
+        node = request.args.get('node') or None
+        stats = run_blocking(get_statistics, node_id=node)
         return jsonify(stats)
     except Exception as e:
         print(f"[API ERROR] /api/statistics: {e}")
@@ -224,11 +416,13 @@ def api_set_thresholds():
         if not arduino_connected or not arduino_manager:
             print("[API] Sem Arduino - salvando apenas no banco")
             
-            insert_action(
+            run_blocking(
+                insert_action,
                 'thresholds_update',
                 'completed',
                 f'Thresholds atualizados via web: {json.dumps(data)}'
             )
+            alert_feed.notify('actions')
             
             return jsonify({
                 'success': True,
@@ -238,7 +432,7 @@ def api_set_thresholds():
             })
         
         if hasattr(arduino_manager, 'update_thresholds_from_app'):
-            success, message = arduino_manager.update_thresholds_from_app(data)
+            success, message = run_blocking(arduino_manager.update_thresholds_from_app, data)
         else:
             print("[API] Método update_thresholds_from_app não existe - usando fallback")
             
@@ -253,7 +447,7 @@ def api_set_thresholds():
             if 'luzMin' in data:
                 arduino_manager.thresholds['light_min'] = float(data['luzMin'])
             
-            arduino_manager.send_thresholds_to_arduino1()
+            run_blocking(arduino_manager.send_thresholds_to_arduino1)
             
             success = True
             message = "Thresholds atualizados"
@@ -287,10 +481,11 @@ def api_irrigate():
         if not arduino_connected:
             return jsonify({'error': 'Arduinos não conectados'}), 503
         
-        success = arduino_manager.send_command_to_arduino1('IRRIGATE')
+        success = run_blocking(arduino_manager.send_command_to_arduino1, 'IRRIGATE')
         
         if success:
-            insert_action('irrigation', 'completed', 'Irrigação manual via API')
+            run_blocking(insert_action, 'irrigation', 'completed', 'Irrigação manual via API')
+            alert_feed.notify('actions')
             return jsonify({'success': True, 'message': 'Irrigação ativada'})
         else:
             return jsonify({'error': 'Falha ao enviar'}), 500
@@ -311,14 +506,20 @@ def handle_connect():
         'thresholds': arduino_manager.thresholds if arduino_manager else {}
     })
     
-    if arduino_manager and hasattr(arduino_manager, 'last_sensor_data'):
-        emit('sensor_data', arduino_manager.last_sensor_data)
+    broadcast_hub.add_client(request.sid)
 
 @socketio.on('disconnect')
 def handle_disconnect():
     """Cliente desconectou"""
+    broadcast_hub.remove_client(request.sid)
     print(f"[WS] Cliente desconectado: {request.sid}")
 
+@socketio.on('sensor_ack')
+def handle_sensor_ack(frame):
+    """Cliente consumiu os frames de sensores até frame['seq'] (controle de clientes lentos)"""
+    if isinstance(frame, dict):
+        broadcast_hub.ack(request.sid, frame.get('seq'))
+
 @socketio.on('request_data')
 def handle_request_data():
     """Cliente solicita dados atuais"""
@@ -327,6 +528,11 @@ def handle_request_data():
     else:
         emit('sensor_data', {'error': 'Sem dados'})
 
+@socketio.on('alerts_resume')
+def handle_alerts_resume(cursors):
+    """Cliente (re)conectou: envia os alertas/ações posteriores aos últimos ids que ele viu"""
+    alert_feed.resume(request.sid, cursors)
+
 # ==================== BACKGROUND ====================
 
 def background_tasks():
@@ -334,10 +540,15 @@ def background_tasks():
     if not RABBITMQ_AVAILABLE:
         return
     
-    rabbit_for_reports = RabbitMQManager()
-    if not rabbit_for_reports.connect():
-        print("✗ [BG-TASK] RabbitMQ não disponível")
-        return
+    # Reaproveita o publicador do gerenciador (thread-safe, com spool); sem hardware,
+    # usa uma conexão própria (RabbitMQManager reconecta a cada publicação se preciso)
+    if arduino_manager and arduino_manager.rabbitmq:
+        rabbit_for_reports = arduino_manager.rabbitmq
+    else:
+        rabbit_for_reports = RabbitMQManager()
+        if not rabbit_for_reports.connect():
+            print("✗ [BG-TASK] RabbitMQ não disponível")
+            return
 
     last_report_time = time.time()
     REPORT_INTERVAL = 14400
@@ -384,13 +595,17 @@ if __name__ == '__main__':
     print("\n[3/3] Iniciando background...")
     bg_thread = threading.Thread(target=background_tasks, daemon=True)
     bg_thread.start()
+    purge_service.start()
+    broadcast_hub.start()
+    alert_feed.start()
     print("      ✓ Background ativo!")
     
     print("\n" + "=" * 70)
     print(" SERVIDOR INICIADO!")
     print("=" * 70)
-    print("\n 🌐 Dashboard: http://localhost:5000")
-    print(" 📡 API: http://localhost:5000/api/status")
+    print(f"\n 🌐 Dashboard: http://localhost:{PORT}")
+    print(f" 📡 API: http://localhost:{PORT}/api/status")
+    print(f" ⚙️  Servidor: {SERVER_MODE}")
     
     if arduino_connected:
         print(f"\n ✓ Arduino 1: {arduino_manager.port1}")
@@ -403,16 +618,13 @@ if __name__ == '__main__':
     print("=" * 70 + "\n")
     
     try:
-        socketio.run(
-            app, 
-            host='0.0.0.0', 
-            port=5000, 
-            debug=False,
-            use_reloader=False,
-            allow_unsafe_werkzeug=True
-        )
+        run_server(socketio, app, port=PORT)
     except KeyboardInterrupt:
         print("\n\n[APP] Encerrando...")
+        purge_service.stop()
+        broadcast_hub.stop()
+        alert_feed.stop()
         if arduino_manager:
             arduino_manager.stop()
+        close_database()
         print("[APP] ✓ Encerrado!")
\ No newline at end of file
@@ -0,0 +1,203 @@
+"""
+Arquivo colunar (Parquet) das leituras antigas
+
+Leituras que saem do SQLite são gravadas em um arquivo por dia (UTC):
+    archive/readings/date=YYYY-MM-DD.parquet  (compressão zstd)
+
+A leitura usa memory map, então consultas longas não carregam o SQLite
+nem o arquivo inteiro na memória do processo.
+
+Requer pyarrow (opcional). Sem ele, clear_old_data apenas remove os dados.
+"""
+import calendar
+import glob
+import os
+import time
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+ARCHIVE_DIR = os.environ.get('GREENHOUSE_ARCHIVE_DIR', 'archive')
+COMPRESSION = 'zstd'
+DAY = 86400
+
+READINGS_SCHEMA = (
+    ('id', 'int64'),
+    ('timestamp', 'string'),
+    ('ts', 'int64'),
+    ('temperature', 'float64'),
+    ('humidity', 'float64'),
+    ('soil_moisture', 'int64'),
+    ('light_level', 'int64'),
+    ('node_id', 'string'),
+)
+
+# Partições gravadas antes da coluna node_id pertencem ao nó único original
+LEGACY_DEFAULTS = {'node_id': 'arduino1'}
+
+
+def _schema():
+    return pa.schema([(name, getattr(pa, type_name)()) for name, type_name in READINGS_SCHEMA])
+
+
+def _partition_path(day_start, archive_dir=None):
+    day = time.strftime('%Y-%m-%d', time.gmtime(day_start))
+    return os.path.join(archive_dir or ARCHIVE_DIR, 'readings', f'date={day}.parquet')
+
+
+def _read_partition(path, columns=None):
+    """Lê uma partição (memory map), preenchendo colunas que ela ainda não tinha"""
+    available = pq.ParquetFile(path).schema_arrow.names
+    wanted = list(columns) if columns else [name for name, _ in READINGS_SCHEMA]
+    table = pq.read_table(path, columns=[c for c in wanted if c in available], memory_map=True)
+    for index, name in enumerate(wanted):
+        if name not in available:
+            field = _schema().field(name)
+            table = table.add_column(index, field, pa.array([LEGACY_DEFAULTS.get(name)] * table.num_rows, type=field.type))
+    return table
+
+
+def partitions(archive_dir=None):
+    """Lista (day_start, caminho) das partições existentes, em ordem cronológica"""
+    pattern = os.path.join(archive_dir or ARCHIVE_DIR, 'readings', 'date=*.parquet')
+    result = []
+    for path in sorted(glob.glob(pattern)):
+        day = os.path.basename(path)[len('date='):-len('.parquet')]
+        day_start = calendar.timegm(time.strptime(day, '%Y-%m-%d'))
+        result.append((day_start, path))
+    return result
+
+
+def oldest_archived_ts(archive_dir=None):
+    parts = partitions(archive_dir)
+    return parts[0][0] if parts else None
+
+
+def write_day(day_start, batches, archive_dir=None):
+    """
+    Grava as leituras de um dia em sua partição
+
+    Se a partição já existe, as linhas novas são anexadas (ids já presentes
+    são ignorados). A gravação é atômica: arquivo temporário + os.replace.
+
+    Args:
+        day_start: Epoch do início do dia (UTC)
+        batches: Iterável de listas de tuplas no formato de READINGS_SCHEMA
+
+    Returns:
+        Número de linhas arquivadas
+    """
+    schema = _schema()
+    names = [name for name, _ in READINGS_SCHEMA]
+    path = _partition_path(day_start, archive_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    tables = []
+    last_id = None
+    if os.path.exists(path):
+        existing = _read_partition(path)
+        tables.append(existing)
+        last_id = pc.max(existing['id']).as_py()
+
+    written = 0
+    for batch in batches:
+        if last_id is not None:
+            # Linhas já arquivadas por uma execução interrompida antes do DELETE
+            batch = [row for row in batch if row[0] > last_id]
+            if not batch:
+                continue
+        columns = list(zip(*batch))
+        tables.append(pa.Table.from_arrays(
+            [pa.array(col, type=field.type) for col, field in zip(columns, schema)],
+            names=names
+        ))
+        written += len(batch)
+
+    if not written:
+        return 0
+
+    table = pa.concat_tables(tables).sort_by('id')
+    tmp_path = path + '.tmp'
+    pq.write_table(table, tmp_path, compression=COMPRESSION)
+    os.replace(tmp_path, path)
+    return written
+
+
+def read_range(start_ts=None, end_ts=None, columns=None, archive_dir=None, max_id=None):
+    """
+    Lê as leituras arquivadas em [start_ts, end_ts) como uma pyarrow.Table
+
+    Só abre as partições que cruzam o intervalo (memory map). Com max_id, só
+    as linhas com id < max_id: uma purga interrompida depois de write_day e
+    antes do DELETE deixa a mesma leitura no arquivo e no SQLite.
+    """
+    names = [name for name, _ in READINGS_SCHEMA]
+    read_columns = list(columns) if columns else names
+    # Colunas lidas só para filtrar (removidas do resultado)
+    extra = ['ts'] if 'ts' not in read_columns else []
+    if max_id is not None and 'id' not in read_columns:
+        extra.append('id')
+    read_columns = read_columns + extra
+
+    tables = []
+    for day_start, path in partitions(archive_dir):
+        if start_ts is not None and day_start + DAY <= start_ts:
+            continue
+        if end_ts is not None and day_start >= end_ts:
+            break
+        table = _read_partition(path, read_columns)
+        mask = None
+        if start_ts is not None:
+            mask = pc.greater_equal(table['ts'], int(start_ts))
+        if end_ts is not None:
+            upper = pc.less(table['ts'], int(end_ts))
+            mask = upper if mask is None else pc.and_(mask, upper)
+        if max_id is not None:
+            below = pc.less(table['id'], int(max_id))
+            mask = below if mask is None else pc.and_(mask, below)
+        tables.append(table.filter(mask) if mask is not None else table)
+
+    if not tables:
+        schema = _schema()
+        return pa.table({name: pa.array([], type=schema.field(name).type)
+                         for name in read_columns if name not in extra})
+
+    table = pa.concat_tables(tables)
+    if extra:
+        table = table.drop_columns(extra)
+    return table
+
+
+def iter_batches(start_ts=None, end_ts=None, columns=None, batch_size=1000, archive_dir=None, max_id=None):
+    """Gera lotes de tuplas das leituras arquivadas (mesmo formato de database.iter_table_rows)"""
+    if not PYARROW_AVAILABLE:
+        return
+    for day_start, path in partitions(archive_dir):
+        if start_ts is not None and day_start + DAY <= start_ts:
+            continue
+        if end_ts is not None and day_start >= end_ts:
+            break
+        table = read_range(max(start_ts or day_start, day_start), min(end_ts or day_start + DAY, day_start + DAY),
+                           columns, archive_dir, max_id)
+        for record_batch in table.to_batches(max_chunksize=batch_size):
+            yield list(zip(*(column.to_pylist() for column in record_batch.columns)))
+
+
+if __name__ == '__main__':
+    import sys
+    import database
+
+    days = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    if not PYARROW_AVAILABLE:
+        print("✗ pyarrow não instalado: pip install pyarrow")
+        sys.exit(1)
+
+    database.init_database()
+    database.clear_old_data(days)
+    for day_start, path in partitions():
+        print(f"  {path}  ({pq.ParquetFile(path).metadata.num_rows} linhas)")
@@ -0,0 +1,182 @@
+"""
+Protocolo serial binário (opcional) dos nós sensores
+
+O nó inicia sempre em JSON a 9600 baud. Se o handshake anunciar suporte
+({"status": "arduino1_ready", ..., "proto": 1}) e GREENHOUSE_SERIAL_PROTOCOL=binary,
+o servidor envia "BINARY:<baud>"; o nó responde {"response": "binary_on", ...},
+troca o baud rate e passa a enviar frames:
+
+    COBS( versão u8 | tipo u8 | corpo | crc16 u16 LE ) 0x00
+
+- COBS garante que 0x00 só aparece como delimitador de frame
+- CRC-16/CCITT-FALSE (poly 0x1021, init 0xFFFF) sobre versão + tipo + corpo
+- FRAME_READING: corpo '<HhBBB' = seq, temp*10, humid, soil, light (7 bytes)
+- FRAME_JSON: corpo é o texto de uma mensagem JSON rara (ações, respostas...)
+
+Uma leitura ocupa 13 bytes no fio, contra ~65 bytes da linha JSON.
+O encoder correspondente está em arduino/arduino1_sensors.ino (sendFrame).
+"""
+import binascii
+import os
+import struct
+
+from message_parser import parse_line, MSG_READING
+
+PROTO_VERSION = 1
+
+FRAME_READING = 0x01
+FRAME_JSON = 0x02
+
+READING = struct.Struct('<HhBBB')
+HEADER = struct.Struct('<BB')
+CRC = struct.Struct('<H')
+
+BINARY_ENABLED = os.environ.get('GREENHOUSE_SERIAL_PROTOCOL', 'json') == 'binary'
+BINARY_BAUDRATE = int(os.environ.get('GREENHOUSE_BINARY_BAUD', '115200'))
+
+
+def crc16(data):
+    """CRC-16/CCITT-FALSE (binascii.crc_hqx é a mesma CRC, implementada em C)"""
+    return binascii.crc_hqx(data, 0xFFFF)
+
+
+def cobs_encode(data):
+    """Codifica em COBS (sem o delimitador 0x00 final)"""
+    out = bytearray()
+    for block in bytes(data).split(b'\0'):
+        # Blocos com mais de 254 bytes não-zero viram vários códigos 0xFF
+        while len(block) >= 254:
+            out.append(0xFF)
+            out += block[:254]
+            block = block[254:]
+        out.append(len(block) + 1)
+        out += block
+    return bytes(out)
+
+
+def cobs_decode(data):
+    """
+    Decodifica um frame COBS (sem o delimitador)
+
+    Raises:
+        ValueError: Frame mal formado
+    """
+    parts = []
+    i = 0
+    length = len(data)
+    while i < length:
+        code = data[i]
+        end = i + code
+        if code == 0 or end > length:
+            raise ValueError("Frame COBS inválido")
+        parts.append(data[i + 1:end])
+        if code < 0xFF and end < length:
+            parts.append(b'\0')
+        i = end
+    return b''.join(parts)
+
+
+def encode_frame(frame_type, body=b''):
+    """Monta um frame completo (com delimitador), como o Arduino envia"""
+    payload = HEADER.pack(PROTO_VERSION, frame_type) + bytes(body)
+    return cobs_encode(payload + CRC.pack(crc16(payload))) + b'\0'
+
+
+def encode_reading(seq, temperature, humidity, soil_moisture, light_level):
+    body = READING.pack(seq & 0xFFFF, int(round(temperature * 10)), int(round(humidity)), soil_moisture, light_level)
+    return encode_frame(FRAME_READING, body)
+
+
+class FrameDecoder:
+    """
+    Decodifica os frames de um nó, verificando CRC e a sequência das leituras
+
+    decode() devolve (tipo, dados) no mesmo formato de message_parser.parse_line,
+    para os frames passarem pelas mesmas tabelas de despacho.
+    """
+
+    def __init__(self):
+        self.last_seq = None
+        self.frames = 0
+        self.errors = 0
+        self.lost = 0
+
+    def decode(self, frame):
+        try:
+            payload = cobs_decode(frame)
+        except ValueError:
+            self.errors += 1
+            return None, None
+
+        end = len(payload) - CRC.size
+        if end < HEADER.size or crc16(payload[:end]) != payload[end] | payload[end + 1] << 8 \
+                or payload[0] != PROTO_VERSION:
+            self.errors += 1
+            return None, None
+        self.frames += 1
+
+        frame_type = payload[1]
+        if frame_type == FRAME_READING and end == HEADER.size + READING.size:
+            # Campos lidos direto do buffer decodificado, sem fatiar
+            seq, temp, humid, soil, light = READING.unpack_from(payload, HEADER.size)
+            if self.last_seq is not None:
+                self.lost += (seq - self.last_seq - 1) & 0xFFFF
+            self.last_seq = seq
+            return MSG_READING, {
+                'source': 'arduino1',
+                'temp': temp / 10,
+                'humid': humid,
+                'soil': soil,
+                'light': light
+            }
+
+        if frame_type == FRAME_JSON:
+            try:
+                return parse_line(payload[HEADER.size:end].decode('utf-8'))
+            except UnicodeDecodeError:
+                pass
+
+        self.errors += 1
+        return None, None
+
+    def get_stats(self):
+        return {'frames': self.frames, 'errors': self.errors, 'lost': self.lost}
+
+
+if __name__ == '__main__':
+    import sys
+    import time
+
+    from serial_io import LineBuffer, FrameBuffer
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    readings = [(20 + i % 100 / 10, 40 + i % 50, i % 100, i % 100) for i in range(1000)]
+
+    json_chunk = b''.join(
+        ('{"source":"arduino1","temp":%.1f,"humid":%d,"soil":%d,"light":%d}\r\n' % r).encode()
+        for r in readings
+    )
+    binary_chunk = b''.join(encode_reading(i, *r) for i, r in enumerate(readings))
+
+    decoder = FrameDecoder()
+    for frame in FrameBuffer().feed(binary_chunk):
+        kind, data = decoder.decode(frame)
+        assert kind == MSG_READING, frame
+    assert decoder.errors == 0
+
+    def bench(name, chunk, buffer, parse, baudrate):
+        start = time.perf_counter()
+        parsed = 0
+        while parsed < count:
+            for item in buffer.feed(chunk):
+                parse(item)
+            parsed += len(readings)
+        elapsed = time.perf_counter() - start
+        wire = len(chunk) / len(readings)
+        # 8N1: 10 bits por byte no fio
+        print(f"  {name:<8} {wire:5.1f} bytes/leitura  {baudrate:>6} baud → {baudrate / 10 / wire:>7,.0f} leituras/s no fio  "
+              f"| host: {parsed / elapsed:>9,.0f} leituras/s ({elapsed / parsed * 1e6:.2f} µs)")
+
+    print(f"Throughput ({count:,} leituras):")
+    bench('JSON', json_chunk, LineBuffer(), parse_line, 9600)
+    bench('binário', binary_chunk, FrameBuffer(), FrameDecoder().decode, BINARY_BAUDRATE)
@@ -0,0 +1,208 @@
+"""
+Hub de broadcast do WebSocket (Socket.IO) para as leituras dos sensores
+
+As threads seriais só chamam publish(), que atualiza um retrato com o último
+valor de cada campo por nó (sem I/O, sem tocar nos clientes). Uma tarefa de
+background envia, a cada tick (GREENHOUSE_WS_HZ, padrão 2 Hz):
+
+- apenas os campos que mudaram desde o último frame entregue ao cliente
+  (evento 'sensor_delta': {'seq', 'nodes': {node_id: {campo: valor}}})
+- um único frame codificado para todos os clientes que estão em dia
+- nada para o cliente lento que ainda não consumiu o frame anterior: o frame
+  é descartado e o cliente recebe, quando drenar, o delta acumulado
+
+Ao conectar, o cliente recebe o retrato completo ('full': True).
+
+Consumo: o cliente confirma cada frame com o evento 'sensor_ack' ({'seq'}).
+O hub conta, por cliente, os frames enviados e ainda não confirmados; quem
+nunca confirmou (cliente antigo) recebe todos os frames, sem esse controle.
+"""
+import os
+import threading
+import time
+from collections import deque
+
+BROADCAST_HZ = float(os.environ.get('GREENHOUSE_WS_HZ', '2'))
+DELTA_EVENT = 'sensor_delta'
+ACK_EVENT = 'sensor_ack'
+MAX_BACKLOG = 1
+
+
+class BroadcastHub:
+    """
+    Args:
+        socketio: Instância flask_socketio.SocketIO
+        rate: Frames por segundo
+        event: Nome do evento Socket.IO dos deltas
+        namespace: Namespace Socket.IO
+        max_backlog: Frames enviados e ainda não confirmados pelo cliente a
+            partir dos quais o frame do tick é descartado para ele
+    """
+
+    def __init__(self, socketio, rate=BROADCAST_HZ, event=DELTA_EVENT, namespace='/', max_backlog=MAX_BACKLOG):
+        self.socketio = socketio
+        self.interval = 1.0 / rate
+        self.event = event
+        self.namespace = namespace
+        self.max_backlog = max_backlog
+
+        # node_id -> {campo: valor} e node_id -> {campo: seq do tick que o entrega}
+        self._values = {}
+        self._versions = {}
+        self._seq = 0
+        # sid -> seq do último frame entregue
+        self._clients = {}
+        # sid -> seqs dos frames enviados sem ACK_EVENT; clientes que já confirmaram
+        self._unacked = {}
+        self._acking = set()
+        self._lock = threading.Lock()
+        self._running = False
+        self._task = None
+
+        self.stats = {
+            'published': 0,
+            'coalesced': 0,
+            'ticks': 0,
+            'frames': 0,
+            'emits': 0,
+            'dropped': 0,
+            'last_tick_ms': 0.0
+        }
+
+    # ==================== PRODUTORES ====================
+
+    def publish(self, data):
+        """Registra uma leitura (chamado pelas threads seriais; não bloqueia em I/O)"""
+        node_id = data.get('node_id', 'arduino1')
+        with self._lock:
+            values = self._values.setdefault(node_id, {})
+            versions = self._versions.setdefault(node_id, {})
+            changed = False
+            for key, value in data.items():
+                if key == 'node_id' or (key in values and values[key] == value):
+                    continue
+                values[key] = value
+                versions[key] = self._seq + 1
+                changed = True
+            self.stats['published'] += 1
+            if not changed:
+                self.stats['coalesced'] += 1
+
+    # ==================== CLIENTES ====================
+
+    def add_client(self, sid):
+        """Registra o cliente e envia o retrato completo"""
+        with self._lock:
+            seq = self._seq
+            nodes = {node_id: dict(values) for node_id, values in self._values.items()}
+            self._clients[sid] = seq
+            self._unacked[sid] = deque([seq], maxlen=self.max_backlog)
+        self.socketio.emit(self.event, {'seq': seq, 'full': True, 'nodes': nodes}, to=sid, namespace=self.namespace)
+
+    def remove_client(self, sid):
+        with self._lock:
+            self._clients.pop(sid, None)
+            self._unacked.pop(sid, None)
+            self._acking.discard(sid)
+
+    def ack(self, sid, seq):
+        """Cliente confirmou os frames até `seq` (evento ACK_EVENT)"""
+        if not isinstance(seq, int) or isinstance(seq, bool):
+            return
+        with self._lock:
+            unacked = self._unacked.get(sid)
+            if unacked is None:
+                return
+            self._acking.add(sid)
+            while unacked and unacked[0] <= seq:
+                unacked.popleft()
+
+    def _backlog(self, sid):
+        """Frames enviados ao cliente e ainda não confirmados (0 se ele não confirma frames)"""
+        if sid not in self._acking:
+            return 0
+        return len(self._unacked.get(sid, ()))
+
+    # ==================== TICK ====================
+
+    def _changes_since(self, last, seq):
+        """Campos alterados depois do frame `last` e até o tick `seq`, por nó"""
+        nodes = {}
+        for node_id, versions in self._versions.items():
+            values = self._values[node_id]
+            fields = {key: values[key] for key, version in versions.items() if last < version <= seq}
+            if fields:
+                nodes[node_id] = fields
+        return nodes
+
+    def tick(self):
+        """Envia os deltas pendentes; retorna quantos clientes receberam um frame"""
+        start = time.perf_counter()
+        with self._lock:
+            self._seq += 1
+            seq = self._seq
+            # Agrupa pelo último frame entregue: os clientes em dia formam um único grupo
+            groups = {}
+            dropped = 0
+            for sid, last in self._clients.items():
+                if self._backlog(sid) >= self.max_backlog:
+                    dropped += 1
+                    continue
+                groups.setdefault(last, []).append(sid)
+
+        frames = emits = 0
+        for last, sids in groups.items():
+            with self._lock:
+                nodes = self._changes_since(last, seq)
+            if nodes:
+                # Um único pacote codificado para todo o grupo
+                self.socketio.emit(self.event, {'seq': seq, 'nodes': nodes}, to=sids, namespace=self.namespace)
+                frames += 1
+                emits += len(sids)
+            with self._lock:
+                for sid in sids:
+                    if sid in self._clients:
+                        self._clients[sid] = seq
+                        if nodes:
+                            self._unacked[sid].append(seq)
+
+        with self._lock:
+            self.stats['ticks'] += 1
+            self.stats['frames'] += frames
+            self.stats['emits'] += emits
+            self.stats['dropped'] += dropped
+            self.stats['last_tick_ms'] = (time.perf_counter() - start) * 1000
+        return emits
+
+    # ==================== CICLO DE VIDA ====================
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        # Tarefa do modo assíncrono do Flask-SocketIO (thread, eventlet ou gevent)
+        self._task = self.socketio.start_background_task(self._run)
+        print(f"[WS] Broadcast de sensores a {1 / self.interval:g} Hz (somente deltas)")
+
+    def stop(self):
+        self._running = False
+        self._task = None
+
+    def _run(self):
+        while self._running:
+            try:
+                self.tick()
+            except Exception as e:
+                print(f"[WS ERROR] Falha no broadcast: {e}")
+            self.socketio.sleep(self.interval)
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats['clients'] = len(self._clients)
+            stats['acking'] = len(self._acking)
+            stats['nodes'] = len(self._values)
+            stats['seq'] = self._seq
+        stats['rate_hz'] = round(1 / self.interval, 2)
+        stats['last_tick_ms'] = round(stats['last_tick_ms'], 3)
+        return stats
@@ -0,0 +1,367 @@
+"""
+Broker substituto em memória para testar a publicação sem RabbitMQ
+
+StandInBroker imita, no nível da BlockingConnection do pika, o que o
+RabbitMQManager usa (channel, declarações, basic_publish, confirms), então
+o código real de RabbitMQManager/AlertPublisher é exercitado; para o
+AlertPublisher, publisher() imita o ConfirmPublisher (confirms do lote em
+uma ida e volta). Permite simular quedas do broker, latência de confirmação
+e nacks, conta as idas e voltas de confirmação e as "colisões": duas threads
+dentro de basic_publish na mesma conexão ao mesmo tempo (o que num pika real
+corrompe frames ou trava a conexão).
+
+Uso:
+    python broker_harness.py spool [alertas]        # quedas do broker + spool
+    python broker_harness.py stress [threads] [n]   # publicações concorrentes
+"""
+import contextlib
+import io
+import json
+import random
+import threading
+import time
+
+from pika.exceptions import AMQPConnectionError, StreamLostError, NackError, UnroutableError
+
+from rabbitmq_config import RabbitMQManager
+
+
+def quiet():
+    """Silencia os logs por alerta do RabbitMQManager/AlertPublisher durante a carga"""
+    return contextlib.redirect_stdout(io.StringIO())
+
+
+class StandInBroker:
+    """
+    Args:
+        confirm_latency: Atraso (s) de cada ida e volta de confirmação (por
+            basic_publish na BlockingConnection, por lote no publisher())
+        nack_rate: Probabilidade de um publish confirmado ser recusado (nack)
+        unroutable_types: Tipos de alerta sem fila de destino (devolvidos como unroutable)
+    """
+
+    def __init__(self, confirm_latency=0.0, nack_rate=0.0, seed=None, unroutable_types=()):
+        self.confirm_latency = confirm_latency
+        self.nack_rate = nack_rate
+        self.unroutable_types = set(unroutable_types)
+        self.messages = []
+        self.connects = 0
+        self.collisions = 0
+        self.round_trips = 0
+        self.up = True
+        self._generation = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def set_up(self, up):
+        """Liga/desliga o broker; desligar derruba as conexões abertas"""
+        with self._lock:
+            self.up = up
+            if not up:
+                self._generation += 1
+
+    def open(self):
+        with self._lock:
+            if not self.up:
+                raise AMQPConnectionError("Broker substituto fora do ar")
+            self.connects += 1
+            return StandInConnection(self, self._generation)
+
+    def manager(self, confirm=True):
+        """RabbitMQManager real conectado a este broker (connection_factory do AlertPublisher)"""
+        return StandInRabbitMQManager(self, confirm=confirm)
+
+    def publisher(self):
+        """Substituto do ConfirmPublisher (connection_factory padrão do AlertPublisher)"""
+        return StandInConfirmPublisher(self)
+
+    def confirm_round_trip(self):
+        if self.confirm_latency:
+            time.sleep(self.confirm_latency)
+        with self._lock:
+            self.round_trips += 1
+
+    def receive(self, connection, body, confirm):
+        """Grava uma mensagem publicada; StreamLostError/NackError/UnroutableError como o pika"""
+        with self._lock:
+            if not connection.is_open:
+                raise StreamLostError("Conexão perdida (broker substituto)")
+            if confirm and self.nack_rate and self._random.random() < self.nack_rate:
+                raise NackError([body])
+            if confirm and self.unroutable_types and json.loads(body).get('type') in self.unroutable_types:
+                raise UnroutableError([body])
+            self.messages.append((time.perf_counter(), body))
+
+    def bodies(self):
+        with self._lock:
+            return [json.loads(body) for _, body in self.messages]
+
+    def last_receipt(self):
+        """perf_counter() da última mensagem recebida (None se nenhuma)"""
+        with self._lock:
+            return self.messages[-1][0] if self.messages else None
+
+
+class StandInConnection:
+    """Imita pika.BlockingConnection"""
+
+    def __init__(self, broker, generation):
+        self.broker = broker
+        self.generation = generation
+        self.closed = False
+
+    @property
+    def is_open(self):
+        return not self.closed and self.broker.up and self.generation == self.broker._generation
+
+    @property
+    def is_closed(self):
+        return not self.is_open
+
+    def channel(self):
+        return StandInChannel(self)
+
+    def close(self):
+        self.closed = True
+
+
+class StandInChannel:
+    """Imita BlockingChannel: declarações são no-op, basic_publish grava no broker"""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.confirm = False
+        self._in_use = threading.Lock()
+
+    def exchange_declare(self, *args, **kwargs):
+        pass
+
+    def queue_declare(self, *args, **kwargs):
+        pass
+
+    def queue_bind(self, *args, **kwargs):
+        pass
+
+    def confirm_delivery(self):
+        self.confirm = True
+
+    def basic_publish(self, exchange, routing_key, body, properties=None, mandatory=False):
+        broker = self.connection.broker
+        if not self._in_use.acquire(blocking=False):
+            # Outra thread está no meio de um publish nesta mesma conexão
+            with broker._lock:
+                broker.collisions += 1
+            self._in_use.acquire()
+        try:
+            if self.confirm:
+                broker.confirm_round_trip()
+            elif broker.confirm_latency:
+                # Sem confirm o basic_publish não espera o broker, mas o atraso
+                # mantém a janela em que duas threads se cruzam no canal
+                time.sleep(broker.confirm_latency)
+            broker.receive(self.connection, body, self.confirm)
+        finally:
+            self._in_use.release()
+
+
+class StandInConfirmPublisher:
+    """Imita ConfirmPublisher: publica o lote e recebe todos os confirms em uma ida e volta"""
+
+    def __init__(self, broker):
+        self.broker = broker
+        self.connection = None
+
+    def connect(self):
+        try:
+            self.connection = self.broker.open()
+            return True
+        except AMQPConnectionError:
+            return False
+
+    def publish_batch(self, messages):
+        if self.connection is None:
+            return [AMQPConnectionError("Publicador não conectado")] * len(messages)
+        self.broker.confirm_round_trip()
+        results = []
+        for message in messages:
+            try:
+                self.broker.receive(self.connection, json.dumps(message), confirm=True)
+                results.append(None)
+            except (NackError, UnroutableError) as e:
+                results.append(e)
+            except StreamLostError as e:
+                return results + [e] * (len(messages) - len(results))
+        return results
+
+    def disconnect(self):
+        if self.connection is not None:
+            self.connection.close()
+
+
+class StandInRabbitMQManager(RabbitMQManager):
+    """RabbitMQManager cujas conexões vão para um StandInBroker"""
+
+    def __init__(self, broker, **kwargs):
+        super().__init__(**kwargs)
+        self.broker = broker
+
+    def _open_connection(self, params):
+        return self.broker.open()
+
+
+def spool_scenario(count, spool_dir=None):
+    """
+    Quedas do broker no meio da publicação (a cada 500 alertas, fora do ar do 250º ao 400º)
+
+    Returns:
+        Dict com received (mensagens recebidas, em ordem), connects, elapsed
+        (até o último recebido) e stats do AlertPublisher
+    """
+    import os
+    import tempfile
+
+    from alert_publisher import AlertPublisher, AlertSpool
+
+    spool_path = os.path.join(spool_dir or tempfile.mkdtemp(), 'alert_spool.jsonl')
+    broker = StandInBroker(confirm_latency=0.0005, nack_rate=0.01, seed=1)
+    publisher = AlertPublisher(connection_factory=broker.publisher, spool=AlertSpool(spool_path),
+                               queue_size=200, reconnect_min=0.05, reconnect_max=0.5)
+    with quiet():
+        publisher.start()
+        start = time.perf_counter()
+        for i in range(count):
+            if i % 500 == 250:
+                broker.set_up(False)
+            elif i % 500 == 400:
+                broker.set_up(True)
+            publisher.publish_alert({'type': 'harness', 'message': str(i), 'severity': 'info'})
+            time.sleep(0.0002)
+
+        broker.set_up(True)
+        wait_for(broker, count)
+        publisher.stop()
+
+    return {
+        'received': [int(message['message']) for message in broker.bodies()],
+        'connects': broker.connects,
+        'elapsed': (broker.last_receipt() or start) - start,
+        'stats': publisher.get_stats()
+    }
+
+
+def stress_scenario(kind, threads, per_thread):
+    """
+    Muitas threads publicando ao mesmo tempo em uma única conexão
+
+    kind:
+        shared_channel - canal do pika usado direto, sem serialização (o bug original)
+        manager        - RabbitMQManager.publish_alert (lock, um confirm por alerta)
+        publisher      - AlertPublisher (thread dona da conexão, confirms por lote)
+
+    Returns:
+        Dict com received, collisions, round_trips e elapsed: até a última
+        publicação retornar ou, no publisher (assíncrono), até o último alerta
+        chegar ao broker
+    """
+    import os
+    import tempfile
+
+    from alert_publisher import AlertPublisher, AlertSpool
+
+    total = threads * per_thread
+    broker = StandInBroker(confirm_latency=0.0001)
+    publisher = None
+    if kind == 'publisher':
+        spool_path = os.path.join(tempfile.mkdtemp(), 'alert_spool.jsonl')
+        publisher = AlertPublisher(connection_factory=broker.publisher, spool=AlertSpool(spool_path),
+                                   queue_size=total)
+        publish = publisher.publish_alert
+    else:
+        manager = broker.manager(confirm=kind == 'manager')
+        with quiet():
+            manager.connect()
+        if kind == 'manager':
+            publish = manager.publish_alert
+        else:
+            def publish(alert):
+                manager.channel.basic_publish(exchange='', routing_key='',
+                                              body=json.dumps({'message': alert['message']}))
+
+    barrier = threading.Barrier(threads + 1)
+
+    def worker(n):
+        barrier.wait()
+        for i in range(per_thread):
+            publish({'type': 'stress', 'message': f"{n}:{i}", 'severity': 'info'})
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    with quiet():
+        if publisher:
+            publisher.start()
+        for thread in workers:
+            thread.start()
+        barrier.wait()
+        start = time.perf_counter()
+        for thread in workers:
+            thread.join()
+        if publisher:
+            wait_for(broker, total)
+            publisher.stop()
+            elapsed = (broker.last_receipt() or start) - start
+        else:
+            elapsed = time.perf_counter() - start
+
+    return {
+        'received': [message['message'] for message in broker.bodies()],
+        'collisions': broker.collisions,
+        'round_trips': broker.round_trips,
+        'elapsed': elapsed
+    }
+
+
+def wait_for(broker, count, timeout=60):
+    deadline = time.time() + timeout
+    while len(broker.messages) < count and time.time() < deadline:
+        time.sleep(0.01)
+
+
+def run_spool(count):
+    """Quedas do broker no meio da publicação: nada pode ser perdido"""
+    result = spool_scenario(count)
+    received = result['received']
+    print(f"Enviados: {count}  Recebidos: {len(received)}  Únicos: {len(set(received))}  "
+          f"Conexões: {result['connects']}  ({result['elapsed']:.1f}s)")
+    print(f"Stats: {result['stats']}")
+    missing = set(range(count)) - set(received)
+    print("OK: nenhum alerta perdido" if not missing else f"FALHA: {len(missing)} alerta(s) perdido(s)")
+    return not missing
+
+
+def run_stress(threads, per_thread):
+    """Muitas threads publicando ao mesmo tempo em uma única conexão"""
+    total = threads * per_thread
+    print(f"{threads} threads x {per_thread} publicações ({total} alertas), uma conexão:")
+    ok = True
+    for kind, name in (('shared_channel', 'canal compartilhado sem lock'),
+                       ('manager', 'RabbitMQManager.publish_alert'),
+                       ('publisher', 'AlertPublisher (até o último recebido)')):
+        result = stress_scenario(kind, threads, per_thread)
+        passed = result['collisions'] == 0 and len(set(result['received'])) == total
+        print(f"  {name:<40} {len(result['received']):>6} recebidos  colisões: {result['collisions']:>5}  "
+              f"confirms: {result['round_trips']:>5}  {result['elapsed']:6.2f}s  {'OK' if passed else 'FALHA'}")
+        if kind != 'shared_channel':
+            ok = ok and passed
+    return ok
+
+
+if __name__ == '__main__':
+    import sys
+
+    mode = sys.argv[1] if len(sys.argv) > 1 else 'spool'
+    args = [int(arg) for arg in sys.argv[2:]]
+
+    if mode == 'stress':
+        passed = run_stress(*(args or [32, 200]))
+    else:
+        passed = run_spool(*(args or [2000]))
+    sys.exit(0 if passed else 1)
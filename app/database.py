@@ -1,64 +1,163 @@
-import sqlite3
+import math
+import time
 from datetime import datetime
 import os
 
+from db_connection import ConnectionManager
+import rollups
+import archive
+
 DATABASE_NAME = 'greenhouse.db'
+DEFAULT_NODE_ID = rollups.DEFAULT_NODE_ID
+
+_manager = None
+
+def utc_now():
+    """
+    Retorna (timestamp, ts) do instante atual
+
+    timestamp: texto no formato do CURRENT_TIMESTAMP (UTC), mantido para a API
+    ts: epoch em segundos (INTEGER), usado nos índices e filtros por tempo
+    """
+    ts = int(time.time())
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(ts)), ts
+
+def get_connection_manager():
+    """Retorna o gerenciador de conexões (criado sob demanda para DATABASE_NAME)"""
+    global _manager
+    if _manager is None or _manager.database != DATABASE_NAME:
+        if _manager is not None:
+            _manager.close()
+        _manager = ConnectionManager(DATABASE_NAME)
+    return _manager
+
+def close_database():
+    """Fecha as conexões persistentes"""
+    global _manager
+    if _manager is not None:
+        _manager.close()
+        _manager = None
 
 def init_database():
     """Inicializa o banco de dados e cria as tabelas se não existirem"""
-    conn = sqlite3.connect(DATABASE_NAME)
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS readings (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-            temperature REAL NOT NULL,
-            humidity REAL NOT NULL,
-            soil_moisture INTEGER NOT NULL,
-            light_level INTEGER NOT NULL
-        )
-    ''')
-    
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS alerts (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-            alert_type TEXT NOT NULL,
-            message TEXT NOT NULL,
-            severity TEXT DEFAULT 'warning'
-        )
-    ''')
-    
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS actions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-            action_type TEXT NOT NULL,
-            status TEXT DEFAULT 'completed',
-            details TEXT
-        )
-    ''')
-    
+    with get_connection_manager().writer() as conn:
+        cursor = conn.cursor()
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS readings (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+                temperature REAL NOT NULL,
+                humidity REAL NOT NULL,
+                soil_moisture INTEGER NOT NULL,
+                light_level INTEGER NOT NULL
+            )
+        ''')
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS alerts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+                alert_type TEXT NOT NULL,
+                message TEXT NOT NULL,
+                severity TEXT DEFAULT 'warning'
+            )
+        ''')
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS actions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+                action_type TEXT NOT NULL,
+                status TEXT DEFAULT 'completed',
+                details TEXT
+            )
+        ''')
+
+        _apply_migrations(conn)
+
+    print(f"[DATABASE] Banco de dados inicializado: {DATABASE_NAME} (schema v{SCHEMA_VERSION})")
+
+# ==================== MIGRAÇÕES ====================
+
+def _migrate_v1(conn):
+    """Coluna ts (epoch INTEGER) + índices por tempo em readings, alerts e actions"""
+    for table in ('readings', 'alerts', 'actions'):
+        conn.execute(f'ALTER TABLE {table} ADD COLUMN ts INTEGER')
+        conn.execute(f"UPDATE {table} SET ts = CAST(strftime('%s', timestamp) AS INTEGER)")
+        conn.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_ts ON {table}(ts)')
+
+def _migrate_v2(conn):
+    """Tabelas de rollup (1 min / 1 h / 1 dia); as leituras existentes entram na v5"""
+    rollups.create_tables(conn)
+
+def _migrate_v3(conn):
+    """auto_vacuum INCREMENTAL, para a purga devolver espaço sem VACUUM completo"""
+    conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+    # Só tem efeito em bancos existentes após um VACUUM (fora de transação)
+    conn.execute('VACUUM')
+
+def _migrate_v4(conn):
+    """Coluna node_id em readings (frota de nós sensores); linhas antigas ficam como 'arduino1'"""
+    conn.execute(f"ALTER TABLE readings ADD COLUMN node_id TEXT NOT NULL DEFAULT '{DEFAULT_NODE_ID}'")
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_readings_node_ts ON readings(node_id, ts)')
+
+def _migrate_v5(conn):
+    """node_id na chave dos rollups: recria as tabelas e recalcula a partir das leituras"""
+    for table, _ in rollups.ROLLUPS:
+        conn.execute(f'DROP TABLE IF EXISTS {table}')
+    rollups.create_tables(conn)
+    rollups.rebuild(conn)
+
+MIGRATIONS = {
+    1: _migrate_v1,
+    2: _migrate_v2,
+    3: _migrate_v3,
+    4: _migrate_v4,
+    5: _migrate_v5,
+}
+
+# Migrações que não podem rodar dentro de BEGIN/COMMIT (ex.: VACUUM)
+NON_TRANSACTIONAL_MIGRATIONS = {3}
+
+SCHEMA_VERSION = max(MIGRATIONS)
+
+def _apply_migrations(conn):
+    """Aplica, em ordem, as migrações ainda não registradas em PRAGMA user_version"""
     conn.commit()
-    conn.close()
-    print(f"[DATABASE] Banco de dados inicializado: {DATABASE_NAME}")
+    current = conn.execute('PRAGMA user_version').fetchone()[0]
+
+    for version in sorted(MIGRATIONS):
+        if version <= current:
+            continue
+        if version in NON_TRANSACTIONAL_MIGRATIONS:
+            MIGRATIONS[version](conn)
+            conn.execute(f'PRAGMA user_version = {version}')
+            print(f"[DATABASE] Migração v{version} aplicada")
+            continue
+        conn.execute('BEGIN')
+        try:
+            MIGRATIONS[version](conn)
+            conn.execute(f'PRAGMA user_version = {version}')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        print(f"[DATABASE] Migração v{version} aplicada")
+
+# ==================== ESCRITA ====================
 
-def insert_reading(temperature, humidity, soil_moisture, light_level):
+def insert_reading(temperature, humidity, soil_moisture, light_level, node_id=DEFAULT_NODE_ID):
     """Insere uma nova leitura de sensores"""
     try:
-        conn = sqlite3.connect(DATABASE_NAME)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO readings (temperature, humidity, soil_moisture, light_level)
-            VALUES (?, ?, ?, ?)
-        ''', (temperature, humidity, soil_moisture, light_level))
-        
-        conn.commit()
-        reading_id = cursor.lastrowid
-        conn.close()
-        return reading_id
+        row = (*utc_now(), temperature, humidity, soil_moisture, light_level, node_id)
+        with get_connection_manager().writer() as conn:
+            cursor = conn.execute('''
+                INSERT INTO readings (timestamp, ts, temperature, humidity, soil_moisture, light_level, node_id)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', row)
+            rollups.update(conn, [row])
+            return cursor.lastrowid
     except Exception as e:
         print(f"[DATABASE ERROR] Falha ao inserir leitura: {e}")
         return None
@@ -66,18 +165,12 @@ def insert_reading(temperature, humidity, soil_moisture, light_level):
 def insert_alert(alert_type, message, severity='warning'):
     """Insere um novo alerta"""
     try:
-        conn = sqlite3.connect(DATABASE_NAME)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO alerts (alert_type, message, severity)
-            VALUES (?, ?, ?)
-        ''', (alert_type, message, severity))
-        
-        conn.commit()
-        alert_id = cursor.lastrowid
-        conn.close()
-        return alert_id
+        with get_connection_manager().writer() as conn:
+            cursor = conn.execute('''
+                INSERT INTO alerts (timestamp, ts, alert_type, message, severity)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (*utc_now(), alert_type, message, severity))
+            return cursor.lastrowid
     except Exception as e:
         print(f"[DATABASE ERROR] Falha ao inserir alerta: {e}")
         return None
@@ -85,136 +178,365 @@ def insert_alert(alert_type, message, severity='warning'):
 def insert_action(action_type, status='completed', details=None):
     """Registra uma ação realizada"""
     try:
-        conn = sqlite3.connect(DATABASE_NAME)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO actions (action_type, status, details)
-            VALUES (?, ?, ?)
-        ''', (action_type, status, details))
-        
-        conn.commit()
-        action_id = cursor.lastrowid
-        conn.close()
-        return action_id
+        with get_connection_manager().writer() as conn:
+            cursor = conn.execute('''
+                INSERT INTO actions (timestamp, ts, action_type, status, details)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (*utc_now(), action_type, status, details))
+            return cursor.lastrowid
     except Exception as e:
         print(f"[DATABASE ERROR] Falha ao registrar ação: {e}")
         return None
 
+def insert_readings_batch(rows):
+    """
+    Insere várias leituras em uma única transação
+
+    Args:
+        rows: Lista de tuplas (timestamp, ts, temperature, humidity, soil_moisture, light_level, node_id)
+    """
+    return len(insert_readings_with_ids(rows))
+
+def insert_readings_with_ids(rows):
+    """
+    Como insert_readings_batch, mas retorna os ids atribuídos (na ordem de rows; [] em erro)
+
+    Com a conexão de escrita exclusiva, os ids de um mesmo INSERT em lote são
+    consecutivos e terminam em last_insert_rowid().
+    """
+    try:
+        with get_connection_manager().writer() as conn:
+            conn.executemany('''
+                INSERT INTO readings (timestamp, ts, temperature, humidity, soil_moisture, light_level, node_id)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', rows)
+            last_id = conn.execute('SELECT last_insert_rowid()').fetchone()[0]
+            rollups.update(conn, rows)
+        return list(range(last_id - len(rows) + 1, last_id + 1))
+    except Exception as e:
+        print(f"[DATABASE ERROR] Falha ao inserir lote de leituras: {e}")
+        return []
+
+def insert_alerts_batch(rows):
+    """
+    Insere vários alertas em uma única transação
+
+    Args:
+        rows: Lista de tuplas (timestamp, ts, alert_type, message, severity)
+    """
+    try:
+        with get_connection_manager().writer() as conn:
+            conn.executemany('''
+                INSERT INTO alerts (timestamp, ts, alert_type, message, severity)
+                VALUES (?, ?, ?, ?, ?)
+            ''', rows)
+        return len(rows)
+    except Exception as e:
+        print(f"[DATABASE ERROR] Falha ao inserir lote de alertas: {e}")
+        return 0
+
+def insert_actions_batch(rows):
+    """
+    Registra várias ações em uma única transação
+
+    Args:
+        rows: Lista de tuplas (timestamp, ts, action_type, status, details)
+    """
+    try:
+        with get_connection_manager().writer() as conn:
+            conn.executemany('''
+                INSERT INTO actions (timestamp, ts, action_type, status, details)
+                VALUES (?, ?, ?, ?, ?)
+            ''', rows)
+        return len(rows)
+    except Exception as e:
+        print(f"[DATABASE ERROR] Falha ao registrar lote de ações: {e}")
+        return 0
+
+# ==================== LEITURA ====================
+
 def get_latest_readings(limit=10):
     """Retorna as últimas N leituras"""
     try:
-        conn = sqlite3.connect(DATABASE_NAME)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT * FROM readings
-            ORDER BY timestamp DESC
-            LIMIT ?
-        ''', (limit,))
-        
-        rows = cursor.fetchall()
-        conn.close()
-        
+        with get_connection_manager().reader() as conn:
+            rows = conn.execute('''
+                SELECT * FROM readings
+                ORDER BY id DESC
+                LIMIT ?
+            ''', (limit,)).fetchall()
+
         return [dict(row) for row in rows]
     except Exception as e:
         print(f"[DATABASE ERROR] Falha ao buscar leituras: {e}")
         return []
 
+def _first_reading_id(conn):
+    """
+    Menor id ainda em readings (None se vazia)
+
+    As leituras do arquivo Parquet são lidas só abaixo dele: uma purga
+    interrompida entre archive.write_day e o DELETE deixa as mesmas linhas
+    nos dois lugares.
+    """
+    return conn.execute('SELECT MIN(id) FROM readings').fetchone()[0]
+
 def get_readings_by_timerange(hours=24):
     """Retorna leituras das últimas N horas"""
     try:
-        conn = sqlite3.connect(DATABASE_NAME)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT * FROM readings
-            WHERE timestamp >= datetime('now', '-' || ? || ' hours')
-            ORDER BY timestamp ASC
-        ''', (hours,))
-        
-        rows = cursor.fetchall()
-        conn.close()
-        
-        return [dict(row) for row in rows]
+        with get_connection_manager().reader() as conn:
+            cutoff = int(time.time() - hours * 3600)
+            rows = conn.execute('''
+                SELECT * FROM readings
+                WHERE ts >= ?
+                ORDER BY ts ASC
+            ''', (cutoff,)).fetchall()
+            first_id = _first_reading_id(conn)
+
+        archived = []
+        if archive.PYARROW_AVAILABLE and archive.partitions():
+            archived = archive.read_range(cutoff, max_id=first_id).to_pylist()
+
+        return archived + [dict(row) for row in rows]
     except Exception as e:
         print(f"[DATABASE ERROR] Falha ao buscar leituras por tempo: {e}")
         return []
 
+def history_uses_raw(hours, points):
+    """True quando nem o rollup de 1 minuto fornece `points` buckets na janela"""
+    table, size = rollups.choose_resolution(hours, points)
+    return hours * 3600 / size < points
+
+def history_step(hours, points):
+    """Largura (s) de cada ponto do gráfico: múltiplo da resolução lida (rollup ou 1 s)"""
+    size = 1 if history_uses_raw(hours, points) else rollups.choose_resolution(hours, points)[1]
+    return max(size, math.ceil(hours * 3600 / points / size) * size)
+
+def iter_history_rows(hours=24, points=200, batch_size=1000, since=None, node_id=None):
+    """
+    Gera tuplas (ts, temperature, humidity, soil_moisture, light_level) para o gráfico
+
+    Lê o rollup mais grosso que ainda fornece `points` buckets; se nem o rollup
+    de 1 minuto for suficiente (janelas curtas), lê as leituras brutas.
+    As linhas são buscadas em lotes (fetchmany), sem montar dicts.
+    Com since (epoch), lê só a partir dele (atualização incremental do gráfico).
+    Com node_id, só as leituras desse nó; sem ele, todos os nós juntos.
+    """
+    table, size = rollups.choose_resolution(hours, points)
+
+    with get_connection_manager().reader() as conn:
+        if history_uses_raw(hours, points):
+            start = int(max(time.time() - hours * 3600, since or 0))
+            if node_id:
+                cursor = conn.execute('''
+                    SELECT ts, temperature, humidity, soil_moisture, light_level
+                    FROM readings
+                    WHERE node_id = ? AND ts >= ?
+                    ORDER BY ts ASC
+                ''', (node_id, start))
+            else:
+                cursor = conn.execute('''
+                    SELECT ts, temperature, humidity, soil_moisture, light_level
+                    FROM readings
+                    WHERE ts >= ?
+                    ORDER BY ts ASC
+                ''', (start,))
+        else:
+            cursor = rollups.series_cursor(conn, table, size, hours, since, node_id)
+
+        while True:
+            batch = cursor.fetchmany(batch_size)
+            if not batch:
+                break
+            yield from batch
+
 def get_latest_alerts(limit=10):
     """Retorna os últimos N alertas"""
     try:
-        conn = sqlite3.connect(DATABASE_NAME)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT * FROM alerts
-            ORDER BY timestamp DESC
-            LIMIT ?
-        ''', (limit,))
-        
-        rows = cursor.fetchall()
-        conn.close()
-        
+        with get_connection_manager().reader() as conn:
+            rows = conn.execute('''
+                SELECT * FROM alerts
+                ORDER BY id DESC
+                LIMIT ?
+            ''', (limit,)).fetchall()
+
         return [dict(row) for row in rows]
     except Exception as e:
         print(f"[DATABASE ERROR] Falha ao buscar alertas: {e}")
         return []
 
-def get_statistics():
-    """Retorna estatísticas gerais do sistema"""
+def get_rows_since(table, last_id=None, limit=100, newest=False):
+    """
+    Linhas de alerts/actions com id > last_id, em ordem crescente de id
+
+    Retorna as `limit` primeiras depois de last_id (o feed repete a chamada
+    até alcançar o fim). Com newest=True, as `limit` mais recentes (retomada
+    do feed no dashboard: o que ficou para trás não é reenviado).
+    """
+    if table not in ('alerts', 'actions'):
+        raise ValueError(f"Tabela inválida para o feed: {table}")
+    query = f'SELECT * FROM {table} WHERE id > ? ORDER BY id {"DESC" if newest else "ASC"} LIMIT ?'
+    if newest:
+        query = f'SELECT * FROM ({query}) ORDER BY id ASC'
     try:
-        conn = sqlite3.connect(DATABASE_NAME)
-        cursor = conn.cursor()
-        
-        stats = {}
-        
-        cursor.execute('SELECT COUNT(*) FROM readings')
-        stats['total_readings'] = cursor.fetchone()[0]
-        
-        cursor.execute('SELECT COUNT(*) FROM alerts')
-        stats['total_alerts'] = cursor.fetchone()[0]
-        
-        cursor.execute('''
-            SELECT 
-                AVG(temperature) as avg_temp,
-                AVG(humidity) as avg_humid,
-                AVG(soil_moisture) as avg_soil,
-                AVG(light_level) as avg_light
-            FROM readings
-            WHERE timestamp >= datetime('now', '-24 hours')
-        ''')
-        
-        averages = cursor.fetchone()
-        stats['avg_temperature'] = round(averages[0], 1) if averages[0] else 0
-        stats['avg_humidity'] = round(averages[1], 1) if averages[1] else 0
-        stats['avg_soil_moisture'] = round(averages[2], 1) if averages[2] else 0
-        stats['avg_light_level'] = round(averages[3], 1) if averages[3] else 0
-        
-        conn.close()
+        with get_connection_manager().reader() as conn:
+            rows = conn.execute(query, (-1 if last_id is None else last_id, limit)).fetchall()
+        return [dict(row) for row in rows]
+    except Exception as e:
+        print(f"[DATABASE ERROR] Falha ao buscar {table} desde {last_id}: {e}")
+        return []
+
+def get_last_id(table):
+    """Maior id de alerts/actions (0 se vazia)"""
+    if table not in ('alerts', 'actions'):
+        raise ValueError(f"Tabela inválida para o feed: {table}")
+    with get_connection_manager().reader() as conn:
+        return conn.execute(f'SELECT COALESCE(MAX(id), 0) FROM {table}').fetchone()[0]
+
+def get_statistics(hours=24, node_id=None):
+    """Retorna estatísticas gerais do sistema (médias lidas dos rollups; com node_id, só desse nó)"""
+    try:
+        with get_connection_manager().reader() as conn:
+            cursor = conn.cursor()
+
+            stats = {}
+
+            # Leituras ainda no SQLite; lifetime_readings inclui as já purgadas (rollups)
+            node_filter, params = (' WHERE node_id = ?', (node_id,)) if node_id else ('', ())
+            cursor.execute(f'SELECT COUNT(*) FROM readings{node_filter}', params)
+            stats['total_readings'] = cursor.fetchone()[0]
+
+            cursor.execute(f'SELECT COALESCE(SUM(count), 0) FROM readings_1d{node_filter}', params)
+            stats['lifetime_readings'] = cursor.fetchone()[0]
+
+            cursor.execute('SELECT COUNT(*) FROM alerts')
+            stats['total_alerts'] = cursor.fetchone()[0]
+
+            summary = rollups.summary(conn, time.time() - hours * 3600, node_id=node_id)
+
+        for metric, key in (('temperature', 'avg_temperature'), ('humidity', 'avg_humidity'),
+                            ('soil_moisture', 'avg_soil_moisture'), ('light_level', 'avg_light_level')):
+            avg = summary[metric]['avg']
+            stats[key] = round(avg, 1) if avg else 0
+
         return stats
     except Exception as e:
         print(f"[DATABASE ERROR] Falha ao buscar estatísticas: {e}")
         return {}
 
-def clear_old_data(days=30):
-    """Remove dados mais antigos que N dias"""
+def get_rollup_history(hours=24, points=200, node_id=None):
+    """
+    Retorna o histórico agregado das últimas N horas
+
+    Usa o rollup mais grosso que ainda fornece pelo menos `points` buckets.
+    Cada item traz bucket (epoch), timestamp, count e média/min/max por métrica.
+    """
     try:
-        conn = sqlite3.connect(DATABASE_NAME)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            DELETE FROM readings
-            WHERE timestamp < datetime('now', '-' || ? || ' days')
-        ''', (days,))
-        
-        deleted = cursor.rowcount
-        conn.commit()
-        conn.close()
-        
+        with get_connection_manager().reader() as conn:
+            table, rows = rollups.history(conn, hours, points, node_id)
+
+        history = []
+        for row in rows:
+            item = dict(row)
+            item['timestamp'] = time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(item['bucket']))
+            history.append(item)
+        return history
+    except Exception as e:
+        print(f"[DATABASE ERROR] Falha ao buscar histórico agregado: {e}")
+        return []
+
+EXPORT_COLUMNS = {
+    'readings': ('id', 'timestamp', 'ts', 'temperature', 'humidity', 'soil_moisture', 'light_level', 'node_id'),
+    'alerts': ('id', 'timestamp', 'ts', 'alert_type', 'message', 'severity'),
+    'actions': ('id', 'timestamp', 'ts', 'action_type', 'status', 'details'),
+}
+
+def iter_table_rows(table, columns=None, start_ts=None, end_ts=None, batch_size=1000, include_archive=True):
+    """
+    Gera lotes de tuplas de uma tabela para exportação, com memória constante
+
+    Cada lote é uma consulta curta paginada pelo id (keyset), então nenhuma
+    conexão de leitura fica presa durante o download inteiro.
+
+    Args:
+        table: readings, alerts ou actions
+        columns: Subconjunto de EXPORT_COLUMNS[table] (padrão: todas)
+        start_ts / end_ts: Intervalo [start_ts, end_ts) em epoch segundos
+        include_archive: Para readings, inclui antes as partições Parquet arquivadas
+
+    Raises:
+        ValueError: Tabela ou coluna desconhecida
+    """
+    if table not in EXPORT_COLUMNS:
+        raise ValueError(f"Tabela desconhecida: {table}")
+    columns = tuple(columns) if columns else EXPORT_COLUMNS[table]
+    invalid = [c for c in columns if c not in EXPORT_COLUMNS[table]]
+    if invalid:
+        raise ValueError(f"Colunas desconhecidas para {table}: {', '.join(invalid)}")
+
+    start_ts = 0 if start_ts is None else int(start_ts)
+    end_ts = 2 ** 62 if end_ts is None else int(end_ts)
+
+    manager = get_connection_manager()
+    if table == 'readings' and include_archive:
+        with manager.reader() as conn:
+            first_id = _first_reading_id(conn)
+        yield from archive.iter_batches(start_ts, end_ts, columns, batch_size, max_id=first_id)
+
+    with manager.reader() as conn:
+        # Limites de id do intervalo, resolvidos pelo índice de ts
+        first = conn.execute(f'SELECT id FROM {table} WHERE ts >= ? ORDER BY ts ASC, id ASC LIMIT 1', (start_ts,)).fetchone()
+        last = conn.execute(f'SELECT id FROM {table} WHERE ts < ? ORDER BY ts DESC, id DESC LIMIT 1', (end_ts,)).fetchone()
+    if first is None or last is None:
+        return
+    first, last = first[0], last[0]
+
+    sql = f'''
+        SELECT id, {', '.join(columns)} FROM {table}
+        WHERE id > ? AND id <= ? AND ts >= ? AND ts < ?
+        ORDER BY id
+        LIMIT ?
+    '''
+    cursor_id = first - 1
+    while cursor_id < last:
+        with manager.reader() as conn:
+            batch = conn.execute(sql, (cursor_id, last, start_ts, end_ts, batch_size)).fetchall()
+        if not batch:
+            break
+        cursor_id = batch[-1][0]
+        yield [tuple(row)[1:] for row in batch]
+
+def archive_readings(cutoff):
+    """Copia para o arquivo Parquet, dia a dia, as leituras com ts < cutoff"""
+    with get_connection_manager().reader() as conn:
+        oldest = conn.execute('SELECT MIN(ts) FROM readings').fetchone()[0]
+    if oldest is None:
+        return 0
+
+    archived = 0
+    day_start = oldest // archive.DAY * archive.DAY
+    while day_start < cutoff:
+        day_end = min(day_start + archive.DAY, cutoff)
+        batches = iter_table_rows('readings', None, day_start, day_end, batch_size=10000, include_archive=False)
+        archived += archive.write_day(day_start, batches)
+        day_start += archive.DAY
+    return archived
+
+def clear_old_data(days=30, archive_first=True):
+    """
+    Remove leituras mais antigas que N dias
+
+    A remoção é incremental (blocos curtos por faixa de id, ver retention.py).
+    Com pyarrow instalado, as leituras são antes movidas para o arquivo
+    Parquet (archive.py); os rollups são mantidos para estatísticas longas.
+    """
+    # Import tardio: retention.py depende deste módulo
+    from retention import PurgeService
+
+    try:
+        service = PurgeService(policies={'readings': days}, archive_readings=archive_first)
+        deleted = service.purge_table('readings', days)
+        service.vacuum()
+
         print(f"[DATABASE] {deleted} leituras antigas removidas")
         return deleted
     except Exception as e:
@@ -224,19 +546,19 @@ def clear_old_data(days=30):
 if __name__ == '__main__':
     print("Inicializando banco de dados...")
     init_database()
-    
+
     print("Inserindo dados de teste...")
     insert_reading(25.5, 60.0, 45, 80)
     insert_alert('low_soil_moisture', 'Umidade do solo baixa', 'warning')
     insert_action('irrigation', 'completed', 'Irrigação manual ativada')
-    
+
     print("\nÚltimas leituras:")
     for reading in get_latest_readings(5):
         print(reading)
-    
+
     print("\nÚltimos alertas:")
     for alert in get_latest_alerts(5):
         print(alert)
-    
+
     print("\nEstatísticas:")
-    print(get_statistics())
\ No newline at end of file
+    print(get_statistics())
@@ -0,0 +1,111 @@
+"""
+Benchmark de latência das consultas do database.py conforme a tabela cresce
+
+Uso:
+  python db_benchmark.py [max_linhas] [arquivo_db]
+
+Exemplo:
+  python db_benchmark.py 20000000 /tmp/bench.db
+"""
+import os
+import random
+import sys
+import time
+
+import database
+import rollups
+
+SIZES = [10_000, 100_000, 1_000_000, 10_000_000, 20_000_000]
+INSERT_CHUNK = 100_000
+SAMPLE_INTERVAL = 5
+REPEAT = 20
+
+# Consultas de cada rota sobre readings e os rollups: (sql, parâmetros dado o corte de 1 h)
+PLAN_QUERIES = {
+    'latest': ('SELECT * FROM readings ORDER BY id DESC LIMIT 10', lambda cutoff: ()),
+    'timerange': ('SELECT * FROM readings WHERE ts >= ? ORDER BY ts ASC', lambda cutoff: (cutoff,)),
+    'node_history': ('SELECT ts, temperature FROM readings WHERE node_id = ? AND ts >= ? ORDER BY ts ASC',
+                     lambda cutoff: (database.DEFAULT_NODE_ID, cutoff)),
+    'rollup_history': (rollups._SERIES_SQL['readings_1m', False], lambda cutoff: (cutoff,)),
+    'rollup_node_history': (rollups._SERIES_SQL['readings_1m', True],
+                            lambda cutoff: (cutoff, database.DEFAULT_NODE_ID)),
+    'rollup_summary': (rollups._SUMMARY_SQL['readings_1h', False], lambda cutoff: (cutoff, cutoff + 3600)),
+}
+
+
+def _fill(target_rows, current_rows):
+    """Insere leituras sintéticas (uma a cada SAMPLE_INTERVAL s, terminando em 'agora')"""
+    end = int(time.time())
+    with database.get_connection_manager().writer() as conn:
+        while current_rows < target_rows:
+            n = min(INSERT_CHUNK, target_rows - current_rows)
+            # As linhas mais novas entram por último, como na operação real
+            base = end - (target_rows - current_rows) * SAMPLE_INTERVAL
+            rows = []
+            for i in range(n):
+                ts = base + i * SAMPLE_INTERVAL
+                rows.append((
+                    time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(ts)), ts,
+                    20 + random.random() * 10, 50 + random.random() * 20,
+                    random.randint(20, 80), random.randint(0, 100)
+                ))
+            conn.executemany('''
+                INSERT INTO readings (timestamp, ts, temperature, humidity, soil_moisture, light_level)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', rows)
+            rollups.update(conn, rows)
+            conn.commit()
+            current_rows += n
+    return current_rows
+
+
+def _time_ms(func, *args):
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        func(*args)
+    return (time.perf_counter() - start) * 1000 / REPEAT
+
+
+def _explain(sql, params):
+    with database.get_connection_manager().reader() as conn:
+        plan = conn.execute('EXPLAIN QUERY PLAN ' + sql, params).fetchall()
+    return ' | '.join(row[3] for row in plan)
+
+
+def query_plans():
+    """Plano de execução (EXPLAIN QUERY PLAN) de cada consulta de PLAN_QUERIES"""
+    cutoff = int(time.time()) - 3600
+    return {name: _explain(sql, params(cutoff)) for name, (sql, params) in PLAN_QUERIES.items()}
+
+
+def run(max_rows, db_path):
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+
+    database.DATABASE_NAME = db_path
+    database.init_database()
+
+    print("\nPlanos de execução:")
+    for name, plan in query_plans().items():
+        print(f"  {name + ':':<21} {plan}")
+
+    print(f"\n{'linhas':>12} | {'latest(10)':>11} | {'range 1h':>9} | {'stats 24h':>10} | {'hist 24h':>11}")
+    print("-" * 66)
+
+    rows = 0
+    for size in [s for s in SIZES if s <= max_rows] or [max_rows]:
+        rows = _fill(size, rows)
+        latest = _time_ms(database.get_latest_readings, 10)
+        timerange = _time_ms(database.get_readings_by_timerange, 1)
+        stats = _time_ms(database.get_statistics)
+        history = _time_ms(database.get_rollup_history, 24)
+        print(f"{rows:>12,} | {latest:>9.2f}ms | {timerange:>7.2f}ms | {stats:>8.2f}ms | {history:>9.2f}ms")
+
+    database.close_database()
+
+
+if __name__ == '__main__':
+    max_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    db_path = sys.argv[2] if len(sys.argv) > 2 else 'bench_greenhouse.db'
+    run(max_rows, db_path)
@@ -0,0 +1,103 @@
+import sqlite3
+import threading
+import queue
+from contextlib import contextmanager
+
+READER_POOL_SIZE = 8
+CACHED_STATEMENTS = 256
+CACHE_SIZE_KB = 16384
+BUSY_TIMEOUT_MS = 5000
+
+
+class ConnectionManager:
+    """
+    Conexões SQLite persistentes: uma conexão de escrita + pool de leitura.
+
+    Com journal_mode=WAL leitores não bloqueiam o escritor (e vice-versa),
+    então as consultas do dashboard não travam a gravação das leituras.
+    As conexões são reaproveitadas, o que mantém o cache de statements
+    preparados do sqlite3 (cached_statements) entre chamadas.
+    """
+
+    def __init__(self, database, pool_size=READER_POOL_SIZE):
+        self.database = database
+        self.pool_size = pool_size
+
+        self._write_lock = threading.RLock()
+        self._writer = None
+
+        self._readers = queue.LifoQueue()
+        self._readers_created = 0
+        self._readers_lock = threading.Lock()
+        self._all_readers = []
+
+    def _connect(self, readonly=False):
+        conn = sqlite3.connect(
+            self.database,
+            check_same_thread=False,
+            cached_statements=CACHED_STATEMENTS,
+            timeout=BUSY_TIMEOUT_MS / 1000
+        )
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(f'PRAGMA cache_size=-{CACHE_SIZE_KB}')
+        conn.execute('PRAGMA temp_store=MEMORY')
+        conn.execute(f'PRAGMA busy_timeout={BUSY_TIMEOUT_MS}')
+        if readonly:
+            conn.execute('PRAGMA query_only=ON')
+            conn.row_factory = sqlite3.Row
+        return conn
+
+    @contextmanager
+    def writer(self):
+        """Conexão de escrita exclusiva. Faz commit ao sair (ou rollback em erro)."""
+        with self._write_lock:
+            if self._writer is None:
+                self._writer = self._connect()
+            try:
+                yield self._writer
+                self._writer.commit()
+            except Exception:
+                self._writer.rollback()
+                raise
+
+    @contextmanager
+    def reader(self):
+        """Empresta uma conexão somente leitura do pool (row_factory = sqlite3.Row)."""
+        conn = self._acquire_reader()
+        try:
+            yield conn
+        finally:
+            # Encerra a transação de leitura para não segurar o snapshot do WAL
+            if conn.in_transaction:
+                conn.rollback()
+            self._readers.put(conn)
+
+    def _acquire_reader(self):
+        try:
+            return self._readers.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._readers_lock:
+            if self._readers_created < self.pool_size:
+                self._readers_created += 1
+                conn = self._connect(readonly=True)
+                self._all_readers.append(conn)
+                return conn
+
+        return self._readers.get()
+
+    def close(self):
+        """Fecha todas as conexões (usado no encerramento)"""
+        with self._write_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+
+        with self._readers_lock:
+            for conn in self._all_readers:
+                conn.close()
+            self._all_readers = []
+            self._readers_created = 0
+            self._readers = queue.LifoQueue()
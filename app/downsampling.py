@@ -0,0 +1,125 @@
+"""
+Redução de séries temporais para o gráfico do dashboard (NumPy)
+
+Modos:
+  lttb   - Largest-Triangle-Three-Buckets: mantém o formato visual da curva
+  minmax - mínimo e máximo de cada bucket: garante que picos não sumam
+  avg    - média por intervalo fixo alinhado no tempo: os pontos não mudam
+           quando a janela anda, então o gráfico pode ser atualizado só com
+           os intervalos novos (cursor `since` de /api/history)
+"""
+import itertools
+
+import numpy as np
+
+METRICS = ('temperature', 'humidity', 'soil_moisture', 'light_level')
+MODES = ('lttb', 'minmax', 'avg')
+
+
+def rows_to_array(rows, n_columns):
+    """
+    Converte um iterável de tuplas numéricas em uma matriz (n, n_columns)
+
+    Consome o iterável em streaming (np.fromiter), sem montar listas de dicts.
+    """
+    flat = np.fromiter(itertools.chain.from_iterable(rows), dtype=np.float64)
+    return flat.reshape(-1, n_columns)
+
+
+def lttb(x, y, n_out):
+    """Índices dos pontos escolhidos pelo Largest-Triangle-Three-Buckets"""
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    # n_out - 2 buckets entre o primeiro e o último ponto (que sempre ficam)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    counts = np.diff(edges)
+    avg_x = np.add.reduceat(x[:n - 1], edges[:-1]) / counts
+    avg_y = np.add.reduceat(y[:n - 1], edges[:-1]) / counts
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        if i + 1 < n_out - 2:
+            cx, cy = avg_x[i + 1], avg_y[i + 1]
+        else:
+            cx, cy = x[n - 1], y[n - 1]
+
+        bx = x[start:end]
+        by = y[start:end]
+        area = np.abs((x[a] - cx) * (by - y[a]) - (x[a] - bx) * (cy - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+
+    return selected
+
+
+def minmax(x, y, n_out):
+    """Índices do mínimo e do máximo de cada bucket (n_out // 2 buckets), em ordem temporal"""
+    n = len(y)
+    n_buckets = max(1, n_out // 2)
+    if n_out >= n:
+        return np.arange(n)
+
+    bucket_ids = np.arange(n) * n_buckets // n
+    order = np.lexsort((y, bucket_ids))
+    sorted_ids = bucket_ids[order]
+
+    starts = np.flatnonzero(np.r_[True, sorted_ids[1:] != sorted_ids[:-1]])
+    ends = np.r_[starts[1:] - 1, n - 1]
+
+    return np.unique(np.concatenate([order[starts], order[ends]]))
+
+
+def downsample(x, y, n_out, mode='lttb'):
+    """Seleciona no máximo ~n_out índices de (x, y) usando o modo pedido"""
+    if mode == 'minmax':
+        return minmax(x, y, n_out)
+    return lttb(x, y, n_out)
+
+
+def reduce_history(rows, metric='temperature', points=200, mode='lttb'):
+    """
+    Reduz o histórico para `points` pontos
+
+    Args:
+        rows: Iterável de tuplas (ts, temperature, humidity, soil_moisture, light_level)
+        metric: Série que guia a seleção; as demais usam os mesmos índices
+        points: Número alvo de pontos
+        mode: 'lttb' ou 'minmax'
+
+    Returns:
+        (ts, series) onde ts é um array de epochs e series um dict métrica -> array
+    """
+    data = rows_to_array(rows, 1 + len(METRICS))
+    ts = data[:, 0]
+    column = 1 + METRICS.index(metric)
+
+    index = downsample(ts, data[:, column], points, mode)
+
+    series = {m: data[index, 1 + i] for i, m in enumerate(METRICS)}
+    return ts[index], series
+
+
+def bucket_average(rows, step):
+    """
+    Média de cada intervalo [k * step, (k + 1) * step)
+
+    Args:
+        rows: Iterável de tuplas (ts, temperature, humidity, soil_moisture, light_level)
+        step: Largura do intervalo em segundos
+
+    Returns:
+        (ts, series) com ts = início de cada intervalo que tem leituras
+    """
+    data = rows_to_array(rows, 1 + len(METRICS))
+    buckets = np.floor(data[:, 0] / step).astype(np.int64)
+    starts, inverse, counts = np.unique(buckets, return_inverse=True, return_counts=True)
+    series = {m: np.bincount(inverse, weights=data[:, 1 + i], minlength=len(starts)) / counts
+              for i, m in enumerate(METRICS)}
+    return starts * float(step), series
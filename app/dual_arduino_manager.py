@@ -2,11 +2,17 @@ import serial
 import serial.tools.list_ports
 import json
 import time
-import threading
-from database import insert_reading, insert_alert, insert_action
-from rabbitmq_config import RabbitMQManager
-
-ALERT_COOLDOWN = 300  
+from alert_publisher import AlertPublisher
+from ingestion import IngestionQueue
+from alert_rules import AlertEngine
+from alert_dedup import AlertDeduplicator, format_summary
+from ring_buffer import RecentReadingsCache
+from serial_io import SerialReactor
+from binary_protocol import FrameDecoder, BINARY_ENABLED, BINARY_BAUDRATE, PROTO_VERSION
+from message_parser import (
+    parse_line, VERBOSE,
+    MSG_READING, MSG_ACTION, MSG_STATUS, MSG_THRESHOLDS, MSG_RESPONSE, MSG_OTHER
+)
 
 class DualArduinoManager:
     """Gerencia a comunicação serial com dois Arduinos (com auto-reconnect)."""
@@ -18,8 +24,7 @@ class DualArduinoManager:
         self.ser2 = None
         self.baudrate = 9600
         self.is_running = False
-        self.thread1 = None
-        self.thread2 = None
+        self.reactor = None
         self.callback = callback
         self.last_sensor_data = {}
         
@@ -38,21 +43,41 @@ class DualArduinoManager:
         self.rabbitmq = None
         self.rabbitmq_connected = False
         
-        self.last_alert_time_1 = 0
-        self.last_alert_time_2 = 0
+        # Alertas publicados: limite de taxa por (nó, tipo, severidade) + resumo dos suprimidos
+        self.alert_dedup = AlertDeduplicator(on_summary=self._publish_alert_summary)
+        
+        # Alertas de limite: avaliados em lote pela fila de ingestão (só transições)
+        self.alert_engine = AlertEngine(self.thresholds)
+        self.recent = RecentReadingsCache()
+        self.ingestion = IngestionQueue(alert_engine=self.alert_engine, on_readings=self._cache_readings)
+        self.frame_decoders = {}
+
+        # Tabelas de despacho por tipo de mensagem (message_parser.MSG_*)
+        self._sensor_handlers = {
+            MSG_READING: self._on_sensor_reading,
+            MSG_ACTION: self._on_sensor_action,
+            MSG_STATUS: self._on_sensor_status,
+            MSG_RESPONSE: self._on_sensor_response,
+            MSG_THRESHOLDS: self._on_sensor_other,
+            MSG_OTHER: self._on_sensor_other,
+        }
+        self._keypad_handlers = {
+            MSG_THRESHOLDS: self._on_keypad_thresholds,
+            MSG_STATUS: self._on_keypad_status,
+            MSG_READING: self._on_keypad_reading,
+        }
         
         if self.use_rabbitmq:
             self._init_rabbitmq()
 
     def _init_rabbitmq(self):
         try:
-            self.rabbitmq = RabbitMQManager()
-            if self.rabbitmq.connect():
-                self.rabbitmq_connected = True
-                print("✓ [RabbitMQ] Conectado e pronto para alertas.")
-            else:
-                print("✗ [RabbitMQ] Falha ao conectar ao RabbitMQ.")
-                self.rabbitmq_connected = False
+            # Publicação em thread própria, com confirmação, reconexão e spool em disco:
+            # alertas emitidos com o broker fora do ar são entregues quando ele voltar
+            self.rabbitmq = AlertPublisher()
+            self.rabbitmq.start()
+            self.rabbitmq_connected = True
+            print("✓ [RabbitMQ] Publicador de alertas pronto.")
         except Exception as e:
             print(f"✗ [RabbitMQ] Erro crítico ao iniciar RabbitMQ: {e}")
             self.rabbitmq_connected = False
@@ -93,154 +118,169 @@ class DualArduinoManager:
 
     def start(self):
         self.is_running = True
-        self.thread1 = threading.Thread(target=self._read_from_port_1, daemon=True)
-        self.thread1.start()
-        self.thread2 = threading.Thread(target=self._read_from_port_2, daemon=True)
-        self.thread2.start()
-        print("✓ Threads de leitura (com auto-reconnect) iniciadas.")
-        time.sleep(1) 
-        self.send_thresholds_to_arduino1()
+        self.ingestion.start()
+        self.alert_dedup.start()
+        self.reactor = SerialReactor()
+        self.reactor.start()
+        self.reactor.add_port('arduino1', self.port1, self.baudrate, self._process_arduino1_data,
+                              on_connect=self._on_arduino1_connect, on_disconnect=self._on_arduino1_disconnect,
+                              serial_instance=self.ser1)
+        self.reactor.add_port('arduino2', self.port2, self.baudrate, self._process_arduino2_data,
+                              on_connect=self._on_arduino2_connect, on_disconnect=self._on_arduino2_disconnect,
+                              serial_instance=self.ser2)
+        print("✓ Leitura serial orientada a eventos (com auto-reconnect) iniciada.")
 
     def stop(self):
         self.is_running = False
-        if self.thread1: self.thread1.join()
-        if self.thread2: self.thread2.join()
-        if self.ser1 and self.ser1.is_open: self.ser1.close()
-        if self.ser2 and self.ser2.is_open: self.ser2.close()
+        if self.reactor: self.reactor.stop()
+        self.ser1 = None
+        self.ser2 = None
+        self.ingestion.stop()
+        self.alert_dedup.stop()
         if self.rabbitmq: self.rabbitmq.disconnect()
         print("Conexões e threads encerradas.")
 
-    def _read_from_port_1(self):
-        """Lê dados do Arduino 1 (Sensores) com auto-reconnect."""
-        print(f"[THREAD 1] Iniciada. Ouvindo Arduino 1 ({self.port1})")
-        while self.is_running:
-            try:
-                if not self.ser1 or not self.ser1.is_open:
-                    if self.port1:
-                        print(f"🔌 [ARDUINO 1] Tentando (re)conectar em {self.port1}...")
-                        self.ser1 = serial.Serial(self.port1, self.baudrate, timeout=1)
-                        time.sleep(2)
-                        print(f"✓✓ [ARDUINO 1] RECONECTADO em {self.port1}!")
-                        self._send_alert('arduino1_reconnected', f"Arduino 1 (Sensores) em {self.port1} RECONECTADO.", 1)
-                        self.send_thresholds_to_arduino1()
-                    else:
-                        time.sleep(5)
-                        continue
-
-                if self.ser1.in_waiting > 0:
-                    line = self.ser1.readline().decode('utf-8').strip()
-                    if line:
-                        self._process_arduino1_data(line)
-                
-            except (serial.SerialException, OSError) as e:
-                print(f"🚨 ERRO (ARDUINO 1): {e}")
-                self._send_alert('arduino1_timeout', f"Arduino 1 (Sensores) em {self.port1} DESCONECTADO. Erro: {e}", 1)
-                if self.ser1:
-                    self.ser1.close()
-                self.ser1 = None
-                time.sleep(5)
-            
-            except Exception as e:
-                print(f"🚨 ERRO INESPERADO (ARDUINO 1): {e}")
-                self._send_alert('arduino_connection_error', f"Erro inesperado no Arduino 1 ({self.port1}). Erro: {e}", 1)
-                time.sleep(5)
+    def _on_arduino1_connect(self, name, reconnected):
+        self.ser1 = self.reactor.get_serial(name)
+        print(f"✓✓ [ARDUINO 1] {'RECONECTADO' if reconnected else 'Ouvindo'} em {self.port1}")
+        if reconnected:
+            self._send_alert('arduino1_reconnected', f"Arduino 1 (Sensores) em {self.port1} RECONECTADO.", 1)
+        self.send_thresholds_to_arduino1()
 
-            time.sleep(0.01)
+    def _on_arduino1_disconnect(self, name, error):
+        self.ser1 = None
+        # Ao reabrir a porta o Arduino reinicia em JSON e renegocia
+        self.frame_decoders.pop('arduino1', None)
+        self._send_alert('arduino1_timeout', f"Arduino 1 (Sensores) em {self.port1} DESCONECTADO. Erro: {error}", 1)
 
-    def _read_from_port_2(self):
-        """Lê dados do Arduino 2 (Teclado) com auto-reconnect."""
-        print(f"[THREAD 2] Iniciada. Ouvindo Arduino 2 ({self.port2})")
-        while self.is_running:
-            try:
-                if not self.ser2 or not self.ser2.is_open:
-                    if self.port2:
-                        print(f"🔌 [ARDUINO 2] Tentando (re)conectar em {self.port2}...")
-                        self.ser2 = serial.Serial(self.port2, self.baudrate, timeout=1)
-                        time.sleep(2)
-                        print(f"✓✓ [ARDUINO 2] RECONECTADO em {self.port2}!")
-                    else:
-                        time.sleep(5)
-                        continue
-
-                if self.ser2.in_waiting > 0:
-                    line = self.ser2.readline().decode('utf-8').strip()
-                    if line:
-                        self._process_arduino2_data(line)
-                
-            except (serial.SerialException, OSError) as e:
-                print(f"🚨 ERRO (ARDUINO 2): {e}")
-                
-                if self.ser2:
-                    self.ser2.close()
-                self.ser2 = None
-                time.sleep(5)
-            
-            except Exception as e:
-                print(f"🚨 ERRO INESPERADO (ARDUINO 2): {e}")
-                time.sleep(5)
+    def _on_arduino2_connect(self, name, reconnected):
+        self.ser2 = self.reactor.get_serial(name)
+        print(f"✓✓ [ARDUINO 2] {'RECONECTADO' if reconnected else 'Ouvindo'} em {self.port2}")
 
-            time.sleep(0.01)
+    def _on_arduino2_disconnect(self, name, error):
+        self.ser2 = None
 
     def _process_arduino1_data(self, data_line):
-        """Processa JSON vindo do Arduino 1 (Sensores)"""
-        try:
-            data = json.loads(data_line)
-            
-            if data.get('source') == 'arduino1' and 'temp' in data:
-                self.last_sensor_data = data
-                insert_reading(data.get('temp'), data.get('humid'), data.get('soil'), data.get('light'))
-                self._check_alerts(data.get('temp'), data.get('humid'), data.get('soil'), data.get('light'))
-                if self.callback:
-                    self.callback(data)
-            
-            elif 'action' in data:
-                self._process_actuator_action(data)
-            
-            elif 'status' in data and data['status'] == 'arduino1_ready':
-                print("✓ Arduino 1 (Sensores) reportou estar pronto. Enviando thresholds...")
-                self.send_thresholds_to_arduino1()
-            
-            elif data.get('source') == 'arduino2_keypad':
-                print("✗ [ERRO DE PORTA] Arduino 1 está recebendo dados do Arduino 2! TROQUE OS CABOS USB.")
-            
-            elif 'response' in data and 'thresholds_updated' in data['response']:
-                print(f"✓ [ARDUINO 1] Confirmou atualização de thresholds ({data['response']}).")
+        """Processa JSON (ou frame binário) vindo do Arduino 1 (Sensores)"""
+        kind, data = self._parse(data_line, 'arduino1')
+        if data is None:
+            if VERBOSE:
+                print(f"[ARDUINO 1] (Ignorado) {data_line}")
+            return
+        self._handle_sensor_message(kind, data)
+
+    def _parse(self, item, node_id):
+        """Linha JSON (str) ou, após a negociação do protocolo binário, frame COBS (bytes)"""
+        if isinstance(item, bytes):
+            decoder = self.frame_decoders.get(node_id)
+            return decoder.decode(item) if decoder else (None, None)
+        return parse_line(item)
+
+    def _handle_sensor_message(self, kind, data, node_id='arduino1'):
+        """Despacha uma mensagem já decodificada de um nó sensor pelo tipo"""
+        handler = self._sensor_handlers.get(kind)
+        if handler:
+            handler(data, node_id)
+
+    def _on_sensor_reading(self, data, node_id):
+        if data.get('source') != 'arduino1':
+            return
+        temp, humid, soil, light = data['temp'], data.get('humid'), data.get('soil'), data.get('light')
+        data['node_id'] = node_id
+        self.last_sensor_data = data
+        self.ingestion.put_reading(temp, humid, soil, light, node_id)
+        if self.callback:
+            self.callback(data)
+
+    def _cache_readings(self, rows, ids):
+        """Leituras gravadas (thread da ingestão): entram no cache com o id do banco"""
+        for row, row_id in zip(rows, ids):
+            self.recent.append(row[6], *row[2:6], ts=row[1], row_id=row_id)
+
+    def _on_sensor_action(self, data, node_id):
+        self._process_actuator_action(data, node_id)
+
+    def _on_sensor_status(self, data, node_id):
+        if data['status'] == 'arduino1_ready':
+            print(f"✓ Nó sensor {node_id} reportou estar pronto. Enviando thresholds...")
+            self._on_sensor_ready(node_id)
+            if BINARY_ENABLED and data.get('proto') == PROTO_VERSION:
+                self._send_to_node(node_id, f"BINARY:{BINARY_BAUDRATE}")
+
+    def _on_sensor_ready(self, node_id):
+        self.send_thresholds_to_arduino1()
+
+    def _send_to_node(self, node_id, command):
+        return self.send_command_to_arduino1(command)
+
+    def _port_name(self, node_id):
+        """Nome da porta do nó no SerialReactor"""
+        return 'arduino1'
 
-        except json.JSONDecodeError:
-            print(f"[ARDUINO 1] (Ignorado) {data_line}")
+    def _on_sensor_response(self, data, node_id):
+        if data['response'] == 'binary_on':
+            baudrate = data.get('baud') or BINARY_BAUDRATE
+            self.frame_decoders[node_id] = FrameDecoder()
+            self.reactor.set_framing(self._port_name(node_id), 'cobs', baudrate)
+            print(f"✓ [{node_id.upper()}] Protocolo binário v{data.get('proto')} ativo a {baudrate} baud")
+        elif 'thresholds_updated' in data['response']:
+            print(f"✓ [{node_id.upper()}] Confirmou atualização de thresholds ({data['response']}).")
+        elif VERBOSE:
+            print(f"[{node_id.upper()}] {data['response']}")
+
+    def _on_sensor_other(self, data, node_id):
+        if str(data.get('source', '')).startswith('arduino2'):
+            print("✗ [ERRO DE PORTA] Arduino 1 está recebendo dados do Arduino 2! TROQUE OS CABOS USB.")
 
     def _process_arduino2_data(self, data_line):
         """Processa JSON vindo do Arduino 2 (Teclado)"""
-        print(f"[ARDUINO 2] {data_line}")
-        try:
-            data = json.loads(data_line)
-            
-            if data.get('source') == 'arduino2' and 'thresholds' in data:
-                
-                print("✓ [SINCRONIZAÇÃO] Novos thresholds recebidos do Arduino 2 (Teclado)")
-                
-                self.thresholds['temp_max'] = data['thresholds'].get('tempMax', self.thresholds['temp_max'])
-                self.thresholds['temp_min'] = data['thresholds'].get('tempMin', self.thresholds['temp_min'])
-                self.thresholds['humid_max'] = data['thresholds'].get('umiMax', self.thresholds['humid_max'])
-                self.thresholds['humid_min'] = data['thresholds'].get('umiMin', self.thresholds['humid_min'])
-                self.thresholds['soil_min'] = data['thresholds'].get('terraMin', self.thresholds['soil_min'])
-                self.thresholds['light_min'] = data['thresholds'].get('luzMin', self.thresholds['light_min'])
-                
-                print(f"✓ [SINCRONIZAÇÃO] Thresholds atualizados: {self.thresholds}")
-                
-                self.send_thresholds_to_arduino1()
-                
-            elif 'status' in data and data['status'] == 'arduino2_ready':
-                print("✓ Arduino 2 (Teclado) reportou estar pronto.")
-
-            elif data.get('source') == 'arduino1':
-                print("✗ [ERRO DE PORTA] Arduino 2 está recebendo dados do Arduino 1! TROQUE OS CABOS USB.")
-
-        except json.JSONDecodeError:
-            print(f"[ARDUINO 2] (Ignorado) {data_line}")
+        if VERBOSE:
+            print(f"[ARDUINO 2] {data_line}")
+        kind, data = parse_line(data_line)
+        if data is None:
+            if VERBOSE:
+                print(f"[ARDUINO 2] (Ignorado) {data_line}")
+            return
+        self._handle_keypad_message(kind, data)
+
+    def _handle_keypad_message(self, kind, data):
+        """Despacha uma mensagem já decodificada de um nó teclado pelo tipo"""
+        handler = self._keypad_handlers.get(kind)
+        if handler:
+            handler(data)
+
+    def _on_keypad_thresholds(self, data):
+        if data.get('source') != 'arduino2':
+            return
+
+        print("✓ [SINCRONIZAÇÃO] Novos thresholds recebidos do Arduino 2 (Teclado)")
+
+        self.thresholds['temp_max'] = data['thresholds'].get('tempMax', self.thresholds['temp_max'])
+        self.thresholds['temp_min'] = data['thresholds'].get('tempMin', self.thresholds['temp_min'])
+        self.thresholds['humid_max'] = data['thresholds'].get('umiMax', self.thresholds['humid_max'])
+        self.thresholds['humid_min'] = data['thresholds'].get('umiMin', self.thresholds['humid_min'])
+        self.thresholds['soil_min'] = data['thresholds'].get('terraMin', self.thresholds['soil_min'])
+        self.thresholds['light_min'] = data['thresholds'].get('luzMin', self.thresholds['light_min'])
+
+        print(f"✓ [SINCRONIZAÇÃO] Thresholds atualizados: {self.thresholds}")
+
+        self.send_thresholds_to_arduino1()
+
+    def _on_keypad_status(self, data):
+        if data['status'] == 'arduino2_ready':
+            print("✓ Arduino 2 (Teclado) reportou estar pronto.")
+
+    def _on_keypad_reading(self, data):
+        print("✗ [ERRO DE PORTA] Arduino 2 está recebendo dados do Arduino 1! TROQUE OS CABOS USB.")
 
     def send_command_to_arduino1(self, command):
         """Envia um comando de texto para o Arduino 1."""
+        if self.reactor:
+            # A queda da porta (se houver) é tratada pelo reactor
+            if not self.reactor.write('arduino1', f"{command}\n".encode('utf-8')):
+                print("✗ ERRO ao enviar comando para Ardu1: porta indisponível")
+                return False
+            return True
         if self.ser1 and self.ser1.is_open:
             try:
                 self.ser1.write(f"{command}\n".encode('utf-8'))
@@ -252,19 +292,22 @@ class DualArduinoManager:
                 return False
         return False
         
+    def _thresholds_command(self):
+        """JSON de thresholds no formato esperado pelo firmware dos nós sensores"""
+        return json.dumps({
+            "tempMax": self.thresholds['temp_max'],
+            "tempMin": self.thresholds['temp_min'],
+            "umiMax": self.thresholds['humid_max'],
+            "umiMin": self.thresholds['humid_min'],
+            "terraMin": self.thresholds['soil_min'],
+            "luzMin": self.thresholds['light_min']
+        })
+
     def send_thresholds_to_arduino1(self):
         """Envia o JSON de thresholds (formato Arduino) para o Arduino 1."""
         if self.ser1 and self.ser1.is_open:
             try:
-                arduino_json_payload = {
-                    "tempMax": self.thresholds['temp_max'],
-                    "tempMin": self.thresholds['temp_min'],
-                    "umiMax": self.thresholds['humid_max'],
-                    "umiMin": self.thresholds['humid_min'],
-                    "terraMin": self.thresholds['soil_min'],
-                    "luzMin": self.thresholds['light_min']
-                }
-                json_string = json.dumps(arduino_json_payload)
+                json_string = self._thresholds_command()
                 print(f"[CMD ARDU1] Enviando thresholds: {json_string}")
                 self.send_command_to_arduino1(json_string)
                 return True
@@ -272,41 +315,33 @@ class DualArduinoManager:
                 print(f"[MANAGER ERROR] Falha ao enviar thresholds: {e}")
                 return False
 
-    def _send_alert(self, type, message, port_num):
-        """Envia alerta via RabbitMQ com controle de cooldown."""
-        if not self.rabbitmq_connected:
-            return
+    def _send_alert(self, type, message, port_num, severity='critical', node_id=None):
+        """Envia alerta via RabbitMQ, limitado por (nó, tipo, severidade)."""
+        if not self.rabbitmq_connected or not self.rabbitmq:
+            return False
+
+        node_id = node_id or f"arduino{port_num}"
+        if not self.alert_dedup.allow(node_id, type, severity):
+            if VERBOSE:
+                print(f"[RABBITMQ] Alerta suprimido (limite de taxa): {node_id} {type}")
+            return False
 
-        now = time.time()
-        
-        if port_num == 1:
-            if now - self.last_alert_time_1 > ALERT_COOLDOWN:
-                self.last_alert_time_1 = now
-                self.rabbitmq.publish_alert({'type': type, 'message': message, 'severity': 'critical'})
-                print(f"[RABBITMQ] Alerta (Ardu1) publicado: {type}")
-        
-        elif port_num == 2:
-            if now - self.last_alert_time_2 > ALERT_COOLDOWN:
-                self.last_alert_time_2 = now
-                self.rabbitmq.publish_alert({'type': type, 'message': message, 'severity': 'critical'})
-                print(f"[RABBITMQ] Alerta (Ardu2) publicado: {type}")
-
-    def _check_alerts(self, temp, humid, soil, light):
-        """Verifica condições de alerta"""
         try:
-            if temp > self.thresholds['temp_max']:
-                insert_alert('high_temperature', f'Temp alta: {temp}°C', 'warning')
-            
-            if temp < self.thresholds['temp_min']:
-                insert_alert('low_temperature', f'Temp baixa: {temp}°C', 'warning')
-            
-            if soil < self.thresholds['soil_min']:
-                insert_alert('low_soil_moisture', f'Solo seco: {soil}%', 'critical')
-            
-            if humid < self.thresholds['humid_min']:
-                insert_alert('low_humidity', f'Umidade baixa: {humid}%', 'warning')
+            self.rabbitmq.publish_alert({'type': type, 'message': message, 'severity': severity, 'node_id': node_id})
+            print(f"[RABBITMQ] Alerta ({node_id}) publicado: {type}")
+            return True
         except Exception as e:
-            print(f"✗ Erro ao checar alertas: {e}")
+            print(f"[RABBITMQ ERROR] Falha ao publicar alerta {type}: {e}")
+            return False
+
+    def _publish_alert_summary(self, summary):
+        """Publica o resumo periódico dos alertas suprimidos (fora do limite de taxa)"""
+        if self.rabbitmq_connected and self.rabbitmq:
+            self.rabbitmq.publish_alert({'type': 'alerts_suppressed', 'message': format_summary(summary), 'severity': 'info'})
+
+    def get_protocol_stats(self):
+        """Contadores dos frames binários por nó (vazio no modo JSON)"""
+        return {node_id: decoder.get_stats() for node_id, decoder in list(self.frame_decoders.items())}
 
     def update_thresholds_from_app(self, new_thresholds_dict):
         """
@@ -337,7 +372,7 @@ class DualArduinoManager:
             print(f"✗ [SINCRONIZAÇÃO] Erro ao atualizar thresholds: {e}")
             return False, str(e)
 
-    def _process_actuator_action(self, data):
+    def _process_actuator_action(self, data, node_id='arduino1'):
         """
         Processa ações automáticas (JSONs 'action') do Arduino 1
         e envia alertas detalhados para o RabbitMQ.
@@ -349,64 +384,32 @@ class DualArduinoManager:
         print(f"✓ [ATUADOR ARDU1] {action} (Motivo: {reason}, Valor: {value})")
 
         if action == 'pump_auto_on':
-            insert_action('pump_auto', 'activated', f'Bomba ligada - Solo: {value}%')
-            
-            if self.rabbitmq_connected and self.rabbitmq:
-                try:
-                    self.rabbitmq.publish_alert({
-                        'type': 'pump_activated',
-                        'message': f'💧 Bomba d\'água LIGADA!\nSolo: {value}% (Limite: {self.thresholds["soil_min"]}%)',
-                        'severity': 'info'
-                    })
-                except: pass
+            self.ingestion.put_action('pump_auto', 'activated', f'Bomba ligada - Solo: {value}%')
+            self._send_alert('pump_activated',
+                             f'💧 Bomba d\'água LIGADA!\nSolo: {value}% (Limite: {self.thresholds["soil_min"]}%)',
+                             1, severity='info', node_id=node_id)
 
         elif action == 'cooler_auto_on':
-            insert_action('cooler_auto', 'activated', f'Cooler ligado - Temp: {value}°C')
-            
-            if self.rabbitmq_connected and self.rabbitmq:
-                try:
-                    self.rabbitmq.publish_alert({
-                        'type': 'cooler_activated',
-                        'message': f'❄️ Cooler LIGADO!\nTemp: {value}°C (Limite: {self.thresholds["temp_max"]}°C)',
-                        'severity': 'info'
-                    })
-                except: pass
+            self.ingestion.put_action('cooler_auto', 'activated', f'Cooler ligado - Temp: {value}°C')
+            self._send_alert('cooler_activated',
+                             f'❄️ Cooler LIGADO!\nTemp: {value}°C (Limite: {self.thresholds["temp_max"]}°C)',
+                             1, severity='info', node_id=node_id)
         
         elif action == 'cooler_auto_off':
-            insert_action('cooler_auto', 'deactivated', f'Cooler desligado - Temp: {value}°C')
-            
-            if self.rabbitmq_connected and self.rabbitmq:
-                try:
-                    self.rabbitmq.publish_alert({
-                        'type': 'cooler_deactivated',
-                        'message': f'✅ Cooler DESLIGADO.\nTemp: {value}°C (Normalizada)',
-                        'severity': 'info'
-                    })
-                except: pass
+            self.ingestion.put_action('cooler_auto', 'deactivated', f'Cooler desligado - Temp: {value}°C')
+            self._send_alert('cooler_deactivated', f'✅ Cooler DESLIGADO.\nTemp: {value}°C (Normalizada)',
+                             1, severity='info', node_id=node_id)
 
         elif action == 'light_auto_on':
-            insert_action('light_auto', 'activated', f'Fita LED ligada - Luz: {value}%')
-            
-            if self.rabbitmq_connected and self.rabbitmq:
-                try:
-                    self.rabbitmq.publish_alert({
-                        'type': 'light_activated',
-                        'message': f'💡 Fita LED LIGADA!\nLuz: {value}% (Limite: {self.thresholds["light_min"]}%)',
-                        'severity': 'info'
-                    })
-                except: pass
+            self.ingestion.put_action('light_auto', 'activated', f'Fita LED ligada - Luz: {value}%')
+            self._send_alert('light_activated',
+                             f'💡 Fita LED LIGADA!\nLuz: {value}% (Limite: {self.thresholds["light_min"]}%)',
+                             1, severity='info', node_id=node_id)
         
         elif action == 'light_auto_off':
-            insert_action('light_auto', 'deactivated', f'Fita LED desligada - Luz: {value}%')
-            
-            if self.rabbitmq_connected and self.rabbitmq:
-                try:
-                    self.rabbitmq.publish_alert({
-                        'type': 'light_deactivated',
-                        'message': f'🌞 Fita LED DESLIGADA.\nLuz: {value}% (Suficiente)',
-                        'severity': 'info'
-                    })
-                except: pass
+            self.ingestion.put_action('light_auto', 'deactivated', f'Fita LED desligada - Luz: {value}%')
+            self._send_alert('light_deactivated', f'🌞 Fita LED DESLIGADA.\nLuz: {value}% (Suficiente)',
+                             1, severity='info', node_id=node_id)
     
     def get_last_data(self):
         return self.last_sensor_data
\ No newline at end of file
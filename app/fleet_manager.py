@@ -0,0 +1,330 @@
+"""
+Gerenciador de frota: qualquer número de nós sensores e teclados em um host
+
+Generaliza o DualArduinoManager. Em vez de exigir exatamente duas portas e
+atribuí-las pela ordem dos nomes, cada porta candidata é aberta e o nó é
+identificado pelo que ele mesmo envia: o handshake de boot
+({"status": "arduino1_ready", ...}) ou o campo "source" das mensagens.
+O firmware pode enviar "node" no handshake para fixar o node_id da zona.
+
+Todas as portas são lidas por um único SerialReactor; as linhas completas
+são distribuídas para um pool pequeno e fixo de workers (cada nó sempre no
+mesmo worker, preservando a ordem das mensagens dele) e todos os nós
+compartilham a mesma IngestionQueue, com as leituras marcadas por node_id.
+"""
+import os
+import queue
+import threading
+import time
+
+import serial.tools.list_ports
+
+from dual_arduino_manager import DualArduinoManager
+from message_parser import VERBOSE, MSG_STATUS
+from serial_io import SerialReactor
+
+WORKER_COUNT = 4
+WORKER_QUEUE_SIZE = 5000
+SCAN_INTERVAL = 10.0
+
+# Portas fixas (separadas por vírgula); sem isso as portas são descobertas
+FLEET_PORTS = os.environ.get('GREENHOUSE_FLEET_PORTS', '')
+
+ROLE_SENSOR = 'sensor'
+ROLE_KEYPAD = 'keypad'
+
+READY_ROLES = {
+    'arduino1_ready': ROLE_SENSOR,
+    'arduino2_ready': ROLE_KEYPAD,
+}
+
+SOURCE_ROLES = {
+    'arduino1': ROLE_SENSOR,
+    'arduino2': ROLE_KEYPAD,
+    'arduino2_keypad': ROLE_KEYPAD,
+}
+
+
+def is_candidate_port(port):
+    """Mesmo critério de DualArduinoManager.find_ports"""
+    return 'ACM' in port.device or 'USB' in port.device or 'arduino' in (port.description or '').lower()
+
+
+class FleetNode:
+    """Estado de um nó (uma porta serial)"""
+
+    def __init__(self, device, worker):
+        self.device = device
+        self.worker = worker
+        self.node_id = None
+        self.role = None
+        self.connected = False
+        self.last_seen = None
+        self.messages = 0
+
+    def to_dict(self):
+        return {
+            'node_id': self.node_id,
+            'role': self.role,
+            'device': self.device,
+            'connected': self.connected,
+            'last_seen': self.last_seen,
+            'messages': self.messages
+        }
+
+
+class FleetManager(DualArduinoManager):
+    """
+    N nós sensores/teclado sobre um reactor serial e um pool fixo de workers
+
+    Args:
+        workers: Número de threads que processam as linhas recebidas
+        scan_interval: Intervalo (s) entre buscas por portas novas (hotplug)
+        devices: Lista fixa de portas (padrão: GREENHOUSE_FLEET_PORTS ou descoberta)
+    """
+
+    def __init__(self, callback=None, use_rabbitmq=True, workers=WORKER_COUNT,
+                 scan_interval=SCAN_INTERVAL, devices=None):
+        super().__init__(callback=callback, use_rabbitmq=use_rabbitmq)
+        self.workers = workers
+        self.scan_interval = scan_interval
+        if devices is None and FLEET_PORTS:
+            devices = [device.strip() for device in FLEET_PORTS.split(',') if device.strip()]
+        self.devices = devices
+
+        self.nodes = {}
+        self._by_id = {}
+        self._nodes_lock = threading.Lock()
+        self._queues = [queue.Queue(maxsize=WORKER_QUEUE_SIZE) for _ in range(workers)]
+        self._worker_threads = []
+        self.dropped_lines = 0
+
+    # ==================== DESCOBERTA ====================
+
+    def find_ports(self):
+        """Lista as portas candidatas (não exige um número mínimo de nós)"""
+        if self.devices:
+            return list(self.devices)
+        return sorted(port.device for port in serial.tools.list_ports.comports() if is_candidate_port(port))
+
+    def connect(self):
+        devices = self.find_ports()
+        if devices:
+            print(f"✓ [FLEET] {len(devices)} porta(s) candidata(s): {', '.join(devices)}")
+        else:
+            print(f"⚠️  [FLEET] Nenhuma porta encontrada; nova busca a cada {self.scan_interval:.0f}s")
+        return True
+
+    def _scan(self):
+        if not self.is_running:
+            return
+        try:
+            for device in self.find_ports():
+                if device not in self.nodes:
+                    self._add_node(device)
+        except Exception as e:
+            print(f"✗ [FLEET] Falha ao buscar portas: {e}")
+        if self.scan_interval:
+            self.reactor.call_later(self.scan_interval, self._scan)
+
+    def _add_node(self, device):
+        with self._nodes_lock:
+            node = FleetNode(device, len(self.nodes) % self.workers)
+            self.nodes[device] = node
+        self.reactor.add_port(device, device, self.baudrate, lambda line: self._dispatch(node, line),
+                              on_connect=self._on_node_connect, on_disconnect=self._on_node_disconnect)
+
+    # ==================== CICLO DE VIDA ====================
+
+    def start(self):
+        self.is_running = True
+        self.ingestion.start()
+        self.alert_dedup.start()
+        for i, worker_queue in enumerate(self._queues):
+            thread = threading.Thread(target=self._worker, args=(worker_queue,), daemon=True, name=f'fleet-worker-{i}')
+            thread.start()
+            self._worker_threads.append(thread)
+        self.reactor = SerialReactor()
+        self.reactor.start()
+        self._scan()
+        print(f"✓ [FLEET] Reactor serial e {self.workers} workers iniciados.")
+
+    def stop(self):
+        self.is_running = False
+        if self.reactor: self.reactor.stop()
+        for worker_queue in self._queues:
+            worker_queue.put(None)
+        for thread in self._worker_threads:
+            thread.join(5)
+        self._worker_threads = []
+        self.ingestion.stop()
+        self.alert_dedup.stop()
+        if self.rabbitmq: self.rabbitmq.disconnect()
+        print("Conexões e threads encerradas.")
+
+    # ==================== CONEXÃO ====================
+
+    def _on_node_connect(self, device, reconnected):
+        node = self.nodes[device]
+        node.connected = True
+        self._refresh_ports()
+        if reconnected and node.role == ROLE_SENSOR:
+            self._send_alert('arduino1_reconnected', f"Nó {node.node_id} em {device} RECONECTADO.", 1,
+                             node_id=node.node_id)
+
+    def _on_node_disconnect(self, device, error):
+        node = self.nodes[device]
+        node.connected = False
+        self.frame_decoders.pop(node.node_id, None)
+        self._refresh_ports()
+        if node.role == ROLE_SENSOR:
+            self._send_alert('arduino1_timeout', f"Nó {node.node_id} em {device} DESCONECTADO. Erro: {error}", 1,
+                             node_id=node.node_id)
+
+    def _refresh_ports(self):
+        """Mantém ser1/ser2 e port1/port2 (usados por app.py) apontando para um nó de cada papel"""
+        sensor = keypad = None
+        with self._nodes_lock:
+            for node in self.nodes.values():
+                if not node.connected:
+                    continue
+                if node.role == ROLE_SENSOR and sensor is None:
+                    sensor = node
+                elif node.role == ROLE_KEYPAD and keypad is None:
+                    keypad = node
+        self.ser1 = self.reactor.get_serial(sensor.device) if sensor else None
+        self.ser2 = self.reactor.get_serial(keypad.device) if keypad else None
+        self.port1 = sensor.device if sensor else None
+        self.port2 = keypad.device if keypad else None
+
+    # ==================== PROCESSAMENTO ====================
+
+    def _dispatch(self, node, line):
+        """Chamado na thread do reactor: só repassa a linha ao worker do nó"""
+        try:
+            self._queues[node.worker].put_nowait((node, line))
+        except queue.Full:
+            # Não bloqueia o reactor (pararia a leitura de todos os nós)
+            self.dropped_lines += 1
+
+    def _worker(self, worker_queue):
+        while True:
+            item = worker_queue.get()
+            if item is None:
+                return
+            node, line = item
+            try:
+                self._handle_line(node, line)
+            except Exception as e:
+                print(f"🚨 [FLEET] Erro ao processar linha de {node.node_id or node.device}: {e}")
+
+    def _handle_line(self, node, line):
+        kind, data = self._parse(line, node.node_id)
+        if data is None:
+            if VERBOSE:
+                print(f"[{node.node_id or node.device}] (Ignorado) {line}")
+            return
+
+        node.last_seen = time.time()
+        node.messages += 1
+
+        if node.role is None or kind == MSG_STATUS:
+            self._identify(node, data)
+
+        if node.role == ROLE_SENSOR:
+            self._handle_sensor_message(kind, data, node.node_id)
+        elif node.role == ROLE_KEYPAD:
+            self._handle_keypad_message(kind, data)
+
+    def _identify(self, node, data):
+        """Define papel e node_id a partir do handshake ou do campo source"""
+        status = data.get('status')
+        role = READY_ROLES.get(status) or SOURCE_ROLES.get(data.get('source'))
+        if role is None:
+            return
+
+        base = data.get('source') or status[:-len('_ready')]
+        with self._nodes_lock:
+            node_id = data.get('node') or node.node_id
+            if node_id is None:
+                # Sem "node" no firmware: o primeiro nó de cada tipo mantém o id histórico
+                owner = self._by_id.get(base)
+                node_id = base if owner is None or owner is node else f"{base}@{os.path.basename(node.device)}"
+            changed = (node.node_id, node.role) != (node_id, role)
+            if node.node_id and node.node_id != node_id:
+                self._by_id.pop(node.node_id, None)
+            node.node_id = node_id
+            node.role = role
+            self._by_id[node_id] = node
+
+        if changed:
+            print(f"✓ [FLEET] {node.device} identificado como {node_id} ({role})")
+            self._refresh_ports()
+
+    # ==================== COMANDOS ====================
+
+    def send_command(self, node_id, command):
+        """Envia um comando de texto para um nó específico"""
+        node = self._by_id.get(node_id)
+        if node is None or not self.reactor:
+            return False
+        return self.reactor.write(node.device, f"{command}\n".encode('utf-8'))
+
+    def sensor_nodes(self):
+        with self._nodes_lock:
+            return [node.node_id for node in self.nodes.values() if node.role == ROLE_SENSOR and node.connected]
+
+    def send_command_to_arduino1(self, command):
+        """Envia o comando a todos os nós sensores conectados"""
+        results = [self.send_command(node_id, command) for node_id in self.sensor_nodes()]
+        return any(results)
+
+    def send_thresholds_to_arduino1(self):
+        """Envia os thresholds a todos os nós sensores conectados"""
+        json_string = self._thresholds_command()
+        print(f"[CMD FLEET] Enviando thresholds: {json_string}")
+        return self.send_command_to_arduino1(json_string)
+
+    def _on_sensor_ready(self, node_id):
+        self.send_command(node_id, self._thresholds_command())
+
+    def _send_to_node(self, node_id, command):
+        return self.send_command(node_id, command)
+
+    def _port_name(self, node_id):
+        return self._by_id[node_id].device
+
+    def get_nodes(self):
+        with self._nodes_lock:
+            nodes = [node.to_dict() for node in self.nodes.values()]
+        return sorted(nodes, key=lambda node: (node['role'] or '', node['node_id'] or node['device']))
+
+    def get_stats(self):
+        return {
+            'nodes': len(self.nodes),
+            'identified': len(self._by_id),
+            'workers': self.workers,
+            'worker_queue_depth': [worker_queue.qsize() for worker_queue in self._queues],
+            'dropped_lines': self.dropped_lines
+        }
+
+
+if __name__ == '__main__':
+    import sys
+    from database import init_database
+
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else WORKER_COUNT
+
+    init_database()
+    manager = FleetManager(use_rabbitmq=False, workers=workers)
+    manager.connect()
+    manager.start()
+    try:
+        while True:
+            time.sleep(10)
+            for node in manager.get_nodes():
+                print(f"  {node['node_id'] or '?':<24} {node['role'] or '?':<8} {node['device']:<16} "
+                      f"{'on' if node['connected'] else 'off':<4} msgs={node['messages']}")
+            print(f"  {manager.get_stats()}")
+    except KeyboardInterrupt:
+        manager.stop()
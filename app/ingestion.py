@@ -0,0 +1,223 @@
+import queue
+import threading
+import time
+
+from database import insert_readings_with_ids, insert_alerts_batch, insert_actions_batch, utc_now, DEFAULT_NODE_ID
+from alert_rules import format_event
+
+BATCH_SIZE = 200
+FLUSH_INTERVAL = 1.0
+MAX_QUEUE_SIZE = 10000
+
+_STOP = object()
+
+
+class IngestionQueue:
+    """
+    Fila write-behind para gravação no banco.
+
+    Leituras, alertas e ações são enfileirados pelas threads seriais e
+    gravados em lote (executemany, um único commit) por uma thread dedicada,
+    quando o lote atinge batch_size ou quando flush_interval expira.
+
+    Com um alert_engine (alert_rules.AlertEngine), cada lote de leituras é
+    avaliado antes da gravação e as transições de alerta entram no mesmo flush.
+
+    on_flush(*tabelas) é chamado após cada flush com as tabelas gravadas
+    (ex.: invalidar o cache de respostas da API). on_readings(rows, ids)
+    recebe as leituras gravadas com os ids atribuídos pelo banco (ex.: o
+    cache de leituras recentes).
+    """
+
+    def __init__(self, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL, max_queue_size=MAX_QUEUE_SIZE,
+                 alert_engine=None, on_flush=None, on_readings=None):
+        self.batch_size = batch_size
+        self.alert_engine = alert_engine
+        self.on_flush = on_flush
+        self.on_readings = on_readings
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._thread = None
+        self._lock = threading.Lock()
+
+        self._pending = {'readings': [], 'alerts': [], 'actions': []}
+        self._writers = {
+            'readings': self._write_readings,
+            'alerts': insert_alerts_batch,
+            'actions': insert_actions_batch
+        }
+
+        self.stats = {
+            'enqueued': 0,
+            'flushed': 0,
+            'failed': 0,
+            'flushes': 0,
+            'last_flush_ms': 0.0,
+            'max_flush_ms': 0.0,
+            'total_flush_ms': 0.0
+        }
+
+    # ==================== PRODUTORES ====================
+
+    def put_reading(self, temperature, humidity, soil_moisture, light_level, node_id=DEFAULT_NODE_ID):
+        """Enfileira uma leitura de sensores do nó node_id"""
+        self._put('readings', (*utc_now(), temperature, humidity, soil_moisture, light_level, node_id))
+
+    def put_alert(self, alert_type, message, severity='warning'):
+        """Enfileira um alerta"""
+        self._put('alerts', (*utc_now(), alert_type, message, severity))
+
+    def put_action(self, action_type, status='completed', details=None):
+        """Enfileira uma ação realizada"""
+        self._put('actions', (*utc_now(), action_type, status, details))
+
+    def _put(self, kind, row):
+        # Bloqueia quando a fila está cheia (backpressure) em vez de descartar dados
+        self._queue.put((kind, row))
+        with self._lock:
+            self.stats['enqueued'] += 1
+
+    # ==================== CICLO DE VIDA ====================
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        print(f"[INGESTION] Fila iniciada (lote: {self.batch_size}, intervalo: {self.flush_interval}s)")
+
+    def stop(self, timeout=10):
+        """Para a thread de gravação, gravando tudo o que ainda estiver na fila"""
+        if self._thread and self._thread.is_alive():
+            self._queue.put((_STOP, None))
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                # A thread ainda está gravando (SQLite lento): ela termina o que resta;
+                # gravar daqui também faria dois flushes dividindo o mesmo lote
+                print(f"[INGESTION] ⚠️  Tempo de encerramento esgotado ({timeout}s); "
+                      f"a thread de gravação termina o que resta")
+                return
+        self._thread = None
+        # Garante que nada fique pendente mesmo se a thread não estava ativa
+        self._drain()
+        self.flush()
+        print(f"[INGESTION] Fila encerrada. {self.stats['flushed']} registros gravados")
+
+    def _run(self):
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                kind, row = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                self.flush()
+                deadline = None
+                continue
+
+            if kind is _STOP:
+                self._drain()
+                self.flush()
+                return
+
+            self._pending[kind].append(row)
+            if deadline is None:
+                deadline = time.monotonic() + self.flush_interval
+
+            if self._pending_count() >= self.batch_size:
+                self.flush()
+                deadline = None
+
+    def _drain(self):
+        while True:
+            try:
+                kind, row = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if kind is not _STOP:
+                self._pending[kind].append(row)
+
+    def _pending_count(self):
+        return sum(len(rows) for rows in self._pending.values())
+
+    # ==================== GRAVAÇÃO ====================
+
+    def flush(self):
+        """Grava os lotes pendentes (uma transação por tabela)"""
+        if not self._pending_count():
+            return 0
+
+        start = time.perf_counter()
+        flushed = 0
+        failed = 0
+        written = []
+
+        if self.alert_engine and self._pending['readings']:
+            self._evaluate_alerts(self._pending['readings'])
+
+        for kind, rows in self._pending.items():
+            if not rows:
+                continue
+            inserted = self._writers[kind](rows)
+            flushed += inserted
+            failed += len(rows) - inserted
+            self._pending[kind] = []
+            if inserted:
+                written.append(kind)
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        with self._lock:
+            self.stats['flushed'] += flushed
+            self.stats['failed'] += failed
+            self.stats['flushes'] += 1
+            self.stats['last_flush_ms'] = elapsed_ms
+            self.stats['max_flush_ms'] = max(self.stats['max_flush_ms'], elapsed_ms)
+            self.stats['total_flush_ms'] += elapsed_ms
+
+        if failed:
+            print(f"[INGESTION ERROR] {failed} registros não gravados neste lote")
+        if written and self.on_flush:
+            try:
+                self.on_flush(*written)
+            except Exception as e:
+                print(f"[INGESTION ERROR] Falha no on_flush: {e}")
+        return flushed
+
+    def _write_readings(self, rows):
+        ids = insert_readings_with_ids(rows)
+        if ids and self.on_readings:
+            try:
+                self.on_readings(rows, ids)
+            except Exception as e:
+                print(f"[INGESTION ERROR] Falha no on_readings: {e}")
+        return len(ids)
+
+    def _evaluate_alerts(self, rows):
+        """Avalia as regras sobre o lote de leituras e enfileira só as transições"""
+        try:
+            events = self.alert_engine.evaluate(
+                [row[6] for row in rows],
+                [row[2:6] for row in rows],
+                [row[1] for row in rows]
+            )
+        except Exception as e:
+            print(f"[INGESTION ERROR] Falha ao avaliar regras de alerta: {e}")
+            return
+
+        for event in events:
+            alert_type, message, severity = format_event(event, DEFAULT_NODE_ID)
+            ts = int(event.ts)
+            self._pending['alerts'].append(
+                (time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(ts)), ts, alert_type, message, severity)
+            )
+
+    def get_stats(self):
+        """Profundidade da fila e latência de gravação"""
+        with self._lock:
+            stats = dict(self.stats)
+        flushes = stats.pop('total_flush_ms')
+        stats['avg_flush_ms'] = round(flushes / stats['flushes'], 3) if stats['flushes'] else 0.0
+        stats['last_flush_ms'] = round(stats['last_flush_ms'], 3)
+        stats['max_flush_ms'] = round(stats['max_flush_ms'], 3)
+        stats['queue_depth'] = self._queue.qsize() + self._pending_count()
+        return stats
@@ -0,0 +1,104 @@
+"""
+Parser das linhas JSON enviadas pelos Arduinos
+
+A leitura de sensores (a mensagem mais frequente) tem formato fixo, gerado
+por readAndSendSensorData() em arduino1_sensors.ino:
+
+    {"source":"arduino1","temp":24.5,"humid":61,"soil":43,"light":77}
+
+Ela é reconhecida por uma expressão regular pré-compilada, sem json.loads
+nem criação de objetos intermediários. As demais mensagens (handshake,
+ações, respostas, thresholds) são raras e usam o JSON completo.
+
+parse_line() devolve (tipo, dados); o tipo indexa as tabelas de despacho
+dos gerenciadores (DualArduinoManager / FleetManager).
+"""
+import json
+import os
+import re
+
+MSG_READING = 'reading'
+MSG_ACTION = 'action'
+MSG_STATUS = 'status'
+MSG_THRESHOLDS = 'thresholds'
+MSG_RESPONSE = 'response'
+MSG_OTHER = 'other'
+
+# Log de cada linha recebida (custa CPU com muitos nós): desligado por padrão
+VERBOSE = os.environ.get('GREENHOUSE_SERIAL_VERBOSE', '') not in ('', '0')
+
+# temp sempre com 1 casa decimal (String(temp, 1)); as demais são inteiras.
+# Qualquer variação de formato cai no json.loads, então os tipos são sempre
+# os mesmos que o JSON completo produziria.
+_READING_PREFIX = '{"source":"arduino1","temp":'
+_READING_RE = re.compile(
+    r'\{"source":"arduino1","temp":(-?\d+\.\d+),"humid":(-?\d+),"soil":(-?\d+),"light":(-?\d+)\}$'
+)
+
+
+def classify(data):
+    """Tipo de uma mensagem já decodificada"""
+    if 'temp' in data:
+        return MSG_READING
+    if 'action' in data:
+        return MSG_ACTION
+    if 'status' in data:
+        return MSG_STATUS
+    if 'thresholds' in data:
+        return MSG_THRESHOLDS
+    if 'response' in data:
+        return MSG_RESPONSE
+    return MSG_OTHER
+
+
+def parse_line(line):
+    """
+    Decodifica uma linha recebida pela serial
+
+    Returns:
+        (tipo, dict) ou (None, None) se a linha não é um objeto JSON
+    """
+    if line.startswith(_READING_PREFIX):
+        match = _READING_RE.match(line)
+        if match:
+            temp, humid, soil, light = match.groups()
+            return MSG_READING, {
+                'source': 'arduino1',
+                'temp': float(temp),
+                'humid': int(humid),
+                'soil': int(soil),
+                'light': int(light)
+            }
+
+    try:
+        data = json.loads(line)
+    except ValueError:
+        return None, None
+    if not isinstance(data, dict):
+        return None, None
+    return classify(data), data
+
+
+if __name__ == '__main__':
+    import sys
+    import time
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    lines = [
+        '{"source":"arduino1","temp":%.1f,"humid":%d,"soil":%d,"light":%d}' % (20 + i % 100 / 10, 40 + i % 50, i % 100, i % 100)
+        for i in range(1000)
+    ]
+
+    def bench(name, func):
+        start = time.perf_counter()
+        for i in range(count):
+            func(lines[i % 1000])
+        elapsed = time.perf_counter() - start
+        print(f"  {name:<12} {count / elapsed:>12,.0f} linhas/s  ({elapsed / count * 1e6:.2f} µs/linha)")
+
+    for line in lines:
+        assert parse_line(line)[1] == json.loads(line), line
+
+    print(f"Leituras de sensores ({count:,} linhas):")
+    bench('json.loads', lambda line: classify(json.loads(line)))
+    bench('parse_line', parse_line)
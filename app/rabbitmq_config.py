@@ -1,29 +1,109 @@
 import pika
 import json
+import threading
+import time
 from datetime import datetime
 
+from pika.exceptions import AMQPConnectionError, NackError, UnroutableError
+
+# Reentrega com atraso: a n-ésima falha espera RETRY_DELAYS[n-1] segundos (o último se repete)
+# numa fila com TTL, que devolve a mensagem à fila principal (dead-letter exchange) ao expirar
+RETRY_DELAYS = (5, 30, 120, 600)
+MAX_DELIVERY_ATTEMPTS = 5
+CONFIRM_TIMEOUT = 10.0
+ATTEMPTS_HEADER = 'x-attempts'
+ERROR_HEADER = 'x-last-error'
+ORIGIN_HEADER = 'x-origin-queue'
+
+# Filas por canal, ligadas ao exchange tópico pelos padrões de routing key.
+# Vários workers na mesma fila são consumidores concorrentes (cada alerta vai para um só).
+# Filas extras podem ser ligadas por tipo ou nó, ex.: 'alert.*.*.zona2' ou 'alert.*.pump_activated.*'
+ALERT_QUEUES = {
+    'critical': ('queue.critical_alerts', ('alert.critical.#',)),
+    'warning': ('queue.alerts.warning', ('alert.warning.#',)),
+    'info': ('queue.alerts.info', ('alert.info.#',)),
+}
+DEFAULT_CHANNEL = 'critical'
+
+
+def _segment(value):
+    """Parte de uma routing key: sem '.' (separador do tópico) nem curingas"""
+    return str(value or 'unknown').replace('.', '_').replace('*', '_').replace('#', '_')
+
+
+def severity_for(value):
+    """Severidade com fila ligada; outra qualquer vai para DEFAULT_CHANNEL (senão seria unroutable)"""
+    severity = str(value or '').lower()
+    return severity if severity in ALERT_QUEUES else DEFAULT_CHANNEL
+
+
+def routing_key_for(message):
+    """alert.<severidade>.<tipo>.<nó>"""
+    return f"alert.{severity_for(message.get('severity'))}.{_segment(message.get('type'))}.{_segment(message.get('node'))}"
+
+
+def build_message(alert_data):
+    """Corpo JSON publicado para um alerta {type, message, severity, node_id}"""
+    return {
+        'timestamp': datetime.now().isoformat(),
+        'type': alert_data.get('type', 'unknown'),
+        'message': alert_data.get('message', ''),
+        # A severidade original segue no corpo; severity_for só escolhe a fila (routing_key_for)
+        'severity': alert_data.get('severity') or DEFAULT_CHANNEL,
+        'node': alert_data.get('node_id') or 'system',
+        'source': 'greenhouse_system'
+    }
+
+
 class RabbitMQManager:
-    """Gerenciador simplificado - apenas alertas críticos"""
+    """
+    Gerenciador simplificado - apenas alertas críticos
+
+    A BlockingConnection do pika não é thread-safe: todo uso da conexão
+    (connect, publish, disconnect) é serializado por um lock, então
+    publish_alert pode ser chamado de qualquer thread (serial, Flask...).
+    Para volume alto, prefira alert_publisher.AlertPublisher, que deixa a
+    conexão com uma única thread e não bloqueia quem publica.
+    consume() bloqueia a conexão: use uma instância própria para consumir.
+    """
     
-    def __init__(self, host='localhost', port=5672, username='guest', password='guest'):
+    def __init__(self, host='localhost', port=5672, username='guest', password='guest', confirm=False,
+                 channel=DEFAULT_CHANNEL):
         """
         Args:
             host: Endereço do RabbitMQ
             port: Porta (padrão 5672)
             username: Usuário
             password: Senha
+            confirm: Ativa publisher confirms (basic_publish só retorna após o ack do broker)
+            channel: Fila consumida por consume() (chave de ALERT_QUEUES)
         """
         self.host = host
         self.port = port
+        self.confirm = confirm
         self.credentials = pika.PlainCredentials(username, password)
         self.connection = None
         self.channel = None
+        self._lock = threading.RLock()
         
         self.exchange_name = 'greenhouse.critical_alerts'
-        self.queue_name = 'queue.critical_alerts'
+        self.queue_name = ALERT_QUEUES[channel][0]
+        self.retry_exchange = 'greenhouse.retry'
+        self.dead_letter_exchange = 'greenhouse.dead_letter'
+        self.dead_letter_queue = 'queue.critical_alerts.dead'
+
+        # Só acessado na thread do consumo: delivery_tag -> (corpo, propriedades) ainda sem ack
+        self._unacked = {}
     
+    def _open_connection(self, params):
+        return pika.BlockingConnection(params)
+
     def connect(self):
         """Conecta ao RabbitMQ"""
+        with self._lock:
+            return self._connect()
+
+    def _connect(self):
         try:
             params = pika.ConnectionParameters(
                 host=self.host,
@@ -33,7 +113,7 @@ class RabbitMQManager:
                 blocked_connection_timeout=300
             )
             
-            self.connection = pika.BlockingConnection(params)
+            self.connection = self._open_connection(params)
             self.channel = self.connection.channel()
             
             self.channel.exchange_declare(
@@ -42,16 +122,22 @@ class RabbitMQManager:
                 durable=True
             )
             
-            self.channel.queue_declare(
-                queue=self.queue_name,
-                durable=True
-            )
-            
-            self.channel.queue_bind(
-                exchange=self.exchange_name,
-                queue=self.queue_name,
-                routing_key='alert.critical'
-            )
+            for queue, patterns in ALERT_QUEUES.values():
+                self.channel.queue_declare(
+                    queue=queue,
+                    durable=True
+                )
+                for pattern in patterns:
+                    self.channel.queue_bind(
+                        exchange=self.exchange_name,
+                        queue=queue,
+                        routing_key=pattern
+                    )
+
+            self._declare_retry_topology()
+
+            if self.confirm:
+                self.channel.confirm_delivery()
             
             print(f"[RABBITMQ] Conectado em {self.host}:{self.port}")
             print(f"[RABBITMQ] Exchange: {self.exchange_name}")
@@ -62,6 +148,33 @@ class RabbitMQManager:
             print(f"[RABBITMQ ERROR] Falha: {e}")
             return False
     
+    @staticmethod
+    def _retry_queue(queue, delay):
+        return f"{queue}.retry.{delay}s"
+
+    def _declare_retry_topology(self):
+        """
+        Filas de atraso por fila de canal e a DLQ
+
+        Ao expirar o TTL, a mensagem volta direto para a fila de onde saiu
+        (default exchange), sem passar de novo pelo tópico: um retry não
+        duplica o alerta nas outras filas.
+        """
+        self.channel.exchange_declare(exchange=self.retry_exchange, exchange_type='direct', durable=True)
+        for queue, _ in ALERT_QUEUES.values():
+            for delay in RETRY_DELAYS:
+                retry_queue = self._retry_queue(queue, delay)
+                self.channel.queue_declare(queue=retry_queue, durable=True, arguments={
+                    'x-message-ttl': delay * 1000,
+                    'x-dead-letter-exchange': '',
+                    'x-dead-letter-routing-key': queue
+                })
+                self.channel.queue_bind(exchange=self.retry_exchange, queue=retry_queue, routing_key=retry_queue)
+
+        self.channel.exchange_declare(exchange=self.dead_letter_exchange, exchange_type='fanout', durable=True)
+        self.channel.queue_declare(queue=self.dead_letter_queue, durable=True)
+        self.channel.queue_bind(exchange=self.dead_letter_exchange, queue=self.dead_letter_queue)
+
     def publish_alert(self, alert_data):
         """
         Publica alerta crítico
@@ -69,73 +182,466 @@ class RabbitMQManager:
         Args:
             alert_data: Dict com {type, message, severity, ...}
         """
-        try:
-            if not self.connection or self.connection.is_closed:
-                print(f"[RABBITMQ] Não conectado - pulando alerta: {alert_data.get('type')}")
-                return
-            
-            message = {
-                'timestamp': datetime.now().isoformat(),
-                'type': alert_data.get('type', 'unknown'),
-                'message': alert_data.get('message', ''),
-                'severity': alert_data.get('severity', 'critical'),
-                'source': 'greenhouse_system'
-            }
-            
+        message = build_message(alert_data)
+        with self._lock:
+            # Uma reconexão por alerta: a conexão pode ter caído (ex.: heartbeat) desde o último envio
+            for attempt in range(2):
+                try:
+                    if not self.is_connected() and (attempt or not self._connect()):
+                        print(f"[RABBITMQ] Não conectado - pulando alerta: {alert_data.get('type')}")
+                        return False
+
+                    self.publish_message(message)
+
+                    print(f"[RABBITMQ] Alerta publicado: {alert_data.get('type')}")
+                    return True
+
+                except (pika.exceptions.AMQPConnectionError, pika.exceptions.AMQPChannelError) as e:
+                    print(f"[RABBITMQ ERROR] Conexão perdida ao publicar: {e}")
+                    self._close()
+                except Exception as e:
+                    print(f"[RABBITMQ ERROR] Falha ao publicar: {e}")
+                    return False
+            return False
+    
+    def is_connected(self):
+        return self.connection is not None and self.connection.is_open
+
+    def publish_message(self, message):
+        """
+        Publica uma mensagem já montada (build_message)
+
+        Raises:
+            pika.exceptions.AMQPError: Falha de conexão/canal, ou nack/unroutable com confirm=True
+        """
+        with self._lock:
             self.channel.basic_publish(
                 exchange=self.exchange_name,
-                routing_key='alert.critical',
+                routing_key=routing_key_for(message),
                 body=json.dumps(message),
                 properties=pika.BasicProperties(
                     delivery_mode=2,
                     content_type='application/json',
                     priority=9
-                )
+                ),
+                mandatory=self.confirm
             )
-            
-            print(f"[RABBITMQ] Alerta publicado: {alert_data.get('type')}")
-            
-        except Exception as e:
-            print(f"[RABBITMQ ERROR] Falha ao publicar: {e}")
-    
-    def consume(self, callback):
+
+    def publish_batch(self, messages):
+        """
+        publish_message para cada mensagem (mesmo retorno de ConfirmPublisher.publish_batch)
+
+        Com confirm=True cada basic_publish da BlockingConnection espera o seu
+        confirm: uma ida e volta por mensagem. Para lotes, use ConfirmPublisher.
+        """
+        results = []
+        for message in messages:
+            try:
+                self.publish_message(message)
+                results.append(None)
+            except (NackError, UnroutableError) as e:
+                results.append(e)
+            except Exception as e:
+                return results + [e] * (len(messages) - len(results))
+        return results
+
+    def consume(self, callback, prefetch_count=1, manual_ack=False):
         """
         Consome alertas da fila
         
         Args:
             callback: Função a ser chamada para cada alerta
+            prefetch_count: Mensagens entregues sem ack ao mesmo tempo
+            manual_ack: Se True, callback recebe (alerta, delivery_tag) e o ack/nack
+                fica a cargo do chamador (ack_threadsafe / nack_threadsafe)
         """
         try:
             def on_message(ch, method, properties, body):
+                self._unacked[method.delivery_tag] = (body, properties)
                 try:
                     message = json.loads(body)
+                except ValueError as e:
+                    # Mensagem inválida nunca vai ser processada: direto para a DLQ
+                    self._dead_letter(method.delivery_tag, f"JSON inválido: {e}")
+                    return
+                if manual_ack:
+                    try:
+                        callback(message, method.delivery_tag)
+                    except Exception as e:
+                        # Falhou antes de assumir a mensagem (ex.: corpo JSON que não é um alerta):
+                        # repetir não resolve e o consumo não pode parar
+                        print(f"[RABBITMQ ERROR] Erro no callback: {e}")
+                        self._dead_letter(method.delivery_tag, f"Erro no callback: {e}")
+                    return
+                try:
                     callback(message)
-                    ch.basic_ack(delivery_tag=method.delivery_tag)
+                    self._ack(method.delivery_tag)
                 except Exception as e:
                     print(f"[RABBITMQ ERROR] Erro no callback: {e}")
-                    ch.basic_nack(delivery_tag=method.delivery_tag, requeue=True)
+                    self._retry(method.delivery_tag, e)
             
-            self.channel.basic_qos(prefetch_count=1)
+            self.channel.basic_qos(prefetch_count=prefetch_count)
             self.channel.basic_consume(
                 queue=self.queue_name,
                 on_message_callback=on_message
             )
             
-            print(f"[RABBITMQ] Consumindo da fila: {self.queue_name}")
+            print(f"[RABBITMQ] Consumindo da fila: {self.queue_name} (prefetch: {prefetch_count})")
             print("[RABBITMQ] Aguardando alertas críticos...")
             self.channel.start_consuming()
             
         except Exception as e:
             print(f"[RABBITMQ ERROR] Erro ao consumir: {e}")
+
+    # Durante consume() a conexão pertence à thread que consome: as outras threads
+    # só podem agendar operações nela (add_callback_threadsafe)
+
+    def ack_threadsafe(self, delivery_tag):
+        self.connection.add_callback_threadsafe(lambda: self._ack(delivery_tag))
+
+    def retry_threadsafe(self, delivery_tag, error):
+        """Falha no processamento: reagenda com atraso (ou DLQ após MAX_DELIVERY_ATTEMPTS)"""
+        self.connection.add_callback_threadsafe(lambda: self._retry(delivery_tag, error))
+
+    def _ack(self, delivery_tag):
+        self._unacked.pop(delivery_tag, None)
+        self.channel.basic_ack(delivery_tag=delivery_tag)
+
+    def _retry(self, delivery_tag, error):
+        if delivery_tag not in self._unacked:
+            return
+        body, properties = self._unacked[delivery_tag]
+        attempts = int((properties.headers or {}).get(ATTEMPTS_HEADER, 0)) + 1
+        if attempts >= MAX_DELIVERY_ATTEMPTS:
+            self._dead_letter(delivery_tag, f"{attempts} tentativas; último erro: {error}", attempts)
+            return
+        delay = RETRY_DELAYS[min(attempts, len(RETRY_DELAYS)) - 1]
+        # Publica a cópia antes do ack: uma queda no meio gera duplicata, nunca perda
+        self.channel.basic_publish(
+            exchange=self.retry_exchange,
+            routing_key=self._retry_queue(self.queue_name, delay),
+            body=body,
+            properties=self._with_headers(properties, {ATTEMPTS_HEADER: attempts, ERROR_HEADER: str(error)[:500]})
+        )
+        self._ack(delivery_tag)
+        print(f"[RABBITMQ] Tentativa {attempts}/{MAX_DELIVERY_ATTEMPTS} falhou; nova entrega em {delay}s")
+
+    def _dead_letter(self, delivery_tag, reason, attempts=1):
+        if delivery_tag not in self._unacked:
+            return
+        body, properties = self._unacked[delivery_tag]
+        self.channel.basic_publish(
+            exchange=self.dead_letter_exchange,
+            routing_key='',
+            body=body,
+            properties=self._with_headers(properties, {
+                ATTEMPTS_HEADER: attempts,
+                ERROR_HEADER: reason[:500],
+                ORIGIN_HEADER: self.queue_name,
+                'x-dead-at': datetime.now().isoformat()
+            })
+        )
+        self._ack(delivery_tag)
+        print(f"[RABBITMQ ERROR] Mensagem enviada para a DLQ ({self.dead_letter_queue}): {reason}")
+
+    @staticmethod
+    def _with_headers(properties, headers):
+        merged = dict(properties.headers or {})
+        merged.update(headers)
+        return pika.BasicProperties(
+            delivery_mode=2,
+            content_type=properties.content_type or 'application/json',
+            priority=properties.priority,
+            headers=merged
+        )
+
+    # ==================== DLQ ====================
+
+    def dead_letters(self, limit=20):
+        """
+        Lê até `limit` mensagens da DLQ sem removê-las
+
+        Returns:
+            (total na DLQ, lista de (alerta ou corpo bruto, headers))
+        """
+        with self._lock:
+            total = self.channel.queue_declare(queue=self.dead_letter_queue, durable=True, passive=True).method.message_count
+            items = []
+            tags = []
+            for _ in range(min(limit, total)):
+                method, properties, body = self.channel.basic_get(queue=self.dead_letter_queue, auto_ack=False)
+                if method is None:
+                    break
+                tags.append(method.delivery_tag)
+                try:
+                    items.append((json.loads(body), properties.headers or {}))
+                except ValueError:
+                    items.append((body.decode('utf-8', errors='replace'), properties.headers or {}))
+            if tags:
+                # Devolve tudo à DLQ, na mesma ordem
+                self.channel.basic_nack(delivery_tag=tags[-1], multiple=True, requeue=True)
+            return total, items
+
+    def replay_dead_letters(self, limit=None):
+        """Devolve mensagens da DLQ à fila de onde saíram, com o contador de tentativas zerado"""
+        replayed = 0
+        with self._lock:
+            while limit is None or replayed < limit:
+                method, properties, body = self.channel.basic_get(queue=self.dead_letter_queue, auto_ack=False)
+                if method is None:
+                    break
+                headers = dict(properties.headers or {})
+                origin = headers.get(ORIGIN_HEADER) or self.queue_name
+                for key in (ATTEMPTS_HEADER, ERROR_HEADER, ORIGIN_HEADER, 'x-dead-at'):
+                    headers.pop(key, None)
+                self.channel.basic_publish(
+                    exchange='',
+                    routing_key=origin,
+                    body=body,
+                    properties=pika.BasicProperties(
+                        delivery_mode=2,
+                        content_type=properties.content_type or 'application/json',
+                        priority=properties.priority,
+                        headers=headers
+                    )
+                )
+                self.channel.basic_ack(delivery_tag=method.delivery_tag)
+                replayed += 1
+        return replayed
+
+    def purge_dead_letters(self):
+        with self._lock:
+            return self.channel.queue_purge(queue=self.dead_letter_queue).method.message_count
+
+    def call_later(self, delay, callback):
+        """Agenda callback na thread que consome (só válido durante consume())"""
+        self.connection.call_later(delay, callback)
     
+    def _close(self):
+        """Descarta uma conexão quebrada (sem log)"""
+        connection, self.connection, self.channel = self.connection, None, None
+        try:
+            if connection and not connection.is_closed:
+                connection.close()
+        except Exception:
+            pass
+
     def disconnect(self):
         """Fecha conexão"""
+        with self._lock:
+            try:
+                if self.connection and not self.connection.is_closed:
+                    self.connection.close()
+                    print("[RABBITMQ] Conexão fechada")
+            except Exception as e:
+                print(f"[RABBITMQ ERROR] Erro ao fechar: {e}")
+
+
+class ConfirmPublisher:
+    """
+    Conexão só de publicação com publisher confirms assíncronos (SelectConnection)
+
+    publish_batch() publica o lote inteiro e roda o ioloop até chegarem os
+    acks/nacks de todas as mensagens: um lote custa uma ida e volta ao broker,
+    não uma por mensagem. O ioloop só roda dentro de connect(),
+    publish_batch() e disconnect(), então a instância deve ser usada por uma
+    única thread (a do AlertPublisher).
+
+    A topologia (exchange, filas, retry/DLQ) é declarada por um
+    RabbitMQManager a cada connect().
+    """
+
+    def __init__(self, host='localhost', port=5672, username='guest', password='guest',
+                 timeout=CONFIRM_TIMEOUT):
+        """
+        Args:
+            host: Endereço do RabbitMQ
+            port: Porta (padrão 5672)
+            username: Usuário
+            password: Senha
+            timeout: Espera máxima (s) pela abertura da conexão ou pelos confirms de um lote
+        """
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.timeout = timeout
+        self.exchange_name = 'greenhouse.critical_alerts'
+        self.connection = None
+        self.channel = None
+
+        self._error = None
+        # delivery_tag -> índice no lote ainda sem ack/nack
+        self._unconfirmed = {}
+        self._returned = set()
+        self._results = []
+        self._next_tag = 0
+
+    def _declare_topology(self):
+        manager = RabbitMQManager(self.host, self.port, self.username, self.password)
         try:
-            if self.connection and not self.connection.is_closed:
-                self.connection.close()
-                print("[RABBITMQ] Conexão fechada")
+            return manager.connect()
+        finally:
+            manager._close()
+
+    def connect(self):
+        if not self._declare_topology():
+            return False
+        params = pika.ConnectionParameters(
+            host=self.host,
+            port=self.port,
+            credentials=pika.PlainCredentials(self.username, self.password),
+            # O ioloop fica parado entre os lotes, então não há quem responda
+            # heartbeats; uma conexão morta aparece como falta de confirm no lote
+            heartbeat=0,
+            blocked_connection_timeout=300
+        )
+        self._error = None
+        self.channel = None
+        try:
+            self.connection = pika.SelectConnection(
+                params,
+                on_open_callback=self._on_connection_open,
+                on_open_error_callback=self._on_connection_closed,
+                on_close_callback=self._on_connection_closed
+            )
         except Exception as e:
-            print(f"[RABBITMQ ERROR] Erro ao fechar: {e}")
+            print(f"[RABBITMQ ERROR] Falha: {e}")
+            return False
+        if not self._run_until(lambda: self.channel is not None):
+            print(f"[RABBITMQ ERROR] Falha ao abrir o canal de publicação: {self._error or 'tempo esgotado'}")
+            self.disconnect()
+            return False
+        print(f"[RABBITMQ] Publicador conectado em {self.host}:{self.port} (confirms por lote)")
+        return True
+
+    def is_connected(self):
+        return (self.connection is not None and self.connection.is_open and
+                self.channel is not None and self.channel.is_open)
+
+    def publish_batch(self, messages):
+        """
+        Publica as mensagens (build_message) e espera os confirms uma única vez
+
+        Returns:
+            Um resultado por mensagem, na ordem: None (ack), NackError/UnroutableError
+            (recusada pelo broker) ou outra exceção (sem confirmação: conexão caiu
+            ou tempo esgotado; a conexão é descartada)
+        """
+        if not self.is_connected():
+            return [AMQPConnectionError("Publicador não conectado")] * len(messages)
+        self._results = [None] * len(messages)
+        self._returned.clear()
+        for index, message in enumerate(messages):
+            try:
+                self.channel.basic_publish(
+                    exchange=self.exchange_name,
+                    routing_key=routing_key_for(message),
+                    body=json.dumps(message),
+                    properties=pika.BasicProperties(
+                        delivery_mode=2,
+                        content_type='application/json',
+                        priority=9,
+                        # Identifica a mensagem num basic.return (unroutable)
+                        message_id=str(self._next_tag + 1)
+                    ),
+                    mandatory=True
+                )
+            except Exception as e:
+                # O resto do lote nem saiu
+                self._error = e
+                self._results[index:] = [e] * (len(messages) - index)
+                break
+            self._next_tag += 1
+            self._unconfirmed[self._next_tag] = index
+        self._run_until(lambda: not self._unconfirmed)
+
+        if self._unconfirmed:
+            error = self._error or AMQPConnectionError(f"Sem confirmação do broker em {self.timeout:.0f}s")
+            for index in self._unconfirmed.values():
+                self._results[index] = error
+            self._unconfirmed.clear()
+            self.disconnect()
+        return self._results
+
+    def disconnect(self):
+        connection, self.channel = self.connection, None
+        if connection is None:
+            return
+        try:
+            if not connection.is_closed and not connection.is_closing:
+                connection.close()
+            self._run_until(lambda: connection.is_closed, timeout=2.0)
+        except Exception:
+            pass
+        self.connection = None
+
+    # ==================== IOLOOP ====================
+
+    def _run_until(self, done, timeout=None):
+        """Roda o ioloop até done() ou o tempo esgotar (os callbacks param o loop)"""
+        ioloop = self.connection.ioloop
+        deadline = time.monotonic() + (timeout or self.timeout)
+        while not done() and not (self._error and self.connection.is_closed):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            timer = ioloop.call_later(remaining, ioloop.stop)
+            ioloop.start()
+            ioloop.remove_timeout(timer)
+        return done()
+
+    def _wake(self):
+        if self.connection is not None:
+            self.connection.ioloop.stop()
+
+    def _on_connection_open(self, connection):
+        connection.channel(on_open_callback=self._on_channel_open)
+
+    def _on_connection_closed(self, connection, error):
+        self._error = error
+        self.channel = None
+        self._wake()
+
+    def _on_channel_open(self, channel):
+        channel.add_on_return_callback(self._on_return)
+        channel.add_on_close_callback(self._on_channel_closed)
+        self._next_tag = 0
+        channel.confirm_delivery(self._on_confirm, callback=lambda _frame: self._on_confirming(channel))
+
+    def _on_confirming(self, channel):
+        self.channel = channel
+        self._wake()
+
+    def _on_channel_closed(self, channel, error):
+        # Canal fechado pelo broker (ex.: exchange inexistente): a conexão não serve mais
+        self._error = error
+        self.channel = None
+        if self.connection is not None and self.connection.is_open:
+            self.connection.close()
+        self._wake()
+
+    def _on_return(self, channel, method, properties, body):
+        # O broker envia o basic.return antes do ack da mesma mensagem
+        self._returned.add(int(properties.message_id))
+
+    def _on_confirm(self, frame):
+        method = frame.method
+        if method.multiple:
+            tags = [tag for tag in self._unconfirmed if tag <= method.delivery_tag]
+        else:
+            tags = [method.delivery_tag]
+        nack = isinstance(method, pika.spec.Basic.Nack)
+        for tag in tags:
+            index = self._unconfirmed.pop(tag, None)
+            if index is None:
+                continue
+            if nack:
+                self._results[index] = NackError([tag])
+            elif tag in self._returned:
+                self._results[index] = UnroutableError([tag])
+        if not self._unconfirmed:
+            self._wake()
 
 
 class AlertConsumerWorker:
@@ -0,0 +1,133 @@
+"""
+Cache de respostas da API somente leitura (TTL + invalidação na escrita)
+
+Cada rota em cache declara de quais tabelas depende. A chave é a rota mais
+os parâmetros da query; uma entrada vale até o TTL expirar ou até uma
+gravação nas tabelas de que ela depende (invalidate(), chamado pela
+IngestionQueue a cada flush).
+
+As respostas levam ETag (hash do corpo) e Last-Modified (quando o conteúdo
+mudou pela última vez), com Cache-Control: no-cache; o navegador revalida e
+recebe 304 sem corpo enquanto os dados não mudam. Um corpo regerado igual ao
+anterior mantém o mesmo ETag/Last-Modified.
+"""
+import functools
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from flask import Response, make_response, request
+
+MAX_ENTRIES = 256
+
+
+class _Entry:
+
+    __slots__ = ('body', 'mimetype', 'etag', 'last_modified', 'expires', 'generations')
+
+    def __init__(self, body, mimetype, etag, last_modified, expires, generations):
+        self.body = body
+        self.mimetype = mimetype
+        self.etag = etag
+        self.last_modified = last_modified
+        self.expires = expires
+        self.generations = generations
+
+
+class ResponseCache:
+    """
+    Args:
+        max_entries: Tamanho máximo do LRU de respostas
+    """
+
+    def __init__(self, max_entries=MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        # tabela -> contador de gravações (muda a cada invalidate)
+        self._generations = {}
+        self._lock = threading.Lock()
+
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'not_modified': 0,
+            'invalidations': 0,
+            'evicted': 0
+        }
+
+    def invalidate(self, *tables):
+        """Marca as tabelas como alteradas (as entradas dependentes deixam de valer)"""
+        with self._lock:
+            for table in tables:
+                self._generations[table] = self._generations.get(table, 0) + 1
+            self.stats['invalidations'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def cached(self, ttl, depends=()):
+        """Decorador de rota: `ttl` em segundos; `depends` = tabelas lidas pela rota"""
+        def decorator(view):
+            @functools.wraps(view)
+            def wrapper(*args, **kwargs):
+                key = (request.path, tuple(sorted(request.args.items(multi=True))))
+                now = time.monotonic()
+                with self._lock:
+                    generations = tuple(self._generations.get(table, 0) for table in depends)
+                    entry = self._entries.get(key)
+                    if entry is not None and entry.expires > now and entry.generations == generations:
+                        self._entries.move_to_end(key)
+                        self.stats['hits'] += 1
+                        previous = entry
+                    else:
+                        self.stats['misses'] += 1
+                        previous, entry = entry, None
+
+                if entry is None:
+                    # As gerações foram lidas antes da consulta: uma gravação durante
+                    # a consulta invalida a entrada recém-criada
+                    response = make_response(view(*args, **kwargs))
+                    if response.status_code != 200 or response.is_streamed:
+                        return response
+                    entry = self._store(key, response, generations, now + ttl, previous)
+                return self._respond(entry)
+            return wrapper
+        return decorator
+
+    def _store(self, key, response, generations, expires, previous):
+        body = response.get_data()
+        etag = hashlib.blake2b(body, digest_size=12).hexdigest()
+        if previous is not None and previous.etag == etag:
+            last_modified = previous.last_modified
+        else:
+            last_modified = datetime.now(timezone.utc).replace(microsecond=0)
+        entry = _Entry(body, response.mimetype, etag, last_modified, expires, generations)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats['evicted'] += 1
+        return entry
+
+    def _respond(self, entry):
+        response = Response(entry.body, mimetype=entry.mimetype)
+        response.set_etag(entry.etag)
+        response.last_modified = entry.last_modified
+        response.cache_control.no_cache = True
+        response.make_conditional(request)
+        if response.status_code == 304:
+            with self._lock:
+                self.stats['not_modified'] += 1
+        return response
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats['entries'] = len(self._entries)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 3) if lookups else 0.0
+        return stats
@@ -0,0 +1,196 @@
+"""
+Retenção incremental de dados (readings, alerts, actions)
+
+Em vez de um único DELETE sobre todas as linhas expiradas (que segura o
+lock de escrita por segundos), as linhas são removidas em blocos de ids
+contíguos, cada bloco em sua própria transação curta, com uma pausa entre
+blocos para que a ingestão das threads seriais continue fluindo.
+"""
+import threading
+import time
+
+import archive
+import database
+
+CHUNK_SIZE = 5000
+CHUNK_PAUSE = 0.05
+RUN_INTERVAL = 3600
+VACUUM_PAGES = 2000
+
+DEFAULT_POLICIES = {
+    'readings': 30,
+    'alerts': 90,
+    'actions': 90,
+}
+
+
+class PurgeService:
+    """
+    Purga incremental com políticas por tabela e execução agendada em background
+
+    Args:
+        policies: Dict tabela -> dias de retenção (None desativa a tabela)
+        chunk_size: Quantidade de ids por DELETE
+        pause: Pausa (s) entre blocos, liberando o lock de escrita
+        interval: Intervalo (s) entre execuções do agendador
+        archive_readings: Arquiva readings em Parquet antes de remover (requer pyarrow)
+    """
+
+    def __init__(self, policies=None, chunk_size=CHUNK_SIZE, pause=CHUNK_PAUSE,
+                 interval=RUN_INTERVAL, archive_readings=True):
+        self.policies = dict(DEFAULT_POLICIES if policies is None else policies)
+        self.chunk_size = chunk_size
+        self.pause = pause
+        self.interval = interval
+        self.archive_readings = archive_readings
+
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+        self.stats = {
+            'runs': 0,
+            'last_run': None,
+            'last_duration_ms': 0.0,
+            'rows_purged': {table: 0 for table in self.policies},
+            'chunks': 0,
+            'lock_held_ms': 0.0,
+            'max_lock_held_ms': 0.0,
+            'pages_vacuumed': 0
+        }
+
+    # ==================== PURGA ====================
+
+    def purge_table(self, table, days):
+        """Remove, em blocos, as linhas de `table` com mais de `days` dias"""
+        if table not in database.EXPORT_COLUMNS:
+            raise ValueError(f"Tabela desconhecida: {table}")
+
+        cutoff = int(time.time() - days * 86400)
+
+        if table == 'readings' and self.archive_readings and archive.PYARROW_AVAILABLE:
+            archived = database.archive_readings(cutoff)
+            if archived:
+                print(f"[RETENTION] {archived} leituras arquivadas em {archive.ARCHIVE_DIR}")
+
+        manager = database.get_connection_manager()
+        with manager.reader() as conn:
+            first = conn.execute(f'SELECT MIN(id) FROM {table}').fetchone()[0]
+            last = conn.execute(
+                f'SELECT id FROM {table} WHERE ts < ? ORDER BY ts DESC, id DESC LIMIT 1', (cutoff,)
+            ).fetchone()
+        if first is None or last is None:
+            return 0
+        last = last[0]
+
+        sql = f'DELETE FROM {table} WHERE id >= ? AND id < ? AND ts < ?'
+        deleted = 0
+        lo = first
+        while lo <= last and not self._stop_event.is_set():
+            hi = min(lo + self.chunk_size, last + 1)
+
+            start = time.perf_counter()
+            with manager.writer() as conn:
+                deleted += conn.execute(sql, (lo, hi, cutoff)).rowcount
+            held_ms = (time.perf_counter() - start) * 1000
+
+            with self._lock:
+                self.stats['chunks'] += 1
+                self.stats['lock_held_ms'] += held_ms
+                self.stats['max_lock_held_ms'] = max(self.stats['max_lock_held_ms'], held_ms)
+
+            lo = hi
+            # Cede o lock de escrita para a ingestão
+            time.sleep(self.pause)
+
+        with self._lock:
+            self.stats['rows_purged'][table] = self.stats['rows_purged'].get(table, 0) + deleted
+        return deleted
+
+    def vacuum(self, max_pages=VACUUM_PAGES):
+        """Devolve ao disco as páginas livres (incremental_vacuum em blocos)"""
+        manager = database.get_connection_manager()
+        with manager.reader() as conn:
+            mode = conn.execute('PRAGMA auto_vacuum').fetchone()[0]
+            free = conn.execute('PRAGMA freelist_count').fetchone()[0]
+
+        if mode != 2:
+            print("[RETENTION] auto_vacuum não é INCREMENTAL - espaço não devolvido (rode init_database)")
+            return 0
+
+        vacuumed = 0
+        while free > 0 and not self._stop_event.is_set():
+            pages = min(max_pages, free)
+            start = time.perf_counter()
+            with manager.writer() as conn:
+                # executescript executa todos os passos do pragma (execute liberaria só 1 página)
+                conn.executescript(f'PRAGMA incremental_vacuum({pages});')
+            held_ms = (time.perf_counter() - start) * 1000
+            with self._lock:
+                self.stats['lock_held_ms'] += held_ms
+                self.stats['max_lock_held_ms'] = max(self.stats['max_lock_held_ms'], held_ms)
+
+            vacuumed += pages
+            free -= pages
+            time.sleep(self.pause)
+
+        with self._lock:
+            self.stats['pages_vacuumed'] += vacuumed
+        return vacuumed
+
+    def run_once(self):
+        """Aplica todas as políticas e devolve o espaço livre. Retorna linhas removidas por tabela."""
+        start = time.perf_counter()
+        result = {}
+        for table, days in self.policies.items():
+            if days is None:
+                continue
+            try:
+                result[table] = self.purge_table(table, days)
+            except Exception as e:
+                print(f"[RETENTION ERROR] Falha ao purgar {table}: {e}")
+                result[table] = 0
+
+        if any(result.values()):
+            try:
+                self.vacuum()
+            except Exception as e:
+                print(f"[RETENTION ERROR] Falha no incremental_vacuum: {e}")
+
+        with self._lock:
+            self.stats['runs'] += 1
+            self.stats['last_run'] = time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime())
+            self.stats['last_duration_ms'] = (time.perf_counter() - start) * 1000
+
+        print(f"[RETENTION] Purga concluída: {result}")
+        return result
+
+    # ==================== AGENDADOR ====================
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        print(f"[RETENTION] Agendador iniciado (a cada {self.interval}s): {self.policies}")
+
+    def stop(self, timeout=10):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            self.run_once()
+            self._stop_event.wait(self.interval)
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats['rows_purged'] = dict(self.stats['rows_purged'])
+        stats['lock_held_ms'] = round(stats['lock_held_ms'], 3)
+        stats['max_lock_held_ms'] = round(stats['max_lock_held_ms'], 3)
+        stats['last_duration_ms'] = round(stats['last_duration_ms'], 3)
+        return stats
@@ -0,0 +1,175 @@
+"""
+Cache em memória das leituras recentes (buffer circular por nó sensor)
+
+Cada coluna é um array('d') pré-alocado, mais o id da linha no banco em
+um array('q'), então o buffer ocupa capacity * 6 * 8 bytes por nó, sem
+criar dicts por leitura. As leituras entram depois de gravadas (on_readings
+da IngestionQueue), com o id atribuído pelo banco.
+"""
+import threading
+import time
+from array import array
+
+RECENT_CAPACITY = 4096
+
+COLUMNS = ('ts', 'temperature', 'humidity', 'soil_moisture', 'light_level')
+
+# id de uma leitura ainda não gravada no banco
+NO_ID = -1
+
+
+class ReadingRingBuffer:
+    """Buffer circular de tamanho fixo com colunas numéricas"""
+
+    def __init__(self, capacity=RECENT_CAPACITY):
+        self.capacity = capacity
+        self._columns = [array('d', bytes(8 * capacity)) for _ in COLUMNS]
+        self._ids = array('q', [NO_ID]) * capacity
+        self._head = 0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._count
+
+    def append(self, temperature, humidity, soil_moisture, light_level, ts=None, row_id=NO_ID):
+        values = (time.time() if ts is None else ts, temperature, humidity, soil_moisture, light_level)
+        with self._lock:
+            for column, value in zip(self._columns, values):
+                column[self._head] = value
+            self._ids[self._head] = row_id
+            self._head = (self._head + 1) % self.capacity
+            self._count = min(self._count + 1, self.capacity)
+
+    def _index(self, i):
+        """Posição física do i-ésimo item mais antigo"""
+        return (self._head - self._count + i) % self.capacity
+
+    def oldest_ts(self):
+        with self._lock:
+            if not self._count:
+                return None
+            return self._columns[0][self._index(0)]
+
+    def _row(self, pos, with_id):
+        row = tuple(column[pos] for column in self._columns)
+        return row + (self._ids[pos],) if with_id else row
+
+    def rows(self, since_ts=None, with_id=False):
+        """
+        Tuplas (ts, temperature, humidity, soil_moisture, light_level[, id]) em ordem cronológica
+
+        Retorna None se o buffer não cobre o intervalo (since_ts anterior ao item
+        mais antigo), para que o chamador consulte o banco.
+        """
+        with self._lock:
+            if not self._count:
+                return None
+            oldest = self._columns[0][self._index(0)]
+            if since_ts is not None and since_ts < oldest:
+                return None
+
+            ts_col = self._columns[0]
+            result = []
+            for i in range(self._count):
+                pos = self._index(i)
+                if since_ts is not None and ts_col[pos] < since_ts:
+                    continue
+                result.append(self._row(pos, with_id))
+            return result
+
+    def latest(self, limit, with_id=False):
+        """Últimas N leituras (mais nova primeiro), ou None se o buffer tiver menos que N"""
+        with self._lock:
+            if limit > self._count:
+                return None
+            result = []
+            for i in range(self._count - 1, self._count - 1 - limit, -1):
+                pos = self._index(i)
+                result.append(self._row(pos, with_id))
+            return result
+
+
+class RecentReadingsCache:
+    """Um ReadingRingBuffer por nó sensor"""
+
+    def __init__(self, capacity=RECENT_CAPACITY):
+        self.capacity = capacity
+        self._buffers = {}
+        self._lock = threading.Lock()
+
+    def buffer(self, node_id):
+        with self._lock:
+            buf = self._buffers.get(node_id)
+            if buf is None:
+                buf = self._buffers[node_id] = ReadingRingBuffer(self.capacity)
+            return buf
+
+    def append(self, node_id, temperature, humidity, soil_moisture, light_level, ts=None, row_id=NO_ID):
+        self.buffer(node_id).append(temperature, humidity, soil_moisture, light_level, ts, row_id)
+
+    def nodes(self):
+        with self._lock:
+            return list(self._buffers)
+
+    def latest(self, limit, node_id=None):
+        """
+        Últimas N leituras como dicts (formato de get_latest_readings)
+
+        Sem node_id, mescla todos os nós. Retorna None se o cache não cobre o pedido.
+        """
+        rows = []
+        for node in ([node_id] if node_id else self.nodes()):
+            node_rows = self.buffer(node).latest(limit, with_id=True)
+            if node_rows is None:
+                return None
+            rows += [(row, node) for row in node_rows]
+
+        if len(rows) < limit or not rows:
+            return None
+
+        # Leituras do mesmo segundo: ordem do banco (id)
+        rows.sort(key=lambda item: (item[0][0], item[0][5]), reverse=True)
+        return [_to_dict(row, node) for row, node in rows[:limit]]
+
+    def _since(self, since_ts, node_id):
+        """Pares (tupla com id, node_id) desde since_ts em ordem cronológica, ou None se não cobre"""
+        rows = []
+        nodes = [node_id] if node_id else self.nodes()
+        if not nodes:
+            return None
+        for node in nodes:
+            node_rows = self.buffer(node).rows(since_ts, with_id=True)
+            if node_rows is None:
+                return None
+            rows += [(row, node) for row in node_rows]
+        if len(nodes) > 1:
+            rows.sort(key=lambda item: (item[0][0], item[0][5]))
+        return rows
+
+    def since(self, since_ts, node_id=None):
+        """Tuplas (ts, métricas...) desde since_ts em ordem cronológica, ou None se não cobre"""
+        rows = self._since(since_ts, node_id)
+        return None if rows is None else [row[:5] for row, _ in rows]
+
+    def since_dicts(self, since_ts, node_id=None):
+        """Leituras desde since_ts como dicts (formato de get_readings_by_timerange)"""
+        rows = self._since(since_ts, node_id)
+        return None if rows is None else [_to_dict(row, node) for row, node in rows]
+
+
+def _to_dict(row, node_id=None):
+    """Leitura no formato das linhas de readings (id, timestamp, ts, métricas, node_id)"""
+    ts = row[0]
+    reading = {
+        'id': row[5] if len(row) > 5 and row[5] != NO_ID else None,
+        'timestamp': time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(ts)),
+        'ts': int(ts),
+        'temperature': row[1],
+        'humidity': row[2],
+        'soil_moisture': int(row[3]),
+        'light_level': int(row[4])
+    }
+    if node_id is not None:
+        reading['node_id'] = node_id
+    return reading
@@ -0,0 +1,221 @@
+"""
+Tabelas de agregação (rollup) das leituras: 1 minuto, 1 hora e 1 dia
+
+Cada bucket (por nó sensor) guarda count e min/max/soma de cada métrica.
+As tabelas são atualizadas na mesma transação que grava as leituras (UPSERT), então
+estatísticas e histórico leem poucas linhas independente do volume bruto.
+"""
+import time
+
+METRICS = ('temperature', 'humidity', 'soil_moisture', 'light_level')
+
+# Do mais grosso para o mais fino
+ROLLUPS = (
+    ('readings_1d', 86400),
+    ('readings_1h', 3600),
+    ('readings_1m', 60),
+)
+
+# node_id das leituras que não informam o nó (mesmo padrão de readings)
+DEFAULT_NODE_ID = 'arduino1'
+
+_COLUMNS = ['bucket', 'node_id', 'count'] + [f'{m}_{agg}' for m in METRICS for agg in ('min', 'max', 'sum')]
+
+_UPSERT_SQL = {
+    table: '''
+        INSERT INTO {table} ({columns}) VALUES ({placeholders})
+        ON CONFLICT(bucket, node_id) DO UPDATE SET
+            count = count + excluded.count,
+            {updates}
+    '''.format(
+        table=table,
+        columns=', '.join(_COLUMNS),
+        placeholders=', '.join('?' * len(_COLUMNS)),
+        updates=',\n            '.join(
+            f'{m}_min = MIN({m}_min, excluded.{m}_min), '
+            f'{m}_max = MAX({m}_max, excluded.{m}_max), '
+            f'{m}_sum = {m}_sum + excluded.{m}_sum'
+            for m in METRICS
+        )
+    )
+    for table, _ in ROLLUPS
+}
+
+# Consultas com filtro opcional por nó: chave (tabela, com_filtro)
+_NODE_FILTER = {False: '', True: ' AND node_id = ?'}
+
+_SUMMARY_SQL = {
+    (table, by_node): 'SELECT SUM(count), {aggs} FROM {table} WHERE bucket >= ? AND bucket < ?{node}'.format(
+        table=table,
+        aggs=', '.join(f'MIN({m}_min), MAX({m}_max), SUM({m}_sum)' for m in METRICS),
+        node=_NODE_FILTER[by_node]
+    )
+    for table, _ in ROLLUPS for by_node in (False, True)
+}
+
+# Sem filtro, os nós do mesmo bucket são somados (média ponderada pelo count)
+_HISTORY_SQL = {
+    (table, by_node): '''
+        SELECT bucket, SUM(count) AS count, {avgs}
+        FROM {table}
+        WHERE bucket >= ?{node}
+        GROUP BY bucket
+        ORDER BY bucket ASC
+    '''.format(
+        table=table,
+        avgs=', '.join(f'SUM({m}_sum) / SUM(count) AS {m}, MIN({m}_min) AS {m}_min, MAX({m}_max) AS {m}_max'
+                       for m in METRICS),
+        node=_NODE_FILTER[by_node]
+    )
+    for table, _ in ROLLUPS for by_node in (False, True)
+}
+
+_SERIES_SQL = {
+    (table, by_node): 'SELECT bucket, {avgs} FROM {table} WHERE bucket >= ?{node} GROUP BY bucket ORDER BY bucket ASC'.format(
+        table=table,
+        avgs=', '.join(f'SUM({m}_sum) / SUM(count)' for m in METRICS),
+        node=_NODE_FILTER[by_node]
+    )
+    for table, _ in ROLLUPS for by_node in (False, True)
+}
+
+
+def _node_params(params, node_id):
+    return params + (node_id,) if node_id else params
+
+
+def create_tables(conn):
+    """Cria as tabelas de rollup, com chave (bucket, node_id) (usado pelas migrações)"""
+    metric_columns = ',\n'.join(
+        f'{m}_min REAL, {m}_max REAL, {m}_sum REAL NOT NULL DEFAULT 0' for m in METRICS
+    )
+    for table, _ in ROLLUPS:
+        conn.execute(f'''
+            CREATE TABLE IF NOT EXISTS {table} (
+                bucket INTEGER NOT NULL,
+                node_id TEXT NOT NULL DEFAULT '{DEFAULT_NODE_ID}',
+                count INTEGER NOT NULL,
+                {metric_columns},
+                PRIMARY KEY (bucket, node_id)
+            )
+        ''')
+
+
+def rebuild(conn, since_ts=None):
+    """Recalcula os rollups a partir das leituras brutas (a partir de since_ts)"""
+    where = 'WHERE ts >= ?' if since_ts is not None else ''
+    params = (since_ts,) if since_ts is not None else ()
+    aggs = ', '.join(f'MIN({m}), MAX({m}), TOTAL({m})' for m in METRICS)
+
+    for table, size in ROLLUPS:
+        if since_ts is not None:
+            conn.execute(f'DELETE FROM {table} WHERE bucket >= ?', (since_ts // size * size,))
+        conn.execute(f'''
+            INSERT INTO {table} ({', '.join(_COLUMNS)})
+            SELECT ts / {size} * {size}, node_id, COUNT(*), {aggs}
+            FROM readings {where}
+            GROUP BY ts / {size}, node_id
+        ''', params)
+
+
+def update(conn, rows):
+    """
+    Acumula leituras novas nos rollups
+
+    Args:
+        rows: Tuplas (timestamp, ts, temperature, humidity, soil_moisture, light_level[, node_id])
+              sem node_id, a leitura conta para DEFAULT_NODE_ID
+    """
+    for table, size in ROLLUPS:
+        buckets = {}
+        for row in rows:
+            key = (row[1] // size * size, row[6] if len(row) > 6 else DEFAULT_NODE_ID)
+            values = row[2:6]
+            acc = buckets.get(key)
+            if acc is None:
+                acc = buckets[key] = [key[0], key[1], 0]
+                for v in values:
+                    acc += [v, v, 0.0]
+            acc[2] += 1
+            for i, v in enumerate(values):
+                base = 3 + i * 3
+                if v < acc[base]:
+                    acc[base] = v
+                if v > acc[base + 1]:
+                    acc[base + 1] = v
+                acc[base + 2] += v
+        conn.executemany(_UPSERT_SQL[table], buckets.values())
+
+
+def _segments(start, end, level=0):
+    """Divide [start, end) em intervalos alinhados, usando o bucket mais grosso possível"""
+    table, size = ROLLUPS[level]
+    if level == len(ROLLUPS) - 1:
+        return [(table, start // size * size, end)]
+
+    lo = -(-start // size) * size
+    hi = end // size * size
+    if lo >= hi:
+        return _segments(start, end, level + 1)
+
+    segments = [(table, lo, hi)]
+    if start < lo:
+        segments += _segments(start, lo, level + 1)
+    if hi < end:
+        segments += _segments(hi, end, level + 1)
+    return segments
+
+
+def summary(conn, start_ts, end_ts=None, node_id=None):
+    """
+    Agrega count/min/max/avg de cada métrica no intervalo [start_ts, end_ts)
+
+    Lê no máximo algumas dezenas de buckets por nó, independente do intervalo.
+    Com node_id, só as leituras desse nó; sem ele, todos os nós juntos.
+    """
+    if end_ts is None:
+        end_ts = int(time.time()) + 1
+
+    total = 0
+    result = {m: {'min': None, 'max': None, 'sum': 0.0} for m in METRICS}
+
+    for table, lo, hi in _segments(int(start_ts), int(end_ts)):
+        row = conn.execute(_SUMMARY_SQL[table, bool(node_id)], _node_params((lo, hi), node_id)).fetchone()
+        if not row[0]:
+            continue
+        total += row[0]
+        for i, m in enumerate(METRICS):
+            mn, mx, sm = row[1 + i * 3:4 + i * 3]
+            agg = result[m]
+            agg['min'] = mn if agg['min'] is None else min(agg['min'], mn)
+            agg['max'] = mx if agg['max'] is None else max(agg['max'], mx)
+            agg['sum'] += sm
+
+    for agg in result.values():
+        agg['avg'] = agg.pop('sum') / total if total else None
+    result['count'] = total
+    return result
+
+
+def choose_resolution(hours, points):
+    """Rollup mais grosso que ainda entrega pelo menos `points` buckets na janela"""
+    for table, size in ROLLUPS:
+        if hours * 3600 / size >= points:
+            return table, size
+    return ROLLUPS[-1]
+
+
+def history(conn, hours, points=200, node_id=None):
+    """Séries agregadas das últimas N horas na resolução escolhida por choose_resolution"""
+    table, size = choose_resolution(hours, points)
+    start = int(time.time() - hours * 3600) // size * size
+    return table, conn.execute(_HISTORY_SQL[table, bool(node_id)], _node_params((start,), node_id)).fetchall()
+
+
+def series_cursor(conn, table, size, hours, since=None, node_id=None):
+    """Cursor de tuplas (bucket, médias das métricas) das últimas N horas (ou a partir de since)"""
+    start = time.time() - hours * 3600
+    if since is not None:
+        start = max(start, since)
+    start = int(start) // size * size
+    return conn.execute(_SERIES_SQL[table, bool(node_id)], _node_params((start,), node_id))
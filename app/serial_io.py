@@ -0,0 +1,358 @@
+"""
+Camada de I/O serial orientada a eventos
+
+Em vez de uma thread por porta consultando in_waiting a cada 10 ms, um único
+SerialReactor registra todas as portas em um selector (epoll/kqueue) e só
+acorda quando chegam bytes. Cada porta tem um LineBuffer que junta linhas
+parciais. Reconexão e o tempo de boot do Arduino após abrir a porta são
+tratados com temporizadores do próprio loop, sem bloquear as outras portas.
+
+Em plataformas sem select() para portas seriais (Windows), cada porta usa
+uma thread com leitura bloqueante com timeout (sem polling).
+"""
+import heapq
+import os
+import selectors
+import socket
+import threading
+import time
+
+import serial
+
+RECONNECT_DELAY = 5.0
+BOOT_DELAY = 2.0
+MAX_LINE_LENGTH = 4096
+SELECT_TIMEOUT = 1.0
+
+USE_SELECTORS = os.name != 'nt'
+
+
+class LineBuffer:
+    """Acumula bytes e devolve apenas linhas completas (terminadas em \\n)"""
+
+    def __init__(self, max_length=MAX_LINE_LENGTH):
+        self.max_length = max_length
+        self._buffer = bytearray()
+
+    def feed(self, data):
+        self._buffer += data
+        if b'\n' not in data:
+            if len(self._buffer) > self.max_length:
+                # Lixo sem quebra de linha (ex.: baud rate errado): descarta
+                self._buffer.clear()
+            return []
+
+        *lines, rest = self._buffer.split(b'\n')
+        self._buffer = bytearray(rest)
+        result = []
+        for raw in lines:
+            line = raw.decode('utf-8', errors='replace').strip()
+            if line:
+                result.append(line)
+        return result
+
+    def clear(self):
+        self._buffer.clear()
+
+
+class FrameBuffer:
+    """Acumula bytes e devolve frames binários completos (delimitados por 0x00, ver binary_protocol.py)"""
+
+    def __init__(self, max_length=MAX_LINE_LENGTH):
+        self.max_length = max_length
+        self._buffer = bytearray()
+
+    def feed(self, data):
+        self._buffer += data
+        if b'\0' not in data:
+            if len(self._buffer) > self.max_length:
+                self._buffer.clear()
+            return []
+
+        *frames, rest = self._buffer.split(b'\0')
+        self._buffer = bytearray(rest)
+        return [bytes(frame) for frame in frames if frame]
+
+    def clear(self):
+        self._buffer.clear()
+
+
+FRAMINGS = {
+    'line': LineBuffer,
+    'cobs': FrameBuffer,
+}
+
+
+class SerialPort:
+    """Estado de uma porta registrada no reactor"""
+
+    def __init__(self, name, device, baudrate, on_line, on_connect=None, on_disconnect=None):
+        self.name = name
+        self.device = device
+        self.baudrate = baudrate
+        self.on_line = on_line
+        self.on_connect = on_connect
+        self.on_disconnect = on_disconnect
+        self.serial = None
+        self.buffer = LineBuffer()
+        self.thread = None
+
+    @property
+    def is_open(self):
+        return self.serial is not None and self.serial.is_open
+
+
+class SerialReactor:
+    """Multiplexa várias portas seriais em uma única thread"""
+
+    def __init__(self, reconnect_delay=RECONNECT_DELAY, boot_delay=BOOT_DELAY):
+        self.reconnect_delay = reconnect_delay
+        self.boot_delay = boot_delay
+
+        self._ports = {}
+        self._timers = []
+        self._timer_seq = 0
+        self._lock = threading.Lock()
+        self._running = False
+        self._thread = None
+
+        self._selector = selectors.DefaultSelector() if USE_SELECTORS else None
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        if self._selector:
+            self._selector.register(self._wake_r, selectors.EVENT_READ, None)
+
+    # ==================== API ====================
+
+    def add_port(self, name, device, baudrate, on_line, on_connect=None, on_disconnect=None, serial_instance=None):
+        """
+        Registra uma porta
+
+        Args:
+            on_line: Chamado com cada linha completa (str) ou, após set_framing('cobs'), com cada frame (bytes)
+            on_connect: Chamado com (name, reconnected) após o boot do Arduino
+            on_disconnect: Chamado com (name, erro) quando a porta cai
+            serial_instance: Porta já aberta (opcional); senão é aberta pelo reactor
+        """
+        port = SerialPort(name, device, baudrate, on_line, on_connect, on_disconnect)
+        with self._lock:
+            self._ports[name] = port
+
+        if serial_instance is not None and serial_instance.is_open:
+            self._schedule(0, self._adopt, port, serial_instance)
+        else:
+            self._schedule(0, self._open, port, False)
+        return port
+
+    def call_later(self, delay, func, *args):
+        """Agenda func(*args) na thread do reactor após `delay` segundos"""
+        self._schedule(delay, func, *args)
+
+    def ports(self):
+        with self._lock:
+            return list(self._ports)
+
+    def get_serial(self, name):
+        port = self._ports.get(name)
+        return port.serial if port and port.is_open else None
+
+    def set_framing(self, name, framing, baudrate=None):
+        """
+        Troca o enquadramento (e opcionalmente o baud rate) de uma porta aberta
+
+        Vale até a porta cair: ao reabrir, ela volta para linhas no baud original
+        (o Arduino reinicia e refaz o handshake em JSON).
+        """
+        if framing not in FRAMINGS:
+            raise ValueError(f"Enquadramento desconhecido: {framing}")
+        self._schedule(0, self._set_framing, self._ports[name], framing, baudrate)
+
+    def write(self, name, data):
+        """Escreve bytes na porta (thread-safe em relação às leituras)"""
+        ser = self.get_serial(name)
+        if ser is None:
+            return False
+        try:
+            ser.write(data)
+            return True
+        except (serial.SerialException, OSError) as e:
+            self._schedule(0, self._drop, self._ports[name], e)
+            return False
+
+    def start(self):
+        self._running = True
+        if self._selector:
+            self._thread = threading.Thread(target=self._run, daemon=True, name='serial-reactor')
+        else:
+            self._thread = threading.Thread(target=self._run_timers, daemon=True, name='serial-timers')
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        self._wake()
+        if self._thread:
+            self._thread.join(5)
+        for port in list(self._ports.values()):
+            if port.thread:
+                port.thread.join(5)
+            self._close(port)
+
+    # ==================== TEMPORIZADORES ====================
+
+    def _schedule(self, delay, func, *args):
+        with self._lock:
+            self._timer_seq += 1
+            heapq.heappush(self._timers, (time.monotonic() + delay, self._timer_seq, func, args))
+        self._wake()
+
+    def _run_due_timers(self):
+        """Executa os temporizadores vencidos e retorna o tempo até o próximo"""
+        while True:
+            with self._lock:
+                if not self._timers:
+                    return SELECT_TIMEOUT
+                due = self._timers[0][0] - time.monotonic()
+                if due > 0:
+                    return min(due, SELECT_TIMEOUT)
+                _, _, func, args = heapq.heappop(self._timers)
+            try:
+                func(*args)
+            except Exception as e:
+                print(f"[SERIAL ERROR] Falha em tarefa agendada: {e}")
+
+    def _wake(self):
+        try:
+            self._wake_w.send(b'\0')
+        except OSError:
+            pass
+
+    # ==================== CONEXÃO ====================
+
+    def _open(self, port, reconnected):
+        if not self._running or port.is_open:
+            return
+        if not port.device:
+            self._schedule(self.reconnect_delay, self._open, port, reconnected)
+            return
+        try:
+            print(f"🔌 [SERIAL] Abrindo {port.name} em {port.device}...")
+            ser = serial.Serial(port.device, port.baudrate, timeout=0 if self._selector else 1)
+        except (serial.SerialException, OSError) as e:
+            print(f"✗ [SERIAL] Falha ao abrir {port.device}: {e}")
+            self._schedule(self.reconnect_delay, self._open, port, reconnected)
+            return
+        self._attach(port, ser)
+        # O Arduino reinicia ao abrir a porta: aguarda o boot sem bloquear o loop
+        self._schedule(self.boot_delay, self._fire_connect, port, reconnected)
+
+    def _adopt(self, port, ser):
+        """Assume uma porta já aberta (e já inicializada) pelo chamador"""
+        if not self._running:
+            return
+        if self._selector:
+            ser.timeout = 0
+        self._attach(port, ser)
+        self._fire_connect(port, False)
+
+    def _attach(self, port, ser):
+        port.serial = ser
+        port.buffer = LineBuffer()
+        if self._selector:
+            self._selector.register(ser.fileno(), selectors.EVENT_READ, port)
+        else:
+            port.thread = threading.Thread(target=self._run_blocking, args=(port,), daemon=True,
+                                           name=f'serial-{port.name}')
+            port.thread.start()
+
+    def _set_framing(self, port, framing, baudrate):
+        if not port.is_open:
+            return
+        if baudrate and port.serial.baudrate != baudrate:
+            port.serial.baudrate = baudrate
+        port.buffer = FRAMINGS[framing]()
+        print(f"[SERIAL] {port.name}: enquadramento {framing} a {port.serial.baudrate} baud")
+
+    def _fire_connect(self, port, reconnected):
+        if port.is_open and port.on_connect:
+            port.on_connect(port.name, reconnected)
+
+    def _close(self, port):
+        ser, port.serial = port.serial, None
+        if ser is None:
+            return
+        if self._selector:
+            try:
+                self._selector.unregister(ser.fileno())
+            except (KeyError, ValueError, OSError):
+                pass
+        try:
+            ser.close()
+        except Exception:
+            pass
+
+    def _drop(self, port, error):
+        if port.serial is None:
+            return
+        self._close(port)
+        if port.on_disconnect:
+            try:
+                port.on_disconnect(port.name, error)
+            except Exception as e:
+                print(f"[SERIAL ERROR] on_disconnect ({port.name}): {e}")
+        if self._running:
+            self._schedule(self.reconnect_delay, self._open, port, True)
+
+    # ==================== LEITURA ====================
+
+    def _handle_data(self, port, data):
+        for line in port.buffer.feed(data):
+            try:
+                port.on_line(line)
+            except Exception as e:
+                print(f"🚨 ERRO INESPERADO ({port.name}): {e}")
+
+    def _run(self):
+        while self._running:
+            timeout = self._run_due_timers()
+            for key, _ in self._selector.select(timeout):
+                port = key.data
+                if port is None:
+                    try:
+                        self._wake_r.recv(4096)
+                    except BlockingIOError:
+                        pass
+                    continue
+                try:
+                    ser = port.serial
+                    if ser is None:
+                        continue
+                    data = ser.read(ser.in_waiting or 1)
+                except (serial.SerialException, OSError) as e:
+                    print(f"🚨 ERRO ({port.name}): {e}")
+                    self._drop(port, e)
+                    continue
+                if data:
+                    self._handle_data(port, data)
+
+    def _run_timers(self):
+        """Modo sem selector: só processa temporizadores; cada porta tem sua thread de leitura"""
+        while self._running:
+            timeout = self._run_due_timers()
+            try:
+                self._wake_r.settimeout(timeout)
+                self._wake_r.recv(4096)
+            except (socket.timeout, BlockingIOError):
+                pass
+
+    def _run_blocking(self, port):
+        ser = port.serial
+        while self._running and port.serial is ser:
+            try:
+                # Bloqueia até chegar ao menos 1 byte (ou timeout de 1 s)
+                data = ser.read(ser.in_waiting or 1)
+            except (serial.SerialException, OSError) as e:
+                print(f"🚨 ERRO ({port.name}): {e}")
+                self._schedule(0, self._drop, port, e)
+                return
+            if data:
+                self._handle_data(port, data)
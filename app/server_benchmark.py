@@ -0,0 +1,181 @@
+"""
+Benchmark dos modos do servidor (GREENHOUSE_SERVER=threading|eventlet|gevent)
+
+Para cada modo, sobe o app.py de verdade (sem hardware, banco temporário com
+um dia de leituras) e mede:
+
+- requisições/s e p99 da API (/api/readings/latest, /api/statistics,
+  /api/history, /api/alerts/latest) com `http_threads` clientes HTTP
+- quantos clientes Socket.IO (polling) conseguem ficar conectados ao mesmo
+  tempo, e as threads do SO / memória do servidor com eles conectados
+- as requisições/s da API enquanto esses clientes estão conectados
+
+Uso:
+    python server_benchmark.py [clientes] [segundos] [modo ...]
+"""
+import contextlib
+import io
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+ENDPOINTS = ('/api/readings/latest?limit=50', '/api/statistics', '/api/history?hours=24', '/api/alerts/latest')
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app.py')
+
+
+def seed_database(directory, hours=24, interval=5):
+    """Banco temporário com `hours` horas de leituras (uma a cada `interval` s)"""
+    import database
+
+    database.DATABASE_NAME = os.path.join(directory, 'greenhouse.db')
+    database.init_database()
+    now = time.time()
+    rows = []
+    for i in range(int(hours * 3600 / interval)):
+        ts = now - hours * 3600 + i * interval
+        rows.append((time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(ts)), ts, 24 + (i % 100) / 20,
+                     60.0, 45.0, 70.0, 'arduino1'))
+    for start in range(0, len(rows), 5000):
+        database.insert_readings_batch(rows[start:start + 5000])
+    database.close_database()
+    return len(rows)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(mode, port, directory):
+    env = dict(os.environ, GREENHOUSE_SERVER=mode, GREENHOUSE_PORT=str(port))
+    proc = subprocess.Popen([sys.executable, APP_PATH], cwd=directory, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            requests.get(url + '/api/status', timeout=1)
+            return proc, url
+        except requests.RequestException:
+            time.sleep(0.25)
+    proc.kill()
+    raise RuntimeError(f"Servidor ({mode}) não respondeu")
+
+
+def process_stats(pid):
+    """(threads do SO, RSS em MB) do processo do servidor"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            fields = dict(line.split(':', 1) for line in f)
+        return int(fields['Threads']), int(fields['VmRSS'].split()[0]) / 1024
+    except (OSError, KeyError, ValueError):
+        return None, None
+
+
+def api_load(url, threads, seconds):
+    """(requisições/s, p99 em ms, erros) com `threads` clientes HTTP em laço"""
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + seconds
+
+    def client(n):
+        session = requests.Session()
+        local, failed = [], 0
+        i = n
+        while time.perf_counter() < stop_at:
+            start = time.perf_counter()
+            try:
+                ok = session.get(url + ENDPOINTS[i % len(ENDPOINTS)], timeout=30).status_code == 200
+            except requests.RequestException:
+                ok = False
+            if ok:
+                local.append(time.perf_counter() - start)
+            else:
+                failed += 1
+            i += 1
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    workers = [threading.Thread(target=client, args=(n,)) for n in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99)] * 1000 if latencies else float('nan')
+    return len(latencies) / elapsed, p99, errors[0]
+
+
+def run(mode, clients, seconds, http_threads=16, port=None, per_process=50):
+    import multiprocessing
+
+    from ws_load_test import client_process
+
+    directory = tempfile.mkdtemp()
+    with contextlib.redirect_stdout(io.StringIO()):
+        seed_database(directory)
+    proc, url = start_server(mode, port or free_port(), directory)
+    try:
+        status = requests.get(url + '/api/status', timeout=10).json()
+        rps, p99, errors = api_load(url, http_threads, seconds)
+        idle_threads, idle_rss = process_stats(proc.pid)
+
+        ctx = multiprocessing.get_context('spawn')
+        ready, results, done = ctx.Queue(), ctx.Queue(), ctx.Event()
+        procs = [ctx.Process(target=client_process, args=(url, min(per_process, clients - start), None,
+                                                          ready, done, 0, results))
+                 for start in range(0, clients, per_process)]
+        for client in procs:
+            client.start()
+        connected = sum(ready.get() for _ in procs)
+        loaded_rps, loaded_p99, loaded_errors = api_load(url, http_threads, seconds)
+        threads, rss = process_stats(proc.pid)
+        done.set()
+        for _ in procs:
+            results.get()
+        for client in procs:
+            client.join()
+    finally:
+        proc.terminate()
+        proc.wait(10)
+
+    return {
+        'mode': mode, 'clients': clients, 'status': status,
+        'rps': rps, 'p99': p99, 'errors': errors,
+        'connected': connected, 'idle_threads': idle_threads, 'threads': threads,
+        'idle_rss': idle_rss, 'rss': rss,
+        'loaded_rps': loaded_rps, 'loaded_p99': loaded_p99, 'loaded_errors': loaded_errors
+    }
+
+
+def print_result(r):
+    print(f"  {r['mode']:<10} API: {r['rps']:7.0f} req/s  p99 {r['p99']:6.0f} ms  ({r['errors']} erros) | "
+          f"{r['connected']:>4}/{r['clients']} clientes WS  threads {r['idle_threads']} -> {r['threads']}  "
+          f"RSS {r['idle_rss']:.0f} -> {r['rss']:.0f} MB | API com clientes: {r['loaded_rps']:7.0f} req/s  "
+          f"p99 {r['loaded_p99']:6.0f} ms  ({r['loaded_errors']} erros)")
+
+
+if __name__ == '__main__':
+    import importlib.util
+
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 5
+    modes = sys.argv[3:] or ['threading', 'eventlet', 'gevent']
+
+    print(f"{clients} clientes Socket.IO | API: 16 clientes HTTP por {seconds:g}s")
+    for mode in modes:
+        if mode != 'threading' and importlib.util.find_spec(mode) is None:
+            print(f"  {mode:<10} não instalado (pip install {mode})")
+            continue
+        print_result(run(mode, clients, seconds))
@@ -0,0 +1,78 @@
+"""
+Modo do servidor web (GREENHOUSE_SERVER)
+
+- threading (padrão): servidor de desenvolvimento do Werkzeug, uma thread
+  do SO por conexão
+- eventlet / gevent: servidor cooperativo (green threads); milhares de
+  dashboards conectados custam uma green thread cada
+
+O Flask-SocketIO não roda sobre ASGI (o python-socketio só oferece ASGI com
+AsyncServer), então o modo de produção é o servidor WSGI cooperativo.
+
+Sem monkey patching: as threads seriais, a IngestionQueue, o publicador de
+alertas e a limpeza continuam sendo threads reais do SO, fora do loop de
+eventos. Elas não emitem no Socket.IO (o BroadcastHub emite de uma tarefa
+do próprio loop). O que bloqueia dentro das rotas (SQLite, redução do
+histórico) passa por run_blocking/iter_blocking, que usam o pool de
+threads reais do eventlet (tpool) ou do gevent.
+"""
+import os
+
+SERVER_MODES = ('threading', 'eventlet', 'gevent')
+SERVER_MODE = os.environ.get('GREENHOUSE_SERVER', 'threading')
+# Conexões simultâneas no eventlet (o padrão do eventlet.wsgi, 1024, trava a API
+# quando os dashboards em long-polling ocupam todas)
+MAX_CONNECTIONS = int(os.environ.get('GREENHOUSE_MAX_CONNECTIONS', '10000'))
+LISTEN_BACKLOG = 1024
+
+if SERVER_MODE not in SERVER_MODES:
+    raise ValueError(f"GREENHOUSE_SERVER inválido: {SERVER_MODE} (use {', '.join(SERVER_MODES)})")
+
+GREEN = SERVER_MODE != 'threading'
+
+if SERVER_MODE == 'eventlet':
+    from eventlet import tpool
+
+    def run_blocking(func, *args, **kwargs):
+        """Executa func em uma thread real e devolve o resultado (só bloqueia a green thread)"""
+        return tpool.execute(func, *args, **kwargs)
+
+elif SERVER_MODE == 'gevent':
+    import gevent
+
+    def run_blocking(func, *args, **kwargs):
+        """Executa func em uma thread real e devolve o resultado (só bloqueia a greenlet)"""
+        return gevent.get_hub().threadpool.apply(func, args, kwargs)
+
+else:
+    def run_blocking(func, *args, **kwargs):
+        return func(*args, **kwargs)
+
+
+def iter_blocking(iterator):
+    """Consome um gerador bloqueante (ex.: lotes do SQLite) com cada next() no pool de threads"""
+    if not GREEN:
+        yield from iterator
+        return
+    done = object()
+    while True:
+        item = run_blocking(next, iterator, done)
+        if item is done:
+            return
+        yield item
+
+
+def run_server(socketio, app, host='0.0.0.0', port=5000):
+    """socketio.run com as opções de cada modo"""
+    if SERVER_MODE == 'eventlet':
+        import eventlet
+        import eventlet.wsgi
+
+        # socketio.run usaria o backlog padrão do eventlet.listen (50): rajadas de
+        # conexões (todos os dashboards reconectando) seriam recusadas
+        listener = eventlet.listen((host, port), backlog=LISTEN_BACKLOG)
+        eventlet.wsgi.server(listener, app, max_size=MAX_CONNECTIONS)
+    elif SERVER_MODE == 'gevent':
+        socketio.run(app, host=host, port=port, debug=False, use_reloader=False)
+    else:
+        socketio.run(app, host=host, port=port, debug=False, use_reloader=False, allow_unsafe_werkzeug=True)
@@ -0,0 +1,20 @@
+"""Os módulos de app/ são importados pelo nome (from database import ...), como no app.py"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """database.py sobre um banco (e um arquivo Parquet) temporário"""
+    import archive
+    import database
+
+    monkeypatch.setattr(database, 'DATABASE_NAME', str(tmp_path / 'greenhouse.db'))
+    monkeypatch.setattr(archive, 'ARCHIVE_DIR', str(tmp_path / 'archive'))
+    database.init_database()
+    yield database
+    database.close_database()
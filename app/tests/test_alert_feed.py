@@ -0,0 +1,57 @@
+"""AlertFeed: cursor inicial e broadcast das linhas novas"""
+import threading
+import time
+
+import alert_feed
+from alert_feed import AlertFeed
+
+
+class FakeSocketIO:
+    """Registra os emits; tarefas em threads comuns"""
+
+    def __init__(self):
+        self.emitted = []
+
+    def emit(self, event, data, to=None, namespace=None):
+        self.emitted.append(data['id'])
+
+    def start_background_task(self, target):
+        threading.Thread(target=target, daemon=True).start()
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+
+def _rows(table, last_id, limit, newest=False):
+    rows = [{'id': i, 'ts': i, 'timestamp': ''} for i in range(1, 11) if i > last_id][:limit]
+    return rows if table == 'alerts' else []
+
+
+def test_failed_initial_cursor_does_not_replay_history(monkeypatch):
+    calls = []
+
+    def flaky_last_id(table):
+        calls.append(table)
+        if len(calls) <= 3:
+            raise OSError('database is locked')
+        return 10 if table == 'alerts' else 0
+
+    monkeypatch.setattr(alert_feed, 'get_last_id', flaky_last_id)
+    monkeypatch.setattr(alert_feed, 'get_rows_since', _rows)
+
+    socketio = FakeSocketIO()
+    feed = AlertFeed(socketio, interval=0.01)
+    feed.notify('alerts')
+    # Antes do cursor inicial, poll não emite a tabela inteira
+    assert feed.poll() == 0
+
+    feed.start()
+    deadline = time.time() + 5
+    while feed.get_stats()['cursors'] != {'alerts': 10, 'actions': 0} and time.time() < deadline:
+        time.sleep(0.01)
+    feed.notify('alerts')
+    time.sleep(0.1)
+    feed.stop()
+
+    assert feed.get_stats()['cursors'] == {'alerts': 10, 'actions': 0}
+    assert socketio.emitted == []
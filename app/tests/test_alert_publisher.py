@@ -0,0 +1,70 @@
+"""AlertPublisher contra o StandInBroker (broker_harness.py): quedas, recusas e confirms por lote"""
+import time
+
+from broker_harness import StandInBroker, quiet, spool_scenario, stress_scenario, wait_for
+from alert_publisher import AlertPublisher, AlertSpool, MAX_REFUSALS
+
+
+def test_spool_survives_broker_outages(tmp_path):
+    result = spool_scenario(1000, spool_dir=str(tmp_path))
+
+    assert set(result['received']) == set(range(1000))
+    assert result['connects'] > 1
+    assert result['stats']['spool_depth'] == 0
+
+
+def test_concurrent_publishers_share_one_connection_without_collisions():
+    result = stress_scenario('publisher', threads=16, per_thread=100)
+
+    assert result['collisions'] == 0
+    assert sorted(result['received']) == sorted(f"{n}:{i}" for n in range(16) for i in range(100))
+
+
+def test_batches_are_confirmed_in_one_round_trip():
+    publisher = stress_scenario('publisher', threads=16, per_thread=100)
+    manager = stress_scenario('manager', threads=16, per_thread=100)
+
+    # Um confirm por alerta no RabbitMQManager; um por lote no AlertPublisher
+    assert manager['round_trips'] == 1600
+    assert publisher['round_trips'] <= 1600 / 10
+    # O tempo do publisher vai até o último alerta chegar ao broker
+    assert 0 < publisher['elapsed'] < manager['elapsed']
+
+
+def test_shared_channel_reference_collides():
+    # Sem o lock, o harness precisa enxergar o bug original
+    assert stress_scenario('shared_channel', threads=16, per_thread=50)['collisions'] > 0
+
+
+def test_refused_alert_does_not_block_the_queue(tmp_path):
+    broker = StandInBroker(unroutable_types={'bad'})
+    refused = {'type': 'bad', 'message': 'recusado', 'severity': 'critical'}
+
+    spool = AlertSpool(str(tmp_path / 'alert_spool.jsonl'))
+    publisher = AlertPublisher(connection_factory=broker.publisher, spool=spool, reconnect_min=0.05)
+    with quiet():
+        publisher.start()
+        publisher.publish_alert(refused)
+        for i in range(5):
+            publisher.publish_alert({'type': 'ok', 'message': str(i), 'severity': 'critical'})
+        wait_for(broker, 5, timeout=5)
+        deadline = time.time() + 5
+        while publisher.get_stats()['rejected'] == 0 and time.time() < deadline:
+            time.sleep(0.01)
+        publisher.stop()
+
+    stats = publisher.get_stats()
+    assert [m['message'] for m in broker.bodies()] == [str(i) for i in range(5)]
+    assert stats['rejected'] == 1
+    assert stats['failures'] == MAX_REFUSALS
+    assert stats['spool_depth'] == 0
+    assert 'recusado' in (tmp_path / 'alert_spool.jsonl.rejected').read_text()
+
+
+def test_spool_discard_keeps_pending_in_order(tmp_path):
+    spool = AlertSpool(str(tmp_path / 'alert_spool.jsonl'))
+    spool.append([{'n': i} for i in range(5)])
+
+    spool.discard(3, keep=[{'n': 1}])
+
+    assert spool.load() == [{'n': 1}, {'n': 3}, {'n': 4}]
@@ -0,0 +1,24 @@
+"""Roteamento dos alertas por severidade/tipo/nó"""
+from rabbitmq_config import build_message, routing_key_for
+
+
+def test_unknown_severity_is_routed_as_critical_but_kept_in_body():
+    message = build_message({'type': 'pump_fault', 'message': 'Bomba travada', 'severity': 'emergency',
+                             'node_id': 'zona2'})
+
+    assert message['severity'] == 'emergency'
+    assert routing_key_for(message) == 'alert.critical.pump_fault.zona2'
+
+
+def test_routing_key_uses_lowercase_severity_and_default_node():
+    message = build_message({'type': 'low_soil_moisture', 'severity': 'WARNING'})
+
+    assert message['severity'] == 'WARNING'
+    assert routing_key_for(message) == 'alert.warning.low_soil_moisture.system'
+
+
+def test_routing_key_segments_cannot_break_the_topic():
+    message = build_message({'type': 'temp.high*', 'severity': 'info', 'node_id': 'estufa#1.b'})
+
+    assert routing_key_for(message) == 'alert.info.temp_high_.estufa_1_b'
+
@@ -0,0 +1,82 @@
+"""BroadcastHub: um frame por grupo de clientes e controle dos lentos pelos acks"""
+from broadcast_hub import BroadcastHub
+
+
+class FakeSocketIO:
+    """Registra os emits: (lista de sids, payload)"""
+
+    def __init__(self):
+        self.emitted = []
+
+    def emit(self, event, data, to=None, namespace=None):
+        self.emitted.append((sorted(to) if isinstance(to, list) else [to], data))
+
+
+def _hub(*sids):
+    socketio = FakeSocketIO()
+    hub = BroadcastHub(socketio)
+    hub.publish({'node_id': 'zona1', 'temp': 24.0})
+    for sid in sids:
+        hub.add_client(sid)
+    socketio.emitted.clear()
+    return hub, socketio
+
+
+def test_up_to_date_clients_share_one_frame():
+    hub, socketio = _hub('a', 'b', 'c')
+
+    hub.publish({'node_id': 'zona1', 'temp': 24.5, 'soil': 40})
+    assert hub.tick() == 3
+
+    assert socketio.emitted == [(['a', 'b', 'c'], {'seq': 1, 'nodes': {'zona1': {'temp': 24.5, 'soil': 40}}})]
+
+
+def test_client_behind_on_acks_gets_the_accumulated_delta():
+    hub, socketio = _hub('fast', 'slow')
+    hub.ack('fast', 0)
+    hub.ack('slow', 0)
+
+    hub.publish({'node_id': 'zona1', 'temp': 25.0})
+    hub.tick()
+    hub.ack('fast', 1)
+
+    # 'slow' ainda não confirmou o frame 1: o frame 2 é descartado para ele
+    socketio.emitted.clear()
+    hub.publish({'node_id': 'zona1', 'soil': 41})
+    hub.tick()
+    assert socketio.emitted == [(['fast'], {'seq': 2, 'nodes': {'zona1': {'soil': 41}}})]
+    assert hub.get_stats()['dropped'] == 1
+
+    # Ao confirmar, recebe num único frame tudo o que mudou depois do frame 1
+    hub.ack('fast', 2)
+    hub.ack('slow', 1)
+    socketio.emitted.clear()
+    hub.publish({'node_id': 'zona1', 'light': 70})
+    hub.tick()
+    assert sorted(socketio.emitted) == [
+        (['fast'], {'seq': 3, 'nodes': {'zona1': {'light': 70}}}),
+        (['slow'], {'seq': 3, 'nodes': {'zona1': {'soil': 41, 'light': 70}}}),
+    ]
+
+
+def test_clients_that_never_ack_receive_every_frame():
+    hub, socketio = _hub('legacy')
+
+    for i in range(3):
+        hub.publish({'node_id': 'zona1', 'temp': 25.0 + i})
+        hub.tick()
+
+    assert [data['seq'] for _, data in socketio.emitted] == [1, 2, 3]
+    assert hub.get_stats()['dropped'] == 0
+
+
+def test_invalid_or_unknown_acks_are_ignored():
+    hub, socketio = _hub('a')
+
+    hub.ack('a', '0')
+    hub.ack('gone', 0)
+    hub.publish({'node_id': 'zona1', 'temp': 26.0})
+    hub.tick()
+
+    assert hub.get_stats()['acking'] == 0
+    assert len(socketio.emitted) == 1
@@ -0,0 +1,87 @@
+"""database.py e rollups.py sobre um banco temporário"""
+import time
+
+import pytest
+
+import archive
+import database
+
+
+def _rows(node_id, count, temperature, start=None):
+    start = int(time.time()) - count if start is None else start
+    return [
+        (time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(ts)), ts, temperature, 60.0, 40, 70, node_id)
+        for ts in range(start, start + count)
+    ]
+
+
+def test_rollups_are_kept_per_node(db):
+    db.insert_readings_batch(_rows('zona1', 120, 20.0))
+    db.insert_readings_batch(_rows('zona2', 60, 30.0))
+
+    everyone = db.get_statistics()
+    zona1 = db.get_statistics(node_id='zona1')
+    zona2 = db.get_statistics(node_id='zona2')
+
+    assert (zona1['total_readings'], zona1['avg_temperature']) == (120, 20.0)
+    assert (zona2['total_readings'], zona2['avg_temperature']) == (60, 30.0)
+    # Sem filtro, média ponderada pelo número de leituras de cada nó
+    assert everyone['total_readings'] == 180
+    assert everyone['avg_temperature'] == round((120 * 20.0 + 60 * 30.0) / 180, 1)
+
+
+def test_history_filters_by_node(db):
+    db.insert_readings_batch(_rows('zona1', 600, 20.0))
+    db.insert_readings_batch(_rows('zona2', 600, 30.0))
+
+    # 24h / 200 pontos lê o rollup; 0.1h / 200 pontos lê as leituras brutas
+    for hours in (24, 0.1):
+        assert {row[1] for row in db.iter_history_rows(hours, 200, node_id='zona2')} == {30.0}
+        merged = list(db.iter_history_rows(hours, 200))
+        assert {row[1] for row in merged} <= {20.0, 25.0, 30.0}
+        assert merged
+
+
+def test_migration_rebuilds_rollups_with_node(db):
+    db.insert_readings_batch(_rows('zona1', 60, 20.0))
+    db.insert_readings_batch(_rows('zona2', 60, 30.0))
+
+    with db.get_connection_manager().writer() as conn:
+        conn.execute('PRAGMA user_version = 4')
+    database.init_database()
+
+    with db.get_connection_manager().reader() as conn:
+        nodes = conn.execute('SELECT node_id, SUM(count) FROM readings_1d GROUP BY node_id').fetchall()
+    assert sorted(map(tuple, nodes)) == [('zona1', 60), ('zona2', 60)]
+
+
+def test_purged_readings_only_count_in_lifetime_total(db):
+    old = int(time.time()) - 40 * 86400
+    db.insert_readings_batch(_rows('zona1', 50, 20.0, start=old))
+    db.insert_readings_batch(_rows('zona1', 30, 20.0))
+
+    assert db.clear_old_data(days=30, archive_first=False) == 50
+
+    stats = db.get_statistics()
+    assert stats['total_readings'] == 30
+    assert stats['lifetime_readings'] == 80
+
+
+@pytest.mark.skipif(not archive.PYARROW_AVAILABLE, reason='pyarrow não instalado')
+def test_interrupted_purge_does_not_duplicate_archived_rows(db):
+    now = int(time.time())
+    db.insert_readings_batch(_rows('zona1', 50, 20.0, start=now - 3 * 3600))
+    db.insert_readings_batch(_rows('zona1', 30, 20.0, start=now - 60))
+
+    # Purga interrompida: as leituras antigas foram arquivadas, mas o DELETE não rodou
+    assert db.archive_readings(now - 3600) == 50
+
+    ids = [row['id'] for row in db.get_readings_by_timerange(6)]
+    assert sorted(ids) == list(range(1, 81))
+
+    exported = [row[0] for batch in db.iter_table_rows('readings', ('id',)) for row in batch]
+    assert sorted(exported) == list(range(1, 81))
+
+    # Depois do DELETE, as mesmas leituras vêm do arquivo
+    assert db.clear_old_data(days=3600 / 86400) == 50
+    assert sorted(row['id'] for row in db.get_readings_by_timerange(6)) == list(range(1, 81))
@@ -0,0 +1,27 @@
+"""Planos de execução e latência das consultas conforme readings cresce (db_benchmark.py)"""
+import db_benchmark
+
+
+def test_queries_use_indexes_without_sorting(db):
+    db_benchmark._fill(20_000, 0)
+    plans = db_benchmark.query_plans()
+
+    for name, plan in plans.items():
+        assert 'TEMP B-TREE' not in plan, (name, plan)
+    # latest percorre o rowid de trás para frente e para no LIMIT
+    assert plans['latest'] == 'SCAN readings'
+    for name in set(plans) - {'latest'}:
+        assert 'USING INDEX' in plans[name] or 'USING COVERING INDEX' in plans[name], (name, plans[name])
+    assert 'idx_readings_node_ts' in plans['node_history']
+
+
+def test_latest_and_rollup_reads_do_not_grow_with_the_table(db):
+    rows = db_benchmark._fill(10_000, 0)
+    small = [db_benchmark._time_ms(db.get_latest_readings, 10), db_benchmark._time_ms(db.get_rollup_history, 1)]
+
+    db_benchmark._fill(100_000, rows)
+    large = [db_benchmark._time_ms(db.get_latest_readings, 10), db_benchmark._time_ms(db.get_rollup_history, 1)]
+
+    # 10x mais linhas: tempo praticamente igual (folga para ruído de medição)
+    for before, after in zip(small, large):
+        assert after < before * 3 + 1.0
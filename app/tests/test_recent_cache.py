@@ -0,0 +1,28 @@
+"""RecentReadingsCache preenchido pela IngestionQueue: mesmo formato das consultas ao banco"""
+from ingestion import IngestionQueue
+from ring_buffer import RecentReadingsCache
+
+
+def test_cached_readings_match_database_rows(db):
+    cache = RecentReadingsCache()
+
+    def fill(rows, ids):
+        for row, row_id in zip(rows, ids):
+            cache.append(row[6], *row[2:6], ts=row[1], row_id=row_id)
+
+    ingestion = IngestionQueue(on_readings=fill)
+    for i in range(12):
+        ingestion.put_reading(20.0 + i, 60.0, 40, 70, 'zona1' if i % 2 else 'zona2')
+    ingestion.stop()
+
+    cached = cache.latest(5)
+    stored = db.get_latest_readings(5)
+    assert [reading['id'] for reading in cached] == [reading['id'] for reading in stored]
+    assert cached == [{key: reading[key] for key in cached[0]} for reading in stored]
+    assert set(cached[0]) == set(stored[0])
+
+    stored = db.get_readings_by_timerange(1)
+    cached = cache.since_dicts(min(r['ts'] for r in stored))
+    assert sorted(r['id'] for r in cached) == sorted(r['id'] for r in stored) == list(range(1, 13))
+    assert all(set(r) == set(stored[0]) for r in cached)
+    assert {r['id']: r['node_id'] for r in cached} == {r['id']: r['node_id'] for r in stored}
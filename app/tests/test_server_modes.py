@@ -0,0 +1,22 @@
+"""app.py de verdade em cada modo do servidor (server_benchmark.py): API e clientes Socket.IO"""
+import importlib.util
+
+import pytest
+
+from server_benchmark import run
+from server_mode import SERVER_MODES
+
+CLIENTS = 60
+
+
+@pytest.mark.parametrize('mode', SERVER_MODES)
+def test_server_mode_serves_api_and_socketio_clients(mode):
+    if mode != 'threading' and importlib.util.find_spec(mode) is None:
+        pytest.skip(f'{mode} não instalado')
+
+    result = run(mode, CLIENTS, seconds=1, http_threads=8)
+
+    assert result['status']['server_mode'] == mode
+    assert result['errors'] == result['loaded_errors'] == 0
+    assert result['rps'] > 0 and result['loaded_rps'] > 0
+    assert result['connected'] == CLIENTS
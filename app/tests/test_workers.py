@@ -0,0 +1,69 @@
+"""Workers de notificação: entrega em lotes no webhook simulado e consumidores concorrentes"""
+import contextlib
+import io
+import threading
+
+import pytest
+
+from rabbitmq_config import RabbitMQManager
+from webhook_harness import MockDiscordWebhook
+from workers import DiscordNotificationWorker, MAX_EMBEDS
+
+
+class Acks:
+    """Substitui o RabbitMQManager do worker: registra os acks/nacks"""
+
+    def __init__(self):
+        self.acked = set()
+        self.nacked = set()
+        self.lock = threading.Lock()
+
+    def ack_threadsafe(self, tag):
+        with self.lock:
+            self.acked.add(tag)
+
+    def retry_threadsafe(self, tag, error):
+        with self.lock:
+            self.nacked.add(tag)
+
+
+def test_alerts_are_acked_only_after_batched_delivery():
+    server = MockDiscordWebhook(latency=0.01, rate=20).start()
+    try:
+        worker = DiscordNotificationWorker(webhook_url=server.url)
+        worker.rabbitmq = acks = Acks()
+        with contextlib.redirect_stdout(io.StringIO()):
+            for tag in range(1, 201):
+                worker.process_alert({'type': 'high_temperature', 'message': f'Temp alta {tag}',
+                                      'severity': 'warning'}, tag)
+            worker._flush()
+            worker.dispatcher.shutdown()
+    finally:
+        server.stop()
+
+    assert acks.acked == set(range(1, 201))
+    assert not acks.nacked
+    assert server.embeds == 200
+    # Lotes de até 10 embeds (o webhook recusa mais) e 429 respeitado
+    assert server.rejected == 0
+    assert server.requests - server.rate_limited == 200 / MAX_EMBEDS
+
+
+@pytest.fixture(scope='module')
+def rabbitmq():
+    manager = RabbitMQManager()
+    with contextlib.redirect_stdout(io.StringIO()):
+        available = manager.connect()
+    if not available:
+        pytest.skip('RabbitMQ local não disponível')
+    manager.disconnect()
+
+
+def test_more_workers_deliver_faster(rabbitmq):
+    import worker_load_test
+
+    delivered_one, elapsed_one = worker_load_test.run(400, 1, latency=0.05, timeout=120)
+    delivered_four, elapsed_four = worker_load_test.run(400, 4, latency=0.05, timeout=120)
+
+    assert delivered_one == delivered_four == 400
+    assert elapsed_four < elapsed_one / 1.5
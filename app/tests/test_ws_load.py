@@ -0,0 +1,46 @@
+"""Carga do WebSocket (ws_load_test.py): clientes Socket.IO reais, rápidos e lentos"""
+import pytest
+
+from ws_load_test import NODES, run
+
+CLIENTS = 20
+RATE = 10
+SECONDS = 3
+
+
+@pytest.fixture(scope='module')
+def results():
+    return {mode: run(mode, CLIENTS, RATE, SECONDS, slow_fraction=0.2) for mode in ('emit', 'hub')}
+
+
+def test_every_client_connects(results):
+    for result in results.values():
+        assert result['connected'] == CLIENTS
+
+
+def test_emit_per_reading_sends_every_reading_to_everyone(results):
+    fast_count, fast_messages, _ = results['emit']['fast']
+    assert fast_messages == fast_count * RATE * SECONDS * len(NODES)
+
+
+def test_hub_sends_deltas_at_the_tick_rate(results):
+    hub = results['hub']
+    fast_count, fast_messages, _ = hub['fast']
+
+    # Um frame por tick (mais o retrato completo), não um por leitura
+    assert 0 < fast_messages <= fast_count * (hub['hub']['ticks'] + 1)
+    assert fast_messages < results['emit']['fast'][1] / 4
+
+
+def test_hub_holds_frames_for_slow_clients(results):
+    hub = results['hub']
+    slow_count, slow_messages, _ = hub['slow']
+    fast_count, fast_messages, _ = hub['fast']
+
+    assert hub['hub']['acking'] == CLIENTS
+    assert hub['hub']['dropped'] > 0
+    assert slow_messages / slow_count < fast_messages / fast_count
+
+
+def test_hub_keeps_the_serial_thread_cheap(results):
+    assert results['hub']['serial_avg_us'] < results['emit']['serial_avg_us']
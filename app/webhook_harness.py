@@ -0,0 +1,177 @@
+"""
+Webhook do Discord simulado (HTTP local) para testes de vazão do worker
+
+MockDiscordWebhook responde como um webhook real: 204 em caso de sucesso,
+400 para mais de 10 embeds e 429 (Retry-After + retry_after no JSON) quando
+o bucket de rate limit acaba, com os cabeçalhos X-RateLimit-*.
+
+Uso:
+    python webhook_harness.py [alertas] [latência_ms] [limite_por_segundo]
+
+Compara o envio antigo (um POST bloqueante por alerta) com o
+DiscordDispatcher (pool de threads, lotes de até 10 embeds, respeita 429).
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class MockDiscordWebhook(ThreadingHTTPServer):
+    """
+    Args:
+        latency: Tempo (s) de resposta de cada POST
+        rate: Requisições aceitas por janela
+        window: Tamanho (s) da janela do rate limit
+    """
+
+    daemon_threads = True
+
+    def __init__(self, latency=0.05, rate=5, window=1.0):
+        super().__init__(('127.0.0.1', 0), _WebhookHandler)
+        self.latency = latency
+        self.rate = rate
+        self.window = window
+        self.requests = 0
+        self.embeds = 0
+        self.rejected = 0
+        self.rate_limited = 0
+        self._window_start = time.monotonic()
+        self._used = 0
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/api/webhooks/1/mock"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def take(self):
+        """(aceito, restantes, segundos até o reset) do bucket do webhook"""
+        with self._lock:
+            now = time.monotonic()
+            if now - self._window_start >= self.window:
+                self._window_start = now
+                self._used = 0
+            reset_after = self.window - (now - self._window_start)
+            if self._used >= self.rate:
+                self.rate_limited += 1
+                return False, 0, reset_after
+            self._used += 1
+            return True, self.rate - self._used, reset_after
+
+
+class _WebhookHandler(BaseHTTPRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, body=None, headers=()):
+        data = json.dumps(body).encode() if body is not None else b''
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        if data:
+            self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        server = self.server
+        payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        with server._lock:
+            server.requests += 1
+
+        accepted, remaining, reset_after = server.take()
+        rate_headers = [('X-RateLimit-Limit', str(server.rate)), ('X-RateLimit-Remaining', str(remaining)),
+                        ('X-RateLimit-Reset-After', f"{reset_after:.3f}")]
+        if not accepted:
+            self._reply(429, {'message': 'You are being rate limited.', 'retry_after': round(reset_after, 3),
+                              'global': False}, rate_headers + [('Retry-After', f"{reset_after:.3f}")])
+            return
+
+        embeds = payload.get('embeds', [])
+        if not embeds or len(embeds) > 10:
+            with server._lock:
+                server.rejected += 1
+            self._reply(400, {'message': 'Invalid Form Body', 'code': 50035})
+            return
+
+        time.sleep(server.latency)
+        with server._lock:
+            server.embeds += len(embeds)
+        self._reply(204, headers=rate_headers)
+
+
+if __name__ == '__main__':
+    import contextlib
+    import io
+    import sys
+
+    import requests
+
+    from workers import DiscordNotificationWorker
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    latency = (int(sys.argv[2]) if len(sys.argv) > 2 else 50) / 1000
+    rate = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+
+    alerts = [{'type': 'high_temperature', 'message': f'Temp alta: {30 + i % 10}°C', 'severity': 'warning',
+               'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S')} for i in range(count)]
+
+    print(f"{count} alertas | webhook simulado: {latency * 1000:.0f} ms/POST, {rate} POST/s")
+
+    # Antes: um POST bloqueante por alerta, sem tratar 429 (alerta volta para a fila)
+    server = MockDiscordWebhook(latency=latency, rate=rate).start()
+    worker = DiscordNotificationWorker(webhook_url=server.url)
+    start = time.perf_counter()
+    delivered = 0
+    for alert in alerts:
+        response = requests.post(server.url, json={'username': 'Estufa Bot', 'embeds': [worker.build_embed(alert)]},
+                                 timeout=10)
+        delivered += response.status_code == 204
+    elapsed = time.perf_counter() - start
+    print(f"  POST por alerta     {delivered:>5}/{count} entregues  {server.requests:>5} POSTs  "
+          f"{server.rate_limited:>5} x 429  {elapsed:6.2f}s")
+    server.stop()
+
+    class Acks:
+        """Substitui o RabbitMQManager: registra os acks/nacks do worker"""
+
+        def __init__(self):
+            self.acked = set()
+            self.nacked = set()
+            self.lock = threading.Lock()
+
+        def ack_threadsafe(self, tag):
+            with self.lock:
+                self.acked.add(tag)
+
+        def retry_threadsafe(self, tag, error):
+            with self.lock:
+                self.nacked.add(tag)
+
+    # Agora: o caminho do worker (process_alert -> lotes -> pool), com ack só após a entrega
+    server = MockDiscordWebhook(latency=latency, rate=rate).start()
+    worker = DiscordNotificationWorker(webhook_url=server.url)
+    worker.rabbitmq = acks = Acks()
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        for tag, alert in enumerate(alerts, 1):
+            worker.process_alert(alert, tag)
+        worker._flush()
+        worker.dispatcher.shutdown()
+        elapsed = time.perf_counter() - start
+    print(f"  DiscordDispatcher   {len(acks.acked):>5}/{count} entregues  {server.requests:>5} POSTs  "
+          f"{server.rate_limited:>5} x 429  {elapsed:6.2f}s  ({count / elapsed:.0f} alertas/s, "
+          f"{len(acks.nacked)} reagendados, {worker.dispatcher.stats})")
+    server.stop()
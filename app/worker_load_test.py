@@ -0,0 +1,77 @@
+"""
+Teste de carga dos workers de notificação (consumidores concorrentes)
+
+Publica N alertas na fila 'info' e mede quanto tempo 1, 2, 4... processos
+de worker (WorkerSupervisor) levam para entregá-los. O Discord é substituído
+pelo webhook simulado de webhook_harness.py (latência fixa, sem rate limit),
+então o gargalo é o próprio worker.
+
+Requer um RabbitMQ local (a fila queue.alerts.info é esvaziada no início).
+
+Uso:
+    python worker_load_test.py [alertas] [workers, ex.: 1,2,4] [latência_ms]
+"""
+import contextlib
+import os
+import sys
+import time
+
+from rabbitmq_config import RabbitMQManager, ALERT_QUEUES
+from webhook_harness import MockDiscordWebhook
+from workers import WorkerSupervisor, run_worker
+
+CHANNEL = 'info'
+
+
+@contextlib.contextmanager
+def silenced():
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def quiet_worker(channel, webhook_url):
+    """run_worker sem o log por alerta (custaria CPU e poluiria a saída)"""
+    with silenced():
+        run_worker(channel, webhook_url)
+
+
+def run(count, workers, latency, timeout=300):
+    server = MockDiscordWebhook(latency=latency, rate=10 ** 9).start()
+
+    publisher = RabbitMQManager(confirm=True, channel=CHANNEL)
+    with silenced():
+        if not publisher.connect():
+            server.stop()
+            raise SystemExit("✗ RabbitMQ não disponível (o teste de carga precisa de um broker local)")
+        publisher.channel.queue_purge(queue=ALERT_QUEUES[CHANNEL][0])
+        for i in range(count):
+            publisher.publish_alert({'type': 'load_test', 'message': f'Alerta {i}', 'severity': 'info',
+                                     'node_id': f'node{i % 8}'})
+        publisher.disconnect()
+
+    supervisor = WorkerSupervisor({CHANNEL: workers}, server.url, target=quiet_worker)
+    with silenced():
+        start = time.perf_counter()
+        supervisor.start()
+        deadline = time.time() + timeout
+        while server.embeds < count and time.time() < deadline:
+            time.sleep(0.05)
+        elapsed = time.perf_counter() - start
+        supervisor.stop()
+    server.stop()
+    return server.embeds, elapsed
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    worker_counts = [int(n) for n in sys.argv[2].split(',')] if len(sys.argv) > 2 else [1, 2, 4]
+    latency = (int(sys.argv[3]) if len(sys.argv) > 3 else 200) / 1000
+
+    print(f"{count} alertas na fila '{CHANNEL}' | webhook simulado: {latency * 1000:.0f} ms/POST")
+    baseline = None
+    for workers in worker_counts:
+        delivered, elapsed = run(count, workers, latency)
+        rate = delivered / elapsed
+        baseline = baseline or rate
+        print(f"  {workers:>2} worker(s): {delivered:>6}/{count} entregues em {elapsed:6.2f}s  "
+              f"{rate:>7.0f} alertas/s  ({rate / baseline:.1f}x)")
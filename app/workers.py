@@ -1,16 +1,174 @@
 import sys
 import time
+import signal
+import threading
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
 import requests
-from rabbitmq_config import RabbitMQManager
+from requests.adapters import HTTPAdapter
+from rabbitmq_config import RabbitMQManager, ALERT_QUEUES, DEFAULT_CHANNEL
 from typing import Dict
 
+SEND_WORKERS = 4
+PREFETCH_COUNT = 50
+MAX_EMBEDS = 10          # limite do Discord por mensagem de webhook
+MAX_EMBED_CHARS = 6000   # limite do Discord para o texto somado dos embeds de uma mensagem
+BATCH_WINDOW = 0.5       # espera (s) para juntar alertas em uma mensagem
+MAX_ATTEMPTS = 3          # tentativas imediatas; depois o RabbitMQ reagenda com atraso (RETRY_DELAYS)
+REQUEST_TIMEOUT = 10
+RESTART_DELAY = 1.0       # supervisor: espera inicial para reiniciar um worker que caiu
+MAX_RESTART_DELAY = 60.0
+
+
+def embed_chars(embed):
+    """Caracteres de um embed que contam para o limite MAX_EMBED_CHARS do Discord"""
+    return (len(embed.get('title', '')) + len(embed.get('description', '')) +
+            len(embed.get('footer', {}).get('text', '')) +
+            sum(len(field['name']) + len(field['value']) for field in embed.get('fields', [])))
+
+
+class DiscordDispatcher:
+    """
+    Envia lotes de embeds para um webhook do Discord por um pool de threads
+
+    Todas as threads compartilham uma requests.Session (conexões HTTP
+    reaproveitadas) e o estado do rate limit do webhook: um 429 ou
+    X-RateLimit-Remaining = 0 pausa todas as threads até o reset,
+    em vez de cada uma insistir e tomar outro 429.
+    """
+
+    def __init__(self, webhook_url, workers=SEND_WORKERS, max_attempts=MAX_ATTEMPTS, session=None):
+        self.webhook_url = webhook_url
+        self.max_attempts = max_attempts
+        self.session = session or requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='discord')
+
+        self._lock = threading.Lock()
+        self._blocked_until = 0.0
+        self.stats = {
+            'requests': 0,
+            'delivered': 0,
+            'failed': 0,
+            'rate_limited': 0,
+            'retries': 0
+        }
+
+    def submit(self, embeds, on_done):
+        """Envia em background; on_done(ok) é chamado na thread do pool"""
+        def task():
+            try:
+                ok = self.post(embeds)
+            except Exception as e:
+                # Sem on_done as delivery tags ficariam sem ack até travar o prefetch
+                print(f"[DISCORD ERROR] Falha inesperada no envio: {e}")
+                self._count('failed', len(embeds))
+                ok = False
+            on_done(ok)
+        return self.executor.submit(task)
+
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait=wait)
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self.stats[key] += amount
+
+    def _wait_rate_limit(self):
+        while True:
+            with self._lock:
+                delay = self._blocked_until - time.monotonic()
+            if delay <= 0:
+                return
+            time.sleep(delay)
+
+    def _block(self, seconds):
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+    def post(self, embeds):
+        """Envia até MAX_EMBEDS embeds em uma mensagem; True se o Discord aceitou"""
+        payload = {
+            "username": "Estufa Bot",
+            "embeds": embeds[:MAX_EMBEDS]
+        }
+        attempt = 0
+        while attempt < self.max_attempts:
+            self._wait_rate_limit()
+            try:
+                self._count('requests')
+                response = self.session.post(self.webhook_url, json=payload, timeout=REQUEST_TIMEOUT)
+            except requests.RequestException as e:
+                print(f"[DISCORD ERROR] Falha ao enviar notificação: {e}")
+                attempt = self._backoff(attempt)
+                continue
+
+            if response.status_code == 429:
+                # Não conta como tentativa: o Discord diz exatamente quando tentar de novo
+                self._count('rate_limited')
+                self._block(self._retry_after(response))
+                continue
+
+            # Rate limit preventivo: o bucket acabou, espera o reset antes do próximo envio
+            if response.headers.get('X-RateLimit-Remaining') == '0':
+                self._block(self._reset_after(response))
+
+            if 200 <= response.status_code < 300:
+                self._count('delivered', len(payload['embeds']))
+                return True
+            if response.status_code < 500:
+                # Erro do pedido (payload/webhook inválido): repetir não resolve
+                print(f"[DISCORD] ✗ Erro ao enviar: {response.status_code} {response.text[:200]}")
+                break
+            print(f"[DISCORD] ✗ Erro ao enviar: {response.status_code} (tentativa {attempt + 1})")
+            attempt = self._backoff(attempt)
+
+        self._count('failed', len(payload['embeds']))
+        return False
+
+    def _backoff(self, attempt):
+        attempt += 1
+        if attempt < self.max_attempts:
+            self._count('retries')
+            time.sleep(min(2 ** attempt, 30))
+        return attempt
+
+    @staticmethod
+    def _retry_after(response):
+        """Segundos pedidos pelo Discord (corpo JSON retry_after ou cabeçalho Retry-After)"""
+        try:
+            return float(response.json()['retry_after'])
+        except (ValueError, KeyError, TypeError):
+            pass
+        try:
+            return float(response.headers.get('Retry-After', 1))
+        except ValueError:
+            return 1.0
+
+    @staticmethod
+    def _reset_after(response):
+        """Segundos até o reset do bucket (cabeçalho X-RateLimit-Reset-After)"""
+        try:
+            return float(response.headers.get('X-RateLimit-Reset-After', 1))
+        except ValueError:
+            return 1.0
+
+
 class DiscordNotificationWorker:
     """
-    Worker que consome alertas críticos e envia para Discord
+    Worker que consome alertas de uma fila (canal) e envia para Discord
+
+    Vários processos no mesmo canal dividem as mensagens (consumidores
+    concorrentes); ver WorkerSupervisor.
     """
     
-    def __init__(self, webhook_url=None):
-        self.rabbitmq = RabbitMQManager()
+    def __init__(self, webhook_url=None, workers=SEND_WORKERS, prefetch_count=PREFETCH_COUNT,
+                 channel=DEFAULT_CHANNEL):
+        self.rabbitmq = RabbitMQManager(channel=channel)
+        self.channel = channel
+        self.prefetch_count = prefetch_count
 
         self.webhook_url = webhook_url or "https://discord.com/api/webhooks/1438969223572361237/pCmaG6YYOiYrFxqqMk9IXioB6VPt2TYx2q-AV0Yj8dhUTloUobbuh46m65ao35ayXOtV"
         
@@ -43,84 +201,104 @@ class DiscordNotificationWorker:
             'warning': 16776960,  
             'info': 3447003        
         }
+
+        self.dispatcher = DiscordDispatcher(self.webhook_url, workers=workers)
+        # (delivery_tag, embed) aguardando para formar uma mensagem (só na thread do consumo)
+        self._pending = []
     
-    def send_discord_notification(self, alert: Dict):
-        """Envia notificação para Discord via Webhook"""
-        try:
-            alert_type = alert.get('type', 'unknown')
-            message = alert.get('message', 'Sem mensagem')
-            severity = alert.get('severity', 'info')
-            timestamp = alert.get('timestamp', '')
-            
-            emoji = self.emoji_map.get(alert_type, self.emoji_map.get(severity, '📢'))
-            
-            color = self.color_map.get(severity, 3447003)
-            
-            embed = {
-                "title": f"{emoji} Alerta do Sistema de Estufa",
-                "description": message,
-                "color": color,
-                "fields": [
-                    {
-                        "name": "Tipo",
-                        "value": alert_type.replace('_', ' ').title(),
-                        "inline": True
-                    },
-                    {
-                        "name": "Severidade",
-                        "value": severity.upper(),
-                        "inline": True
-                    },
-                    {
-                        "name": "Horário",
-                        "value": timestamp,
-                        "inline": False
-                    }
-                ],
-                "footer": {
-                    "text": "Sistema de Monitoramento de Estufa Inteligente"
+    def build_embed(self, alert: Dict):
+        """Embed do Discord para um alerta"""
+        alert_type = str(alert.get('type') or 'unknown')
+        message = str(alert.get('message') or 'Sem mensagem')
+        severity = str(alert.get('severity') or 'info')
+        timestamp = str(alert.get('timestamp') or '')
+        
+        emoji = self.emoji_map.get(alert_type, self.emoji_map.get(severity, '📢'))
+        
+        color = self.color_map.get(severity, 3447003)
+        
+        return {
+            "title": f"{emoji} Alerta do Sistema de Estufa",
+            "description": message[:4096],
+            "color": color,
+            "fields": [
+                {
+                    "name": "Tipo",
+                    "value": alert_type.replace('_', ' ').title(),
+                    "inline": True
+                },
+                {
+                    "name": "Severidade",
+                    "value": severity.upper(),
+                    "inline": True
+                },
+                {
+                    "name": "Horário",
+                    "value": timestamp,
+                    "inline": False
                 }
+            ],
+            "footer": {
+                "text": "Sistema de Monitoramento de Estufa Inteligente"
             }
-            
-            payload = {
-                "username": "Estufa Bot",
-                "embeds": [embed]
-            }
-            
-            response = requests.post(
-                self.webhook_url,
-                json=payload,
-                timeout=10
-            )
-            
-            if response.status_code == 204:
-                print(f"[DISCORD] ✓ Notificação enviada: {alert_type}")
-                return True
-            else:
-                print(f"[DISCORD] ✗ Erro ao enviar: {response.status_code}")
-                return False
-                
-        except Exception as e:
-            print(f"[DISCORD ERROR] Falha ao enviar notificação: {e}")
-            return False
+        }
+
+    def send_discord_notification(self, alert: Dict):
+        """Envia uma notificação para Discord via Webhook (síncrono)"""
+        ok = self.dispatcher.post([self.build_embed(alert)])
+        if ok:
+            print(f"[DISCORD] ✓ Notificação enviada: {alert.get('type', 'unknown')}")
+        return ok
     
-    def process_alert(self, message: Dict):
-        """Processa um alerta crítico"""
-        print("\n" + "=" * 60)
-        print("🚨 ALERTA CRÍTICO RECEBIDO")
-        print("=" * 60)
-        print(f"Tipo: {message.get('type')}")
-        print(f"Mensagem: {message.get('message')}")
-        print(f"Severidade: {message.get('severity')}")
-        print(f"Timestamp: {message.get('timestamp')}")
-        print("=" * 60)
-        
-        self.send_discord_notification(message)
+    def process_alert(self, message: Dict, delivery_tag):
+        """
+        Recebe um alerta (thread do consumo); o ack só acontece após a entrega
+
+        Os alertas são agrupados em mensagens de até MAX_EMBEDS embeds, enviadas
+        quando o grupo enche ou a cada BATCH_WINDOW segundos.
+        """
+        print(f"🚨 [WORKER] {message.get('severity')} {message.get('type')}: {message.get('message')}")
+        self._pending.append((delivery_tag, self.build_embed(message)))
+        if len(self._pending) >= MAX_EMBEDS:
+            self._flush()
+
+    def _flush(self):
+        """Envia os pendentes em mensagens de até MAX_EMBEDS embeds e MAX_EMBED_CHARS caracteres"""
+        batch, chars = [], 0
+        for tag, embed in self._pending:
+            size = embed_chars(embed)
+            if batch and (len(batch) >= MAX_EMBEDS or chars + size > MAX_EMBED_CHARS):
+                self._submit(batch)
+                batch, chars = [], 0
+            batch.append((tag, embed))
+            chars += size
+        if batch:
+            self._submit(batch)
+        self._pending = []
+
+    def _submit(self, batch):
+        tags = [tag for tag, _ in batch]
+        self.dispatcher.submit([embed for _, embed in batch], lambda ok, tags=tags: self._settle(tags, ok))
+
+    def _settle(self, tags, ok):
+        """Chamado na thread do pool: ack/nack agendados na thread do consumo"""
+        if ok:
+            print(f"[DISCORD] ✓ {len(tags)} notificação(ões) enviada(s)")
+        for tag in tags:
+            if ok:
+                self.rabbitmq.ack_threadsafe(tag)
+            else:
+                # As tentativas imediatas já foram feitas pelo dispatcher: volta com atraso (ou DLQ)
+                self.rabbitmq.retry_threadsafe(tag, "Falha ao entregar no Discord")
+
+    def _tick(self):
+        self._flush()
+        self.rabbitmq.call_later(BATCH_WINDOW, self._tick)
     
     def start(self):
         """Inicia o worker"""
         print("=" * 60)
-        print("WORKER DE NOTIFICAÇÕES DISCORD")
+        print(f"WORKER DE NOTIFICAÇÕES DISCORD (fila: {self.rabbitmq.queue_name})")
         print("=" * 60)
         
         if self.webhook_url == "YOUR_DISCORD_WEBHOOK_URL_HERE":
@@ -136,12 +314,14 @@ class DiscordNotificationWorker:
         
         if self.rabbitmq.connect():
             print("✓ RabbitMQ conectado!")
-            print("Aguardando alertas críticos...\n")
+            print(f"Aguardando alertas ({self.channel})...\n")
             
             try:
-                self.rabbitmq.consume(self.process_alert)
+                self.rabbitmq.call_later(BATCH_WINDOW, self._tick)
+                self.rabbitmq.consume(self.process_alert, prefetch_count=self.prefetch_count, manual_ack=True)
             except KeyboardInterrupt:
                 print("\n\n[WORKER] Encerrando...")
+                self.dispatcher.shutdown()
                 self.rabbitmq.disconnect()
         else:
             print("✗ Falha ao conectar ao RabbitMQ")
@@ -149,6 +329,98 @@ class DiscordNotificationWorker:
             print("  sudo systemctl status rabbitmq-server")
 
 
+def _interrupt(signum, frame):
+    """SIGTERM vira KeyboardInterrupt: mesmo encerramento limpo do Ctrl+C"""
+    raise KeyboardInterrupt
+
+
+def run_worker(channel, webhook_url=None):
+    """Alvo dos processos do supervisor"""
+    # Ctrl+C no terminal chega a todo o grupo: quem encerra os workers é o supervisor
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, _interrupt)
+    DiscordNotificationWorker(webhook_url=webhook_url, channel=channel).start()
+
+
+class WorkerSupervisor:
+    """
+    Mantém N processos de worker por canal e reinicia os que morrerem
+
+    Args:
+        counts: Dict canal -> número de processos (ex.: {'critical': 2, 'info': 1})
+        webhook_url: Repassado aos workers
+    """
+
+    def __init__(self, counts, webhook_url=None, target=run_worker):
+        unknown = set(counts) - set(ALERT_QUEUES)
+        if unknown:
+            raise ValueError(f"Canal desconhecido: {', '.join(sorted(unknown))}")
+        self.counts = counts
+        self.webhook_url = webhook_url
+        self.target = target
+        self.processes = {}
+        self._delays = {}
+        self._restart_at = {}
+        self._running = False
+
+    def _spawn(self, slot):
+        channel, index = slot
+        process = multiprocessing.Process(target=self.target, args=(channel, self.webhook_url),
+                                          name=f"worker-{channel}-{index}")
+        process.start()
+        self.processes[slot] = (process, time.monotonic())
+        print(f"[SUPERVISOR] {process.name} iniciado (pid {process.pid})")
+
+    def start(self):
+        self._running = True
+        for channel, count in self.counts.items():
+            for index in range(count):
+                self._spawn((channel, index))
+
+    def check(self):
+        """Reinicia processos que terminaram (com backoff se morrem logo após subir)"""
+        now = time.monotonic()
+        for slot, (process, started) in list(self.processes.items()):
+            if process.is_alive():
+                continue
+            restart_at = self._restart_at.get(slot)
+            if restart_at is None:
+                # Caiu rápido (ex.: RabbitMQ fora do ar): dobra a espera; rodou bem: volta ao mínimo
+                quick = now - started < MAX_RESTART_DELAY
+                delay = min(self._delays.get(slot, RESTART_DELAY / 2) * 2, MAX_RESTART_DELAY) if quick else RESTART_DELAY
+                self._delays[slot] = delay
+                self._restart_at[slot] = now + delay
+                print(f"[SUPERVISOR] {process.name} terminou (código {process.exitcode}); reiniciando em {delay:.0f}s")
+            elif now >= restart_at:
+                del self._restart_at[slot]
+                self._spawn(slot)
+
+    def run(self):
+        """Loop do supervisor (até Ctrl+C / SIGTERM)"""
+        signal.signal(signal.SIGTERM, _interrupt)
+        self.start()
+        try:
+            while self._running:
+                time.sleep(0.5)
+                self.check()
+        except KeyboardInterrupt:
+            print("\n[SUPERVISOR] Encerrando workers...")
+        finally:
+            self.stop()
+
+    def stop(self, timeout=10):
+        self._running = False
+        processes = [process for process, _ in self.processes.values()]
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        for process in processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.kill()
+        self.processes = {}
+
+
 def test_discord_webhook(webhook_url):
     """Testa o webhook do Discord"""
     print("\n" + "=" * 60)
@@ -186,6 +458,42 @@ def test_discord_webhook(webhook_url):
         return False
 
 
+def manage_dead_letters(action, limit=None):
+    """Inspeciona / reenvia / apaga a fila de mensagens mortas (DLQ)"""
+    rabbitmq = RabbitMQManager()
+    if not rabbitmq.connect():
+        print("✗ Falha ao conectar ao RabbitMQ")
+        return
+    
+    try:
+        if action == 'list':
+            total, items = rabbitmq.dead_letters(limit or 20)
+            print(f"\n{total} mensagem(ns) em {rabbitmq.dead_letter_queue}\n")
+            for alert, headers in items:
+                if isinstance(alert, dict):
+                    print(f"• [{alert.get('severity')}] {alert.get('type')} ({alert.get('timestamp')})")
+                    print(f"    {alert.get('message')}")
+                else:
+                    print(f"• (corpo inválido) {alert[:200]}")
+                print(f"    motivo: {headers.get('x-last-error')}  em: {headers.get('x-dead-at')}")
+            if total > len(items):
+                print(f"\n... e mais {total - len(items)} (use: dlq list <n>)")
+        
+        elif action == 'replay':
+            replayed = rabbitmq.replay_dead_letters(limit)
+            print(f"✓ {replayed} mensagem(ns) devolvida(s) às filas de origem")
+        
+        elif action == 'purge':
+            purged = rabbitmq.purge_dead_letters()
+            print(f"✓ {purged} mensagem(ns) apagada(s) da DLQ")
+        
+        else:
+            print(f"❌ Ação desconhecida: {action}")
+            print("Use: dlq list [n] | dlq replay [n] | dlq purge")
+    finally:
+        rabbitmq.disconnect()
+
+
 def main():
     if len(sys.argv) < 2:
         print("""
@@ -194,10 +502,18 @@ USO: python workers.py [comando] [webhook_url]
 Comandos:
   start              - Inicia worker de Discord
   test <webhook_url> - Testa webhook do Discord
+  supervise canal=N ... [webhook_url]
+                     - Inicia N workers por canal (critical, warning, info) e os reinicia se caírem
+  dlq [list [n]]     - Mostra as mensagens na fila de mensagens mortas (DLQ)
+  dlq replay [n]     - Devolve mensagens da DLQ para a fila principal
+  dlq purge          - Apaga as mensagens da DLQ
 
 Exemplos:
   python workers.py start
   python workers.py test https://discord.com/api/webhooks/123/abc
+  python workers.py start info
+  python workers.py supervise critical=2 warning=1 info=1
+  python workers.py dlq list 50
   
 Configurar Webhook:
   1. Edite este arquivo (workers.py)
@@ -209,10 +525,24 @@ Configurar Webhook:
     command = sys.argv[1].lower()
     
     if command == 'start':
-        webhook_url = sys.argv[2] if len(sys.argv) > 2 else None
-        worker = DiscordNotificationWorker(webhook_url=webhook_url)
+        # Argumentos opcionais, em qualquer ordem: canal (critical/warning/info) e webhook
+        args = sys.argv[2:]
+        channel = next((arg for arg in args if arg in ALERT_QUEUES), DEFAULT_CHANNEL)
+        webhook_url = next((arg for arg in args if arg not in ALERT_QUEUES), None)
+        worker = DiscordNotificationWorker(webhook_url=webhook_url, channel=channel)
         worker.start()
     
+    elif command == 'supervise':
+        counts = {}
+        webhook_url = None
+        for arg in sys.argv[2:]:
+            if '=' in arg and not arg.startswith('http'):
+                channel, count = arg.split('=', 1)
+                counts[channel] = int(count)
+            else:
+                webhook_url = arg
+        WorkerSupervisor(counts or {channel: 1 for channel in ALERT_QUEUES}, webhook_url).run()
+    
     elif command == 'test':
         if len(sys.argv) < 3:
             print("❌ Erro: Forneça o webhook URL")
@@ -222,9 +552,14 @@ Configurar Webhook:
         webhook_url = sys.argv[2]
         test_discord_webhook(webhook_url)
     
+    elif command == 'dlq':
+        action = sys.argv[2].lower() if len(sys.argv) > 2 else 'list'
+        limit = int(sys.argv[3]) if len(sys.argv) > 3 else None
+        manage_dead_letters(action, limit)
+    
     else:
         print(f"❌ Comando desconhecido: {command}")
-        print("Use: start ou test")
+        print("Use: start, supervise, test ou dlq")
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
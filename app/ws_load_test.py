@@ -0,0 +1,246 @@
+"""
+Teste de carga do WebSocket: centenas de clientes Socket.IO simulados
+
+Sobe um servidor Flask-SocketIO local (async_mode='threading', como app.py),
+conecta N clientes python-socketio (transporte polling) e simula nós
+sensores publicando leituras em rajada. Uma fração dos clientes tem um link
+lento (cada long-poll só sai após `slow_delay` segundos), então os pacotes
+deles se acumulam na fila do servidor.
+
+Compara:
+- emit por leitura: socketio.emit('sensor_data') na thread serial (antes)
+- BroadcastHub: publish() na thread serial + deltas a 2 Hz (agora)
+
+Mede o custo na thread serial, os pacotes enviados, a idade dos dados ao
+chegar nos clientes rápidos/lentos e a fila máxima no servidor.
+
+Uso:
+    python ws_load_test.py [clientes] [leituras_por_segundo] [segundos] [fração_lenta]
+"""
+import contextlib
+import threading
+import time
+
+import requests
+import socketio
+from flask import Flask, request
+from flask_socketio import SocketIO
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+from broadcast_hub import BroadcastHub
+
+NODES = ('arduino1', 'zona2')
+
+
+class SlowSession(requests.Session):
+    """Sessão HTTP de um link lento: cada long-poll (GET) só sai após `delay`"""
+
+    def __init__(self, delay):
+        super().__init__()
+        self.delay = delay
+
+    def request(self, method, url, *args, **kwargs):
+        if method == 'GET':
+            time.sleep(self.delay)
+        return super().request(method, url, *args, **kwargs)
+
+
+class SimulatedClient:
+    """Cliente Socket.IO que mede a idade das leituras recebidas"""
+
+    def __init__(self, url, slow_delay=None):
+        self.slow = slow_delay is not None
+        self.messages = 0
+        self.ages = []
+        self._lock = threading.Lock()
+        options = {'http_session': SlowSession(slow_delay)} if self.slow else {}
+        self.sio = socketio.Client(reconnection=False, **options)
+        self.sio.on('sensor_data', self._on_reading)
+        self.sio.on('sensor_delta', self._on_delta)
+        self.url = url
+
+    def connect(self):
+        try:
+            self.sio.connect(self.url, transports=['polling'], wait_timeout=30)
+        except socketio.exceptions.ConnectionError:
+            # Contado como não conectado (servidor saturado)
+            pass
+
+    def _record(self, ts):
+        with self._lock:
+            self.messages += 1
+            if ts is not None:
+                self.ages.append(time.time() - ts)
+
+    def _on_reading(self, data):
+        self._record(data.get('ts'))
+
+    def _on_delta(self, frame):
+        stamps = [fields['ts'] for fields in frame['nodes'].values() if 'ts' in fields]
+        self._record(max(stamps) if stamps else None)
+        # O retrato completo chega antes de o cliente Python marcar o namespace como
+        # conectado (o do navegador guarda o emit até lá); o ack seguinte cobre este
+        with contextlib.suppress(socketio.exceptions.BadNamespaceError):
+            self.sio.emit('sensor_ack', {'seq': frame['seq']})
+
+
+class QuietHandler(WSGIRequestHandler):
+
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+def build_server(mode):
+    """(app, socketio, hub) de um servidor mínimo no modo 'emit' ou 'hub'"""
+    app = Flask(__name__)
+    server = SocketIO(app, cors_allowed_origins="*", async_mode='threading')
+    hub = BroadcastHub(server) if mode == 'hub' else None
+
+    @server.on('connect')
+    def handle_connect():
+        if hub:
+            hub.add_client(request.sid)
+
+    @server.on('disconnect')
+    def handle_disconnect():
+        if hub:
+            hub.remove_client(request.sid)
+
+    @server.on('sensor_ack')
+    def handle_sensor_ack(frame):
+        if hub:
+            hub.ack(request.sid, frame.get('seq'))
+
+    if hub:
+        on_data = hub.publish
+    else:
+        def on_data(data):
+            server.emit('sensor_data', data, namespace='/')
+    return app, server, hub, on_data
+
+
+def max_backlog(server):
+    try:
+        return max((sock.queue.qsize() for sock in list(server.server.eio.sockets.values())), default=0)
+    except AttributeError:
+        return 0
+
+
+def client_process(url, count, slow_delay, ready, done, grace, results):
+    """Processo com `count` clientes (fora do processo do servidor, que não disputa o GIL com eles)"""
+    from engineio.payload import Payload
+
+    # O cliente Python aborta um long-poll com mais de 16 pacotes; o navegador não tem esse limite
+    Payload.max_decode_packets = 100000
+    sims = [SimulatedClient(url, slow_delay) for _ in range(count)]
+    connectors = [threading.Thread(target=sim.connect) for sim in sims]
+    for thread in connectors:
+        thread.start()
+    for thread in connectors:
+        thread.join()
+    connected = sum(sim.sio.connected for sim in sims)
+    ready.put(connected)
+    done.wait()
+    time.sleep(grace)
+    results.put((slow_delay is not None, connected, sum(sim.messages for sim in sims),
+                 [age for sim in sims for age in sim.ages]))
+    for sim in sims:
+        with contextlib.suppress(Exception):
+            sim.sio.disconnect()
+
+
+def run(mode, clients, rate, seconds, slow_fraction, slow_delay=1.0, per_process=50):
+    import multiprocessing
+
+    app, server, hub, on_data = build_server(mode)
+    http = make_server('127.0.0.1', 0, app, threaded=True, request_handler=QuietHandler)
+    threading.Thread(target=http.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{http.server_port}"
+
+    ctx = multiprocessing.get_context('spawn')
+    ready, results, done = ctx.Queue(), ctx.Queue(), ctx.Event()
+    slow_count = int(clients * slow_fraction)
+    batches = [(n, slow_delay) for n in _split(slow_count, per_process)] + \
+              [(n, None) for n in _split(clients - slow_count, per_process)]
+    procs = [ctx.Process(target=client_process, args=(url, n, delay, ready, done, 2 * slow_delay, results))
+             for n, delay in batches]
+    for proc in procs:
+        proc.start()
+    connected = sum(ready.get() for _ in procs)
+    if hub:
+        hub.start()
+
+    # Thread "serial": uma leitura por nó a cada 1/rate s
+    costs = []
+    start = time.perf_counter()
+    for i in range(int(rate * seconds)):
+        for n, node_id in enumerate(NODES):
+            data = {'source': 'arduino1', 'node_id': node_id, 'temp': 24.0 + (i % 20) / 10 + n,
+                    'humid': 60.0, 'soil': 40 + (i // 50) % 3, 'light': 70, 'ts': time.time()}
+            t0 = time.perf_counter()
+            on_data(data)
+            costs.append(time.perf_counter() - t0)
+        time.sleep(max(0.0, start + (i + 1) / rate - time.perf_counter()))
+    backlog = max_backlog(server)
+    done.set()
+
+    groups = {True: [0, 0, []], False: [0, 0, []]}
+    for _ in procs:
+        slow, count, messages, ages = results.get()
+        group = groups[slow]
+        group[0] += count
+        group[1] += messages
+        group[2] += ages
+    for proc in procs:
+        proc.join()
+    if hub:
+        hub.stop()
+    http.shutdown()
+
+    costs.sort()
+    return {
+        'mode': mode,
+        'connected': connected,
+        'serial_avg_us': sum(costs) / len(costs) * 1e6,
+        'serial_p99_us': costs[int(len(costs) * 0.99)] * 1e6,
+        'backlog': backlog,
+        'readings': int(rate * seconds) * len(NODES),
+        'fast': groups[False],
+        'slow': groups[True],
+        'hub': hub.get_stats() if hub else None
+    }
+
+
+def print_result(result):
+    def summary(count, messages, ages):
+        ages = sorted(ages)
+        line = f"{count:>4} clientes  {messages / max(1, count):7.1f} msgs/cliente"
+        if ages:
+            line += f"  idade média {sum(ages) / len(ages) * 1000:6.0f} ms  máx {ages[-1] * 1000:6.0f} ms"
+        return line
+
+    print(f"  {'emit por leitura' if result['mode'] == 'emit' else 'BroadcastHub':<17} {result['connected']} conectados  "
+          f"thread serial: média {result['serial_avg_us']:6.0f} µs  "
+          f"p99 {result['serial_p99_us']:6.0f} µs  fila máx no servidor: {result['backlog']} pacotes")
+    print(f"      rápidos: {summary(*result['fast'])}")
+    print(f"      lentos:  {summary(*result['slow'])}")
+    if result['hub']:
+        print(f"      {result['hub']}")
+
+
+def _split(total, size):
+    return [min(size, total - start) for start in range(0, total, size)]
+
+
+if __name__ == '__main__':
+    import sys
+
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    rate = float(sys.argv[2]) if len(sys.argv) > 2 else 20
+    seconds = float(sys.argv[3]) if len(sys.argv) > 3 else 10
+    slow_fraction = float(sys.argv[4]) if len(sys.argv) > 4 else 0.1
+
+    print(f"{clients} clientes ({slow_fraction:.0%} com link lento) | {len(NODES)} nós x {rate:g} leituras/s "
+          f"por {seconds:g}s")
+    for mode in ('emit', 'hub'):
+        print_result(run(mode, clients, rate, seconds, slow_fraction))
@@ -19,6 +19,18 @@ DHT dht(DHT_PIN, DHTTYPE);
 
 LiquidCrystal_I2C lcd(0x27, 16, 2);
 
+// Identificador da zona enviado no handshake (fleet_manager.py); único por nó
+#define NODE_ID "arduino1"
+
+// Protocolo binário opcional (app/binary_protocol.py), negociado após o handshake:
+// COBS( versão | tipo | corpo | crc16 LE ) 0x00
+#define PROTO_VERSION 1
+#define FRAME_READING 0x01
+#define FRAME_JSON 0x02
+#define FRAME_MAX 200
+bool binaryMode = false;
+uint16_t frameSeq = 0;
+
 #define INTERVAL_SENSORS 5000
 unsigned long lastSensorRead = 0;
 
@@ -65,7 +77,7 @@ void setup() {
   delay(1500);
   lcd.clear();
 
-  Serial.println(F("{\"status\":\"arduino1_ready\",\"source\":\"arduino1\"}"));
+  Serial.println(F("{\"status\":\"arduino1_ready\",\"source\":\"arduino1\",\"node\":\"" NODE_ID "\",\"proto\":1}"));
 }
 
 void loop() {
@@ -115,45 +127,41 @@ void readAndSendSensorData() {
   lastSoil = soilPercent;
   lastLight = ldrPercent;
 
-  String json = "{\"source\":\"arduino1\",";
-  json += "\"temp\":" + String(temp, 1) + ",";
-  json += "\"humid\":" + String(humid, 0) + ",";
-  json += "\"soil\":" + String(soilPercent) + ",";
-  json += "\"light\":" + String(ldrPercent) + "}";
-  Serial.println(json);
+  if (binaryMode) {
+    sendReadingFrame(temp, humid, soilPercent, ldrPercent);
+  } else {
+    String json = "{\"source\":\"arduino1\",";
+    json += "\"temp\":" + String(temp, 1) + ",";
+    json += "\"humid\":" + String(humid, 0) + ",";
+    json += "\"soil\":" + String(soilPercent) + ",";
+    json += "\"light\":" + String(ldrPercent) + "}";
+    Serial.println(json);
+  }
   
   if (soilPercent < thresholds.terraMin && !pumpIsOn) {
     pumpIsOn = true;
     pumpStartTime = millis();
     digitalWrite(RELAY_PUMP, RELAY_ON);
     
-    Serial.println(F("{\"action\":\"pump_auto_on\",\"reason\":\"low_soil\"}"));
+    sendMessage(F("{\"action\":\"pump_auto_on\",\"reason\":\"low_soil\"}"));
   }
   
   if (temp > thresholds.tempMax && !coolerOn) {
     setCooler(true);
-    Serial.print(F("{\"action\":\"cooler_auto_on\",\"reason\":\"high_temp\",\"value\":"));
-    Serial.print(String(temp, 1));
-    Serial.println(F("}"));
+    sendMessage(String(F("{\"action\":\"cooler_auto_on\",\"reason\":\"high_temp\",\"value\":")) + String(temp, 1) + F("}"));
   } 
   else if (temp < thresholds.tempMax - 2 && coolerOn) {
     setCooler(false);
-    Serial.print(F("{\"action\":\"cooler_auto_off\",\"reason\":\"temp_normal\",\"value\":"));
-    Serial.print(String(temp, 1));
-    Serial.println(F("}"));
+    sendMessage(String(F("{\"action\":\"cooler_auto_off\",\"reason\":\"temp_normal\",\"value\":")) + String(temp, 1) + F("}"));
   }
   
   if (ldrPercent < thresholds.luzMin && !lightOn) {
     setLight(true);
-    Serial.print(F("{\"action\":\"light_auto_on\",\"reason\":\"low_light\",\"value\":"));
-    Serial.print(ldrPercent);
-    Serial.println(F("}"));
+    sendMessage(String(F("{\"action\":\"light_auto_on\",\"reason\":\"low_light\",\"value\":")) + String(ldrPercent) + F("}"));
   } 
   else if (ldrPercent > thresholds.luzMin + 10 && lightOn) {
     setLight(false);
-    Serial.print(F("{\"action\":\"light_auto_off\",\"reason\":\"light_normal\",\"value\":"));
-    Serial.print(ldrPercent);
-    Serial.println(F("}"));
+    sendMessage(String(F("{\"action\":\"light_auto_off\",\"reason\":\"light_normal\",\"value\":")) + String(ldrPercent) + F("}"));
   }
   
   updateLCD(temp, humid, soilPercent, ldrPercent, false);
@@ -162,14 +170,14 @@ void readAndSendSensorData() {
 void setCooler(bool state) {
   coolerOn = state;
   digitalWrite(RELAY_COOLER, state ? RELAY_ON : RELAY_OFF);
-  Serial.println(state ? F("{\"response\":\"cooler_on\"}") : F("{\"response\":\"cooler_off\"}"));
+  sendMessage(state ? F("{\"response\":\"cooler_on\"}") : F("{\"response\":\"cooler_off\"}"));
   updateLCD(lastTemp, lastHumid, lastSoil, lastLight, false);
 }
 
 void setLight(bool state) {
   lightOn = state;
   digitalWrite(RELAY_LIGHT, state ? RELAY_ON : RELAY_OFF);
-  Serial.println(state ? F("{\"response\":\"light_on\"}") : F("{\"response\":\"light_off\"}"));
+  sendMessage(state ? F("{\"response\":\"light_on\"}") : F("{\"response\":\"light_off\"}"));
   updateLCD(lastTemp, lastHumid, lastSoil, lastLight, false);
 }
 
@@ -181,7 +189,7 @@ void handleCommand(String cmd) {
       pumpIsOn = true;
       pumpStartTime = millis();
       digitalWrite(RELAY_PUMP, RELAY_ON);
-      Serial.println(F("{\"response\":\"irrigation_started\"}"));
+      sendMessage(F("{\"response\":\"irrigation_started\"}"));
     }
   }
   
@@ -200,6 +208,9 @@ void handleCommand(String cmd) {
   else if (cmd == F("GET_THRESHOLDS")) {
     sendThresholds();
   }
+  else if (cmd.startsWith(F("BINARY:"))) {
+    enableBinary(cmd.substring(7).toInt());
+  }
   else if (cmd.startsWith("{")) {
     parseThresholdsJSON(cmd);
   }
@@ -218,7 +229,7 @@ void sendThresholds() {
   json += "\"terraMax\":" + String(thresholds.terraMax, 1) + ",";
   json += "\"terraMin\":" + String(thresholds.terraMin, 1);
   json += "}}";
-  Serial.println(json);
+  sendMessage(json);
 }
 
 void parseThresholdsJSON(String json) {
@@ -228,9 +239,7 @@ void parseThresholdsJSON(String json) {
   if (error) {
     lcd.clear();
     lcd.print(F("Falha no JSON!")); 
-    Serial.print(F("{\"response\":\"json_parse_error\", \"detail\":\""));
-    Serial.print(error.c_str());
-    Serial.println(F("\"}"));
+    sendMessage(String(F("{\"response\":\"json_parse_error\", \"detail\":\"")) + error.c_str() + F("\"}"));
     delay(1000);
     return;
   }
@@ -259,7 +268,101 @@ void parseThresholdsJSON(String json) {
   lcd.print(F("JSON OK! (v7)"));
   delay(1000);
 
-  Serial.println(F("{\"response\":\"thresholds_updated_v7\"}"));
+  sendMessage(F("{\"response\":\"thresholds_updated_v7\"}"));
+}
+
+// ==================== PROTOCOLO ====================
+
+void sendMessage(const __FlashStringHelper *json) {
+  if (!binaryMode) {
+    Serial.println(json);
+    return;
+  }
+  sendMessage(String(json));
+}
+
+void sendMessage(const String &json) {
+  if (!binaryMode) {
+    Serial.println(json);
+    return;
+  }
+  sendFrame(FRAME_JSON, (const uint8_t *) json.c_str(), json.length());
+}
+
+void enableBinary(long baud) {
+  if (baud <= 0) return;
+  Serial.print(F("{\"response\":\"binary_on\",\"proto\":1,\"baud\":"));
+  Serial.print(baud);
+  Serial.println(F("}"));
+  Serial.flush();
+  Serial.end();
+  Serial.begin(baud);
+  delay(50);  // tempo para o servidor trocar o baud rate
+  binaryMode = true;
+  frameSeq = 0;
+}
+
+uint16_t crc16(const uint8_t *data, size_t len) {
+  uint16_t crc = 0xFFFF;
+  for (size_t i = 0; i < len; i++) {
+    crc ^= (uint16_t) data[i] << 8;
+    for (uint8_t bit = 0; bit < 8; bit++) {
+      crc = (crc & 0x8000) ? (crc << 1) ^ 0x1021 : crc << 1;
+    }
+  }
+  return crc;
+}
+
+void sendFrame(uint8_t type, const uint8_t *body, size_t len) {
+  if (len > FRAME_MAX - 4) return;
+
+  uint8_t raw[FRAME_MAX];
+  size_t n = 0;
+  raw[n++] = PROTO_VERSION;
+  raw[n++] = type;
+  memcpy(raw + n, body, len);
+  n += len;
+  uint16_t crc = crc16(raw, n);
+  raw[n++] = crc & 0xFF;
+  raw[n++] = crc >> 8;
+
+  // COBS: cada zero vira a distância até o próximo zero
+  uint8_t out[FRAME_MAX + FRAME_MAX / 254 + 2];
+  size_t codeIndex = 0;
+  size_t o = 1;
+  uint8_t code = 1;
+  for (size_t i = 0; i < n; i++) {
+    if (raw[i] == 0) {
+      out[codeIndex] = code;
+      code = 1;
+      codeIndex = o++;
+    } else {
+      out[o++] = raw[i];
+      code++;
+      if (code == 0xFF) {
+        out[codeIndex] = code;
+        code = 1;
+        codeIndex = o++;
+      }
+    }
+  }
+  out[codeIndex] = code;
+  out[o++] = 0;
+  Serial.write(out, o);
+}
+
+void sendReadingFrame(float temp, float humid, int soil, int light) {
+  int16_t temp10 = (int16_t) round(temp * 10);
+  uint8_t body[7];
+  body[0] = frameSeq & 0xFF;
+  body[1] = frameSeq >> 8;
+  body[2] = temp10 & 0xFF;
+  body[3] = (temp10 >> 8) & 0xFF;
+  body[4] = (uint8_t) round(humid);
+  body[5] = (uint8_t) soil;
+  body[6] = (uint8_t) light;
+  frameSeq++;
+  sendFrame(FRAME_READING, body, sizeof(body));
 }
 
 void updateLCD(float temp, float humid, int soil, int light, bool dhtError) {